@@ -0,0 +1,149 @@
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+from database.connection import get_pool
+from config.settings import Config
+
+class ResponseCache:
+    """Content-addressed cache of LLM responses with an in-memory LRU tier and a SQLite tier."""
+
+    def __init__(self, db_path: str = Config.RESPONSE_CACHE_PATH,
+                 max_memory_entries: int = Config.RESPONSE_CACHE_MEMORY_ENTRIES,
+                 max_disk_entries: int = Config.RESPONSE_CACHE_DISK_ENTRIES,
+                 ttl_seconds: float = Config.RESPONSE_CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.pool = get_pool(db_path)
+        self._memory = OrderedDict()  # key -> (stored_at, response)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._init_table()
+
+    def _init_table(self):
+        """Create the disk tier table."""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache (last_access)')
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize user input so trivially different resubmissions share a key."""
+        if not text:
+            return ""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(cls, model: str, prompt_version: str, **inputs: str) -> str:
+        """Hash the model, prompt version and normalized inputs into a cache key."""
+        digest = hashlib.sha256()
+        for part in (model, prompt_version):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        for name in sorted(inputs):
+            digest.update(name.encode("utf-8"))
+            digest.update(b"\x00")
+            digest.update(cls.normalize(inputs[name]).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds
+
+    def _remember(self, key: str, stored_at: float, response: str):
+        """Put an item in the memory tier, evicting the least recently used one."""
+        self._memory[key] = (stored_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if not self._expired(item[0], now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return item[1]
+                del self._memory[key]
+
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT response, stored_at FROM response_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row and self._expired(row[1], now):
+                    conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                    row = None
+                elif row:
+                    conn.execute('UPDATE response_cache SET last_access = ? WHERE key = ?', (now, key))
+        except Exception as e:
+            logging.error(f"Error reading response cache: {e}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, row[1], row[0])
+        return row[0]
+
+    def set(self, key: str, response: str):
+        """Store a response in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, response)
+
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO response_cache (key, response, stored_at, last_access)
+                    VALUES (?, ?, ?, ?)
+                ''', (key, response, now, now))
+                if self.ttl_seconds > 0:
+                    conn.execute('DELETE FROM response_cache WHERE stored_at < ?', (now - self.ttl_seconds,))
+                evicted = conn.execute('''
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_disk_entries,)).rowcount
+            if evicted:
+                with self._lock:
+                    self._stats["evictions"] += evicted
+        except Exception as e:
+            logging.error(f"Error writing response cache: {e}")
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._memory.clear()
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM response_cache')
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters since this cache was created."""
+        with self._lock:
+            return dict(self._stats)
+
+@lru_cache(maxsize=None)
+def get_response_cache(db_path: str = Config.RESPONSE_CACHE_PATH) -> ResponseCache:
+    """Return the process-wide response cache."""
+    return ResponseCache(db_path)
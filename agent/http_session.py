@@ -0,0 +1,25 @@
+import logging
+import requests
+from http.cookiejar import DefaultCookiePolicy
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from config.settings import Config
+
+@lru_cache(maxsize=None)
+def get_http_session() -> requests.Session:
+    """Return the process-wide keep-alive session used for all LLM calls.
+    
+    Reusing pooled connections saves the DNS, TCP and TLS handshakes on every
+    reflection. The session is shared by every Streamlit session in the process,
+    so it carries no per-user state: cookies are refused and auth is per request.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    logging.info("Created shared HTTP session for LLM requests")
+    return session
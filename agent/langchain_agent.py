@@ -1,57 +1,207 @@
+import time
+import asyncio
 import logging
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from langchain.llms import OpenAI
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-from agent.prompts import PROMPT_TEMPLATE, REFLECTION_SYSTEM_PROMPT
+from agent.prompts import (
+    CONTEXT_TEMPLATE, INPUT_TEMPLATE, PROMPT_INSTRUCTIONS, REFLECTION_SYSTEM_PROMPT, PROMPT_VERSION,
+    STRUCTURED_OUTPUT_PROMPT, STRUCTURED_REPAIR_PROMPT
+)
+from agent.tokens import fit_inputs, log_usage
+from agent.cache import ResponseCache, get_response_cache
+from agent.streaming import iter_completion_deltas
+from agent.parsing import parse_sections
+from agent.structured import missing_sections, parse_structured, response_format, to_markdown
+from agent.http_session import get_http_session
+from agent.resilience import (
+    ApiError, CircuitBreaker, CircuitOpenError, RetryPolicy, get_circuit_breaker, parse_retry_after
+)
 from config.settings import Config
 import requests
 
+_fanout_executor = ThreadPoolExecutor(max_workers=Config.FANOUT_MAX_WORKERS, thread_name_prefix="llm-fanout")
+
+def section_completeness(results: Dict[str, str]) -> float:
+    """Default fan-out scorer: the number of non-empty sections, length as a tie-breaker."""
+    keys = ("reflection", "dream_interpretation", "mindset_insight", "strategy")
+    filled = sum(1 for key in keys if results.get(key))
+    return filled + min(len(results.get("full_response", "")), 10000) / 100000
+
 class ConsciousDayAgent:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None, session: Optional[requests.Session] = None,
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 structured: Optional[bool] = None):
         self.api_key = Config.OPENROUTER_API_KEY
         self.base_url = Config.OPENROUTER_BASE_URL
         self.model = Config.DEFAULT_MODEL
+        self.session = session if session is not None else get_http_session()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # None means one process-wide breaker per model, see _breaker_for()
+        self.circuit_breaker = circuit_breaker
+        if cache is None and Config.RESPONSE_CACHE_ENABLED:
+            cache = get_response_cache()
+        self.cache = cache
+        self.structured = Config.STRUCTURED_OUTPUT if structured is None else structured
         
         if not self.api_key:
             logging.warning("No API key found. Agent will not function properly.")
     
-    def _make_api_request(self, messages: list) -> str:
+    def _build_headers(self) -> Dict[str, str]:
+        """Build the OpenRouter request headers."""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://consciousday-agent.streamlit.app",
+            "X-Title": "ConsciousDay Agent"
+        }
+    
+    def _build_payload(self, messages: list, stream: bool = False, model: Optional[str] = None,
+                       output_format: Optional[Dict] = None) -> Dict:
+        """Build the chat completion request body."""
+        data = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 1500
+        }
+        if stream:
+            data["stream"] = True
+        if output_format:
+            data["response_format"] = output_format
+        return data
+    
+    def _breaker_for(self, model: Optional[str] = None) -> CircuitBreaker:
+        """Circuit breaker guarding calls to one model (shared process-wide)."""
+        if self.circuit_breaker is not None:
+            return self.circuit_breaker
+        return get_circuit_breaker(f"openrouter:{model or self.model}")
+    
+    def _post(self, messages: list, model: Optional[str] = None, stream: bool = False,
+              output_format: Optional[Dict] = None) -> requests.Response:
+        """POST a completion request, retrying transient failures per the retry policy.
+        
+        Returns a 200 response; the caller records success on the breaker once
+        the body has been consumed. Failures are recorded here and re-raised.
+        """
+        breaker = self._breaker_for(model)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open; skipping API request")
+        
+        error = None
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self._build_headers(),
+                    json=self._build_payload(messages, stream=stream, model=model, output_format=output_format),
+                    timeout=Config.LLM_REQUEST_TIMEOUT,
+                    stream=stream
+                )
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = e
+            except Exception as e:
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code == 200:
+                    return response
+                error = ApiError(response.status_code, response.text)
+                response.close()
+                if response.status_code not in self.retry_policy.retry_statuses:
+                    break
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > self.retry_policy.max_delay:
+                    # Not worth holding the user's request open that long
+                    break
+            
+            if attempt < self.retry_policy.max_attempts:
+                delay = self.retry_policy.backoff(attempt, retry_after)
+                logging.warning(f"{error}; retrying in {delay:.2f}s (attempt {attempt + 1}/{self.retry_policy.max_attempts})")
+                time.sleep(delay)
+        
+        breaker.record_failure()
+        raise error
+    
+    def _make_api_request(self, messages: list, model: Optional[str] = None,
+                          output_format: Optional[Dict] = None) -> str:
         """Make a direct API request to OpenRouter."""
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://consciousday-agent.streamlit.app",
-                "X-Title": "ConsciousDay Agent"
-            }
-            
-            data = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 1500
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                logging.error(f"API request failed: {response.status_code} - {response.text}")
-                return self._get_fallback_response()
-                
+            response = self._post(messages, model=model, output_format=output_format)
+        except CircuitOpenError as e:
+            logging.warning(str(e))
+            return self._get_fallback_response()
         except Exception as e:
             logging.error(f"Error making API request: {e}")
             return self._get_fallback_response()
+        
+        breaker = self._breaker_for(model)
+        try:
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+        except Exception as e:
+            breaker.record_failure()
+            logging.error(f"Malformed API response: {e}")
+            return self._get_fallback_response()
+        breaker.record_success()
+        log_usage(model or self.model, messages, content, result.get("usage"))
+        return content
+    
+    def _stream_api_request(self, messages: list, model: Optional[str] = None) -> Iterator[str]:
+        """Stream content deltas from OpenRouter as they arrive."""
+        response = self._post(messages, model=model, stream=True)
+        breaker = self._breaker_for(model)
+        succeeded = False
+        try:
+            with response:
+                response.encoding = "utf-8"
+                yield from iter_completion_deltas(response.iter_lines(decode_unicode=True))
+            succeeded = True
+        except GeneratorExit:
+            # The reader stopped early; the provider itself was healthy
+            succeeded = True
+            raise
+        finally:
+            if succeeded:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+    
+    def _make_structured_request(self, messages: list, model: Optional[str] = None) -> str:
+        """Request the sections as JSON and return them rendered as markdown.
+        
+        A reply that still lacks sections after local repair gets one follow-up
+        request for just the missing keys, rather than a whole new generation.
+        """
+        raw = self._make_api_request(messages, model=model, output_format=response_format())
+        if raw == self._get_fallback_response():
+            return raw
+        
+        sections = parse_structured(raw)
+        missing = missing_sections(sections)
+        if missing:
+            logging.warning(f"Structured response missing {', '.join(missing)}; requesting repair")
+            repair_messages = messages + [
+                {"role": "assistant", "content": raw},
+                {"role": "user", "content": STRUCTURED_REPAIR_PROMPT.format(keys=", ".join(missing))}
+            ]
+            repair = self._make_api_request(repair_messages, model=model, output_format=response_format(missing))
+            if repair != self._get_fallback_response():
+                repaired = parse_structured(repair)
+                sections.update({key: repaired[key] for key in missing if key in repaired})
+        
+        return to_markdown(sections) if sections else self._get_fallback_response()
+    
+    def _request_reflection(self, messages: list, model: Optional[str] = None) -> str:
+        """Generate one complete reflection in the agent's output mode."""
+        if self.structured:
+            return self._make_structured_request(messages, model=model)
+        return self._make_api_request(messages, model=model)
     
     def _get_fallback_response(self) -> str:
         """Provide a fallback response when API fails."""
@@ -74,34 +224,79 @@ Your intention and priorities show that you're actively working to create meanin
 *Note: This is a simplified response due to technical limitations. Please try again later for a more personalized analysis.*
 """
     
-    def generate_reflection(self, journal: str, intention: str, dream: str, priorities: str) -> Dict[str, str]:
+    def _build_messages(self, journal: str, intention: str, dream: str, priorities: str,
+                        structured: bool = False, context: str = "") -> list:
+        """Format the prompt with user inputs.
+        
+        Everything static goes in the system message, ahead of the user's
+        inputs, so the prefix is identical across requests and can be served
+        from the provider's prompt cache. Oversized inputs are trimmed to
+        PROMPT_INPUT_TOKEN_BUDGET. `context` holds related past entries, already
+        fitted to CONTEXT_TOKEN_BUDGET by the caller.
+        """
+        inputs = fit_inputs(
+            {"journal": journal, "intention": intention, "dream": dream, "priorities": priorities},
+            Config.PROMPT_INPUT_TOKEN_BUDGET
+        )
+        system_prompt = REFLECTION_SYSTEM_PROMPT + "\n" + PROMPT_INSTRUCTIONS
+        if structured:
+            system_prompt += STRUCTURED_OUTPUT_PROMPT
+        
+        if Config.PROMPT_CACHE_CONTROL:
+            # Honoured by Anthropic and Gemini models; other providers cache
+            # long prefixes automatically and ignore the marker
+            system_content = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+        else:
+            system_content = system_prompt
+        
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": INPUT_TEMPLATE.format(**inputs) + (
+                CONTEXT_TEMPLATE.format(context=context) if context else ""
+            )}
+        ]
+    
+    def _cache_key(self, journal: str, intention: str, dream: str, priorities: str,
+                   model: Optional[str] = None, context: str = "") -> Optional[str]:
+        """Return the response cache key for these inputs, or None when caching is off."""
+        if self.cache is None:
+            return None
+        return ResponseCache.make_key(
+            model or self.model, PROMPT_VERSION,
+            journal=journal, intention=intention, dream=dream, priorities=priorities, context=context
+        )
+    
+    def build_results(self, response: str) -> Dict[str, str]:
+        """Split a full response into the result dict shown to the user."""
+        sections = self._parse_response(response)
+        
+        return {
+            "reflection": sections.get("reflection", ""),
+            "dream_interpretation": sections.get("dream_interpretation", ""),
+            "mindset_insight": sections.get("mindset_insight", ""),
+            "strategy": sections.get("strategy", ""),
+            "full_response": response
+        }
+    
+    def generate_reflection(self, journal: str, intention: str, dream: str, priorities: str,
+                            context: str = "") -> Dict[str, str]:
         """Generate reflection and strategy based on user inputs."""
         try:
-            # Format the prompt with user inputs
-            formatted_prompt = PROMPT_TEMPLATE.format(
-                journal=journal,
-                intention=intention,
-                dream=dream if dream else "No dream recalled",
-                priorities=priorities
-            )
-            
-            messages = [
-                {"role": "system", "content": REFLECTION_SYSTEM_PROMPT},
-                {"role": "user", "content": formatted_prompt}
-            ]
-            
-            response = self._make_api_request(messages)
+            dream = dream if dream else "No dream recalled"
+            cache_key = self._cache_key(journal, intention, dream, priorities, context=context)
+            response = self.cache.get(cache_key) if cache_key else None
             
-            # Parse the response into sections
-            sections = self._parse_response(response)
+            if response is None:
+                messages = self._build_messages(
+                    journal, intention, dream, priorities, structured=self.structured, context=context
+                )
+                response = self._request_reflection(messages)
+                
+                # Never cache the fallback, so the next submission retries the API
+                if cache_key and response != self._get_fallback_response():
+                    self.cache.set(cache_key, response)
             
-            return {
-                "reflection": sections.get("reflection", ""),
-                "dream_interpretation": sections.get("dream_interpretation", ""),
-                "mindset_insight": sections.get("mindset_insight", ""),
-                "strategy": sections.get("strategy", ""),
-                "full_response": response
-            }
+            return self.build_results(response)
             
         except Exception as e:
             logging.error(f"Error generating reflection: {e}")
@@ -114,40 +309,127 @@ Your intention and priorities show that you're actively working to create meanin
                 "full_response": fallback
             }
     
-    def _parse_response(self, response: str) -> Dict[str, str]:
-        """Parse the AI response into structured sections."""
-        sections = {}
-        current_section = None
-        current_content = []
+    def stream_reflection(self, journal: str, intention: str, dream: str, priorities: str,
+                          context: str = "") -> Iterator[str]:
+        """Yield the reflection text in chunks as the model produces it.
         
-        lines = response.split('\n')
+        Join the chunks and pass them to build_results() for the final sections.
+        """
+        dream = dream if dream else "No dream recalled"
+        cache_key = self._cache_key(journal, intention, dream, priorities, context=context)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            yield cached
+            return
         
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('## Inner Reflection Summary'):
-                current_section = 'reflection'
-                current_content = []
-            elif line.startswith('## Dream Interpretation Summary'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'dream_interpretation'
-                current_content = []
-            elif line.startswith('## Energy/Mindset Insight'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'mindset_insight'
-                current_content = []
-            elif line.startswith('## Suggested Day Strategy'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'strategy'
-                current_content = []
-            elif current_section and line:
-                current_content.append(line)
-        
-        # Add the last section
-        if current_section and current_content:
-            sections[current_section] = '\n'.join(current_content).strip()
-        
-        return sections
\ No newline at end of file
+        chunks = []
+        try:
+            messages = self._build_messages(journal, intention, dream, priorities, context=context)
+            for chunk in self._stream_api_request(messages):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logging.error(f"Error streaming reflection: {e}")
+            if not chunks:
+                yield self._get_fallback_response()
+            return
+        
+        if not chunks:
+            yield self._get_fallback_response()
+            return
+        
+        log_usage(self.model, messages, "".join(chunks))
+        if cache_key:
+            self.cache.set(cache_key, "".join(chunks))
+    
+    def _is_valid_response(self, response: str) -> bool:
+        """A response counts as valid if it is not the fallback and has at least one section."""
+        return response != self._get_fallback_response() and bool(self._parse_response(response))
+    
+    async def _arequest(self, messages: list, model: str) -> Tuple[str, str]:
+        """Run one blocking request on a worker thread and tag it with its model."""
+        # A dedicated executor rather than asyncio.to_thread: asyncio.run() waits for
+        # its default executor on shutdown, which would make callers wait for losers.
+        loop = asyncio.get_running_loop()
+        return model, await loop.run_in_executor(_fanout_executor, self._request_reflection, messages, model)
+    
+    async def _first_valid(self, messages: list, models: List[str], hedge_delay: float) -> Optional[Tuple[str, str]]:
+        """Return the first valid (model, response), launching backups every hedge_delay seconds."""
+        waiting = list(models)
+        pending = set()
+        try:
+            while waiting or pending:
+                if waiting:
+                    pending.add(asyncio.create_task(self._arequest(messages, waiting.pop(0))))
+                    if hedge_delay <= 0:
+                        continue
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay if waiting else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    model, response = task.result()
+                    if self._is_valid_response(response):
+                        return model, response
+                    logging.warning(f"Discarding invalid response from {model}")
+            return None
+        finally:
+            # The losing threads finish in the background; their results are ignored
+            for task in pending:
+                task.cancel()
+    
+    async def _best_scored(self, messages: list, models: List[str],
+                           scorer: Callable[[Dict[str, str]], float]) -> Optional[Tuple[str, str]]:
+        """Wait for every model and return the valid (model, response) the scorer ranks highest."""
+        completed = await asyncio.gather(*(self._arequest(messages, model) for model in models))
+        valid = [(model, response) for model, response in completed if self._is_valid_response(response)]
+        if not valid:
+            return None
+        return max(valid, key=lambda item: scorer(self.build_results(item[1])))
+    
+    async def agenerate_reflection(self, journal: str, intention: str, dream: str, priorities: str,
+                                   models: Optional[List[str]] = None, strategy: str = "first",
+                                   scorer: Optional[Callable[[Dict[str, str]], float]] = None,
+                                   hedge_delay: float = Config.HEDGE_DELAY_SECONDS,
+                                   context: str = "") -> Dict[str, str]:
+        """Generate a reflection by sending the same prompt to several models concurrently.
+        
+        strategy="first" returns the first valid response (hedged requests: each
+        backup model starts hedge_delay seconds after the previous one, or all at
+        once when it is 0). strategy="best" waits for all models and returns the
+        response with the highest scorer() value, section completeness by default.
+        """
+        if strategy not in ("first", "best"):
+            raise ValueError(f"Unknown fan-out strategy: {strategy}")
+        models = models or Config.FANOUT_MODELS or [self.model]
+        dream = dream if dream else "No dream recalled"
+        
+        for model in models:
+            cache_key = self._cache_key(journal, intention, dream, priorities, model=model, context=context)
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return self.build_results(cached)
+        
+        messages = self._build_messages(
+            journal, intention, dream, priorities, structured=self.structured, context=context
+        )
+        if strategy == "first":
+            winner = await self._first_valid(messages, models, hedge_delay)
+        else:
+            winner = await self._best_scored(messages, models, scorer or section_completeness)
+        
+        if winner is None:
+            logging.error(f"No valid response from any of: {', '.join(models)}")
+            return self.build_results(self._get_fallback_response())
+        
+        model, response = winner
+        logging.info(f"Fan-out ({strategy}) selected response from {model}")
+        cache_key = self._cache_key(journal, intention, dream, priorities, model=model, context=context)
+        if cache_key:
+            self.cache.set(cache_key, response)
+        return self.build_results(response)
+    
+    def _parse_response(self, response: str) -> Dict[str, str]:
+        """Parse the AI response into structured sections."""
+        return parse_sections(response)
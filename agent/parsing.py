@@ -0,0 +1,38 @@
+import re
+from typing import Dict, Optional
+
+# Markdown headers the prompt asks for, in order, and the result key each one fills.
+SECTION_HEADERS = (
+    ('## Inner Reflection Summary', 'reflection'),
+    ('## Dream Interpretation Summary', 'dream_interpretation'),
+    ('## Energy/Mindset Insight', 'mindset_insight'),
+    ('## Suggested Day Strategy', 'strategy'),
+)
+_SECTION_KEYS = dict(SECTION_HEADERS)
+
+# A header line (anything may follow the header text on the same line)
+HEADER_PATTERN = re.compile(
+    r'^[ \t]*(' + '|'.join(re.escape(header) for header, _ in SECTION_HEADERS) + r')[^\n]*$',
+    re.MULTILINE
+)
+
+def header_key(line: str) -> Optional[str]:
+    """Return the section key if this (stripped) line is a section header."""
+    match = HEADER_PATTERN.match(line)
+    return _SECTION_KEYS[match.group(1)] if match else None
+
+def _clean(body: str) -> str:
+    return '\n'.join(line.strip() for line in body.split('\n') if line.strip())
+
+def parse_sections(response: str) -> Dict[str, str]:
+    """Split a reflection into its non-empty sections in one scan for headers.
+
+    Text before the first header is ignored; blank lines are dropped and every
+    line is stripped. A repeated header replaces the earlier section.
+    """
+    sections = {}
+    matches = list(HEADER_PATTERN.finditer(response))
+    for match, following in zip(matches, matches[1:] + [None]):
+        body = response[match.end():following.start() if following else len(response)]
+        sections[_SECTION_KEYS[match.group(1)]] = _clean(body)
+    return {key: value for key, value in sections.items() if value}
@@ -0,0 +1,95 @@
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from agent.parsing import header_key
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the data payload of each server-sent event until [DONE]."""
+    data: List[str] = []
+    for line in lines:
+        if line is None:
+            continue
+        line = line.rstrip('\r')
+        if not line:
+            # A blank line terminates the current event
+            if data:
+                payload = '\n'.join(data)
+                data = []
+                if payload == '[DONE]':
+                    return
+                yield payload
+            continue
+        if line.startswith(':'):
+            # Comment / keep-alive line (OpenRouter sends ": OPENROUTER PROCESSING")
+            continue
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data.append(value[1:] if value.startswith(' ') else value)
+    if data:
+        payload = '\n'.join(data)
+        if payload != '[DONE]':
+            yield payload
+
+def iter_completion_deltas(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the content deltas of an OpenAI-style streaming chat completion."""
+    for payload in iter_sse_data(lines):
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            logging.warning(f"Skipping malformed stream chunk: {payload[:100]}")
+            continue
+        if 'error' in chunk:
+            raise RuntimeError(f"Stream error: {chunk['error']}")
+        for choice in chunk.get('choices', []):
+            content = (choice.get('delta') or {}).get('content')
+            if content:
+                yield content
+
+class IncrementalSectionParser:
+    """Split a streamed response into sections as chunks arrive.
+
+    Produces the same sections as parse_sections() on the complete text, but
+    can be fed arbitrary chunk boundaries.
+    """
+
+    def __init__(self):
+        self._lines: Dict[str, List[str]] = {}
+        self._current: Optional[str] = None
+        self._partial = ''
+
+    def _consume_line(self, line: str):
+        line = line.strip()
+        key = header_key(line)
+        if key:
+            self._current = key
+            self._lines[key] = []
+        elif self._current and line:
+            self._lines[self._current].append(line)
+
+    def feed(self, chunk: str) -> Set[str]:
+        """Consume a chunk and return the keys of the sections it changed."""
+        before = self.sections
+        text = self._partial + chunk
+        *complete, self._partial = text.split('\n')
+        for line in complete:
+            self._consume_line(line)
+        after = self.sections
+        return {key for key in after if after[key] != before.get(key)}
+
+    def close(self) -> Dict[str, str]:
+        """Flush the trailing partial line and return the final sections."""
+        if self._partial:
+            self._consume_line(self._partial)
+            self._partial = ''
+        return self.sections
+
+    @property
+    def sections(self) -> Dict[str, str]:
+        """Sections seen so far, including the unfinished trailing line."""
+        sections = {key: '\n'.join(lines) for key, lines in self._lines.items()}
+        partial = self._partial.strip()
+        # Hold back a partial line that may still turn into a header
+        if self._current and partial and not partial.startswith('#'):
+            current = sections.get(self._current, '')
+            sections[self._current] = f"{current}\n{partial}" if current else partial
+        return {key: value for key, value in sections.items() if value}
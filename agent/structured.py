@@ -0,0 +1,64 @@
+import re
+import json
+from typing import Any, Dict, List, Sequence
+from agent.parsing import SECTION_HEADERS, parse_sections
+
+SECTION_KEYS = tuple(key for _, key in SECTION_HEADERS)
+
+# Leading/trailing markdown code fence around a JSON reply
+_CODE_FENCE = re.compile(r'^```[a-zA-Z]*\s*|\s*```$')
+
+def response_format(keys: Sequence[str] = SECTION_KEYS) -> Dict[str, Any]:
+    """OpenAI-style json_schema response_format requiring a string for each section key."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "daily_reflection",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {key: {"type": "string"} for key in keys},
+                "required": list(keys),
+                "additionalProperties": False
+            }
+        }
+    }
+
+def validate_sections(data: Any) -> Dict[str, str]:
+    """Keep the non-empty string sections of a decoded reply; anything else is dropped."""
+    if not isinstance(data, dict):
+        return {}
+    return {
+        key: data[key].strip()
+        for key in SECTION_KEYS
+        if isinstance(data.get(key), str) and data[key].strip()
+    }
+
+def missing_sections(sections: Dict[str, str]) -> List[str]:
+    return [key for key in SECTION_KEYS if not sections.get(key)]
+
+def parse_structured(text: str) -> Dict[str, str]:
+    """Decode a structured reply, repairing the usual ways models break it.
+
+    Tries the text as-is, without a code fence, and the outermost {...} span,
+    allowing raw newlines inside strings. A reply that ignored the format is
+    parsed by its markdown headers instead.
+    """
+    text = text.strip()
+    candidates = [text, _CODE_FENCE.sub('', text)]
+    start, end = text.find('{'), text.rfind('}')
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            sections = validate_sections(json.loads(candidate, strict=False))
+        except ValueError:
+            continue
+        if sections:
+            return sections
+    return parse_sections(text)
+
+def to_markdown(sections: Dict[str, str]) -> str:
+    """Render sections with the PROMPT_TEMPLATE headers, the format entries are stored in."""
+    return '\n\n'.join(f"{header}\n{sections[key]}" for header, key in SECTION_HEADERS if sections.get(key))
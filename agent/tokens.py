@@ -0,0 +1,96 @@
+import math
+import logging
+from functools import lru_cache
+from typing import Dict, Optional
+from config.settings import Config
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+# Rough characters per token for English prose when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+TRIM_MARKER = "\n[…]\n"
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    """The tiktoken encoding, or None when tiktoken or its encoding file is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(Config.TOKEN_ENCODING)
+    except Exception as e:
+        logging.warning(f"Falling back to estimated token counts: {e}")
+        return None
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally (an approximation for non-OpenAI models)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def count_message_tokens(messages: list) -> int:
+    """Approximate prompt tokens of a chat request, including content-part messages."""
+    total = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content)
+        total += count_tokens(content) + 4  # role and message framing
+    return total
+
+def trim_to_budget(text: str, max_tokens: int) -> str:
+    """Shorten text to about max_tokens, keeping its beginning and end around a marker."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(max_tokens - count_tokens(TRIM_MARKER), 0)
+    head, tail = keep - keep // 3, keep // 3
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        start, end = encoding.decode(tokens[:head]), encoding.decode(tokens[len(tokens) - tail:]) if tail else ""
+    else:
+        start, end = text[:head * CHARS_PER_TOKEN], text[len(text) - tail * CHARS_PER_TOKEN:] if tail else ""
+    return f"{start.rstrip()}{TRIM_MARKER}{end.lstrip()}"
+
+def fit_inputs(inputs: Dict[str, str], budget: int) -> Dict[str, str]:
+    """Trim the largest inputs so that together they fit the token budget.
+
+    Short fields are kept whole; the remaining budget is shared evenly among the
+    fields that do not fit in their share, so one long journal cannot crowd out
+    the intention and priorities.
+    """
+    sizes = {key: count_tokens(value) for key, value in inputs.items()}
+    if sum(sizes.values()) <= budget:
+        return dict(inputs)
+
+    fitted = dict(inputs)
+    remaining, pending = budget, sorted(sizes, key=sizes.get)
+    while pending:
+        share = remaining // len(pending)
+        key = pending.pop(0)
+        if sizes[key] > share:
+            # Every field left is at least this large: split what is left evenly
+            for key in [key] + pending:
+                fitted[key] = trim_to_budget(inputs[key], share)
+            break
+        remaining -= sizes[key]
+    logging.info(f"Trimmed prompt inputs from {sum(sizes.values())} to about {budget} tokens")
+    return fitted
+
+def log_usage(model: str, messages: list, completion: str, usage: Optional[Dict] = None):
+    """Log tokens in and out for one request, from the provider's usage block when present."""
+    if usage:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        logging.info(
+            f"Tokens for {model}: {usage.get('prompt_tokens', 0)} in ({cached} cached), "
+            f"{usage.get('completion_tokens', 0)} out"
+        )
+    else:
+        logging.info(
+            f"Tokens for {model} (estimated): {count_message_tokens(messages)} in, {count_tokens(completion)} out"
+        )
@@ -1,7 +1,8 @@
 import streamlit as st
 import logging
 from utils.helpers import setup_logging, init_session_state, validate_api_configuration
-from components.auth import AuthManager
+from components.auth import get_auth_manager
+from agent.resilience import circuit_breaker_metrics
 from pages.home import render_home_page
 from pages.history import render_history_page
 from config.settings import Config
@@ -23,7 +24,8 @@ init_session_state()
 def main():
     """Main application function."""
     # Initialize auth manager
-    auth = AuthManager()
+    auth = get_auth_manager()
+    auth.sync_cookie()
     
     # Custom CSS
     st.markdown("""
@@ -127,7 +129,11 @@ def main():
         
         # API status
         if validate_api_configuration():
-            st.success("🤖 AI Agent: Connected")
+            breakers = circuit_breaker_metrics().values()
+            if any(metrics["state"] == "open" for metrics in breakers):
+                st.warning("🤖 AI Agent: Temporarily unavailable")
+            else:
+                st.success("🤖 AI Agent: Connected")
         else:
             st.warning("🤖 AI Agent: Fallback Mode")
     
@@ -0,0 +1,84 @@
+"""Compare on-disk size and entry write/read latency for each text compression setting.
+
+Run from the project root:
+
+    python -m benchmarks.bench_compression --rows 20000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from itertools import islice
+from typing import Dict, Iterator
+from unittest.mock import patch
+from database import compression
+from database.compression import COMPRESSED_COLUMNS, CODECS, store_dictionary, train_dictionary
+from database.db_manager import DatabaseManager
+from benchmarks.bench_search import sentence
+from benchmarks.bench_transfer import generate_rows
+from config.settings import Config
+
+HEADINGS = ("## Inner Reflection Summary", "## Dream Interpretation", "## Energy/Mindset Insight",
+            "## Suggested Day Strategy")
+
+def reflection_rows(rows: int, seed: int = 7) -> Iterator[Dict[str, str]]:
+    """Import rows whose reflections have the section layout of generated ones."""
+    rng = random.Random(seed)
+    for row in generate_rows(rows, seed):
+        sections = [sentence(rng, 40) for _ in HEADINGS]
+        row['reflection'] = "\n\n".join(f"{heading}\n{text}" for heading, text in zip(HEADINGS, sections))
+        row['reflection_summary'], row['dream_interpretation'], row['mindset_insight'] = sections[:3]
+        yield row
+
+def stored_text_bytes(db: DatabaseManager) -> int:
+    columns = ' + '.join(f"coalesce(length(CAST({column} AS BLOB)), 0)" for column in COMPRESSED_COLUMNS)
+    with db.pool.connection() as conn:
+        return conn.execute(f"SELECT sum({columns}) FROM entries").fetchone()[0]
+
+def run(label: str, codec, dictionary: bool, rows: int, reads: int, tmp_dir: str):
+    path = os.path.join(tmp_dir, f"{label}.db")
+    with patch.object(Config, 'TEXT_COMPRESSION', codec):
+        db = DatabaseManager(path)
+    if dictionary:
+        # Trained on entries other than the measured ones, as it would be in use
+        samples = [row[column] for row in reflection_rows(1000, seed=11) for column in ('journal', 'reflection')]
+        with db.pool.connection() as conn:
+            store_dictionary(conn, CODECS[codec], train_dictionary(CODECS[codec], samples))
+        db.pool.codec.reset()
+
+    start = time.perf_counter()
+    db.import_entries(reflection_rows(rows))
+    write_us = (time.perf_counter() - start) / rows * 1e6
+
+    dates = [row['date'] for row in islice(generate_rows(rows), 0, rows, max(1, rows // reads))]
+    random.Random(3).shuffle(dates)
+    start = time.perf_counter()
+    for date in dates:
+        db.get_entry_by_date(date)
+    read_us = (time.perf_counter() - start) / len(dates) * 1e6
+
+    text_bytes = stored_text_bytes(db)
+    with db.pool.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.close()
+    print(f"{label:<10} {os.path.getsize(path) / 2 ** 20:>9.1f} {text_bytes / 2 ** 20:>10.1f} "
+          f"{write_us:>12.1f} {read_us:>11.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    settings = [("none", None, False), ("zlib", "zlib", False), ("zlib+dict", "zlib", True)]
+    if compression.zstandard:
+        settings += [("zstd", "zstd", False), ("zstd+dict", "zstd", True)]
+    print(f"{args.rows:,} entries")
+    print(f"{'setting':<10} {'file MiB':>9} {'text MiB':>10} {'write µs/row':>12} {'read µs/row':>11}")
+    for label, codec, dictionary in settings:
+        run(label, codec, dictionary, args.rows, args.reads, tmp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare per-call sqlite3.connect() against the pooled DatabaseManager.
+
+Run from the project root:
+
+    python -m benchmarks.bench_db_connections --ops 5000 --threads 4
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from database.db_manager import DatabaseManager, SELECT_ENTRY_BY_DATE_SQL
+from database.migrations import LEGACY_USER_ID
+from database.models import JournalEntry
+
+def per_call_lookup(db_path: str, date: str):
+    """The original access pattern: open, query and close a connection per call."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(SELECT_ENTRY_BY_DATE_SQL, (LEGACY_USER_ID, date))
+        cursor.fetchone()
+    conn.close()
+
+def run(label: str, fn, ops: int, threads: int):
+    """Run fn ops times split across threads and print ops/sec."""
+    per_thread = ops // threads
+
+    def worker():
+        for i in range(per_thread):
+            fn(f"2024-01-{i % 28 + 1:02d}")
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {per_thread * threads / elapsed:>12,.0f} ops/sec")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "bench.db")
+    db = DatabaseManager(db_path)
+    for day in range(1, 29):
+        db.save_entry(JournalEntry(
+            date=f"2024-01-{day:02d}",
+            journal="journal " * 50,
+            intention="intention",
+            dream="dream",
+            priorities="1. one\n2. two\n3. three",
+            reflection="reflection " * 200,
+            strategy="strategy " * 50
+        ))
+
+    print(f"get_entry_by_date, {args.ops} ops, {args.threads} threads")
+    run("per-call", lambda d: per_call_lookup(db_path, d), args.ops, args.threads)
+    run("pooled", db.get_entry_by_date, args.ops, args.threads)
+    db.close()
+
+if __name__ == "__main__":
+    main()
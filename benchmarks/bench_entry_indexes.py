@@ -0,0 +1,86 @@
+"""Measure one user's entries lookups on a large shared table before and after the indexes.
+
+Run from the project root:
+
+    python -m benchmarks.bench_entry_indexes --rows 100000 --users 100
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+from datetime import date, timedelta
+from database.db_manager import SELECT_ENTRY_BY_DATE_SQL, SELECT_ALL_DATES_SQL
+from database.migrations import LEGACY_USER_ID, run_migrations
+
+def populate(conn: sqlite3.Connection, rows: int, users: int):
+    """Insert rows for `users` users, each with one entry per day."""
+    conn.executemany(
+        'INSERT INTO users (username) VALUES (?)', [(f"user{n}",) for n in range(2, users + 1)]
+    )
+    start = date(2000, 1, 1)
+    batch = []
+    for i in range(rows):
+        user_id, n = i % users + 1, i // users
+        day = (start + timedelta(days=n)).isoformat()
+        batch.append((user_id, day, "journal " * 20, "intention", "dream", "priorities",
+                      "reflection " * 50, "strategy", f"{day} 07:00:00"))
+        if len(batch) == 10000:
+            conn.executemany('''
+                INSERT INTO entries (user_id, date, journal, intention, dream, priorities, reflection, strategy,
+                                     created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            batch = []
+    if batch:
+        conn.executemany('''
+            INSERT INTO entries (user_id, date, journal, intention, dream, priorities, reflection, strategy,
+                                 created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+    conn.commit()
+
+def timed(conn: sqlite3.Connection, sql: str, params=(), repeat: int = 20) -> float:
+    """Return the median latency of a query in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def report(conn: sqlite3.Connection, label: str, probe_date: str):
+    by_date = timed(conn, SELECT_ENTRY_BY_DATE_SQL, (LEGACY_USER_ID, probe_date))
+    all_dates = timed(conn, SELECT_ALL_DATES_SQL, (LEGACY_USER_ID,), repeat=5)
+    print(f"{label:<8} get_entry_by_date {by_date:>9.3f} ms   get_all_dates {all_dates:>9.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    run_migrations(conn)
+    # Measure the current queries without, then with, the schema's entries indexes
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'entries' AND sql IS NOT NULL"
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX {name}')
+    conn.execute('BEGIN')
+    populate(conn, args.rows, args.users)
+    probe_date = (date(2000, 1, 1) + timedelta(days=args.rows // args.users // 2)).isoformat()
+
+    print(f"{args.rows:,} rows, {args.users:,} users")
+    report(conn, "before", probe_date)
+    for _, sql in indexes:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+    report(conn, "after", probe_date)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compare per-request connections with the shared keep-alive session.
+
+Starts a local stub of the chat completions endpoint and times sequential
+requests through module-level requests.post and through get_http_session().
+Pass --url to time a real endpoint instead (e.g. to include TLS handshakes).
+
+    python -m benchmarks.bench_http_session --requests 500
+"""
+import json
+import time
+import argparse
+import threading
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agent.http_session import get_http_session
+
+COMPLETION = json.dumps({"choices": [{"message": {"content": "## Inner Reflection Summary\nok"}}]}).encode("utf-8")
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+def measure(label: str, post, url: str, count: int):
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+    start = time.perf_counter()
+    for _ in range(count):
+        post(url, json=payload, timeout=30).content
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {elapsed / count * 1000:>8.3f} ms/request")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--url", help="endpoint to POST to instead of the local stub")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+
+    print(f"{args.requests} sequential POSTs to {url}")
+    measure("requests.post", requests.post, url, args.requests)
+    measure("shared session", get_http_session().post, url, args.requests)
+
+    if server:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Measure embedding index load time and top-k retrieval latency over a large journal.
+
+Run from the project root:
+
+    python -m benchmarks.bench_retrieval --rows 100000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+from database.db_manager import DatabaseManager
+from database.models import JournalEntry
+from retrieval.embeddings import EmbeddingIndex
+from benchmarks.bench_search import sentence
+
+def populate(db: DatabaseManager, rows: int, seed: int = 7):
+    """Save rows with one entry per day through save_entries, embeddings included."""
+    rng = random.Random(seed)
+    start = date(1000, 1, 1)
+    for offset in range(0, rows, 10000):
+        db.save_entries([
+            JournalEntry(date=(start + timedelta(days=i)).isoformat(), journal=sentence(rng, 60),
+                         intention=sentence(rng, 6), dream=sentence(rng, 20), priorities=sentence(rng, 12))
+            for i in range(offset, min(offset + 10000, rows))
+        ])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    start = time.perf_counter()
+    populate(db, args.rows)
+    print(f"{args.rows:,} entries saved and embedded in {time.perf_counter() - start:.1f}s")
+
+    index = EmbeddingIndex(db.db_path, db.user_id)
+    start = time.perf_counter()
+    loaded = index.refresh()
+    print(f"{loaded:,} vectors loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for query in ("anxious about the presentation meeting", "lighthouse", "calm morning walk by the ocean"):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            matches = index.search(query, k=3, min_score=0.0)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"{query!r:<42} {len(matches)} matches  median {samples[len(samples) // 2]:>7.2f} ms")
+    db.close()
+
+if __name__ == "__main__":
+    main()
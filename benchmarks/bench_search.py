@@ -0,0 +1,75 @@
+"""Measure DatabaseManager.search() latency for one user of a large shared journal.
+
+Run from the project root:
+
+    python -m benchmarks.bench_search --rows 1000000 --users 100
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+from database.db_manager import DatabaseManager
+
+WORDS = (
+    "calm anxious grateful tired presentation meeting family run walk focus sleep dream flying "
+    "water city forest work deadline friend coffee rain sunlight project energy intention breath "
+    "patience clarity gratitude journal morning evening garden music ocean mountain train letter"
+).split()
+RARE_WORDS = ["lighthouse", "saxophone", "origami", "volcano", "hummingbird"]
+
+def sentence(rng: random.Random, length: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(length)]
+    if rng.random() < 0.001:
+        words[rng.randrange(length)] = rng.choice(RARE_WORDS)
+    return " ".join(words)
+
+def populate(db: DatabaseManager, rows: int, users: int = 1, seed: int = 7):
+    """Insert rows with one entry per user per day, then build the search index over them."""
+    rng = random.Random(seed)
+    start = date(1000, 1, 1)
+    user_ids = [db.user_id] + [db.ensure_user(f"user{n}") for n in range(2, users + 1)]
+    with db.pool.connection() as conn:
+        batch = []
+        for i in range(rows):
+            batch.append((user_ids[i % users], (start + timedelta(days=i // users)).isoformat(), sentence(rng, 60),
+                          sentence(rng, 6), sentence(rng, 20), sentence(rng, 12), sentence(rng, 120),
+                          sentence(rng, 30)))
+            if len(batch) == 10000:
+                conn.executemany('''
+                    INSERT INTO entries (user_id, date, journal, intention, dream, priorities, reflection, strategy)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', batch)
+                batch = []
+        if batch:
+            conn.executemany('''
+                INSERT INTO entries (user_id, date, journal, intention, dream, priorities, reflection, strategy)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+    db.rebuild_search_index()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1, help="users the rows are spread over; one is searched")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    start = time.perf_counter()
+    populate(db, args.rows, args.users)
+    print(f"{args.rows:,} rows for {args.users:,} users indexed in {time.perf_counter() - start:.1f}s")
+
+    for query in ("lighthouse", "saxophone origami", "presentation anxious", "hummingbirds", "calm"):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = db.search(query, limit=20)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"{query!r:<24} {len(results):>3} results  median {samples[len(samples) // 2]:>8.2f} ms")
+    db.close()
+
+if __name__ == "__main__":
+    main()
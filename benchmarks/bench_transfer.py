@@ -0,0 +1,61 @@
+"""Measure export and import throughput and peak Python memory for each transfer format.
+
+Run from the project root:
+
+    python -m benchmarks.bench_transfer --rows 100000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from typing import Dict, Iterator
+from database import transfer
+from database.db_manager import DatabaseManager
+from database.transfer import export_entries, import_entries
+from benchmarks.bench_search import sentence
+
+def generate_rows(rows: int, seed: int = 7) -> Iterator[Dict[str, str]]:
+    """Yield import rows with one entry per day, without building a list."""
+    rng = random.Random(seed)
+    start = date(1000, 1, 1)
+    for i in range(rows):
+        yield {
+            'date': (start + timedelta(days=i)).isoformat(), 'journal': sentence(rng, 60),
+            'intention': sentence(rng, 6), 'dream': sentence(rng, 20), 'priorities': sentence(rng, 12),
+            'reflection': sentence(rng, 120), 'strategy': sentence(rng, 30)
+        }
+
+def measured(label: str, rows: int, action):
+    """Run action untraced for its rows per second, then again under tracemalloc for its peak memory."""
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<16} {rows / elapsed:>10,.0f} rows/s   peak {peak / 2 ** 20:>7.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db = DatabaseManager(os.path.join(tmp_dir, "bench.db"))
+    db.import_entries(generate_rows(args.rows))
+    print(f"{args.rows:,} entries")
+
+    for fmt in ("jsonl", "csv") + (("parquet",) if transfer.pa else ()):
+        path = os.path.join(tmp_dir, f"backup.{fmt}")
+        measured(f"export {fmt}", args.rows, lambda: export_entries(db, path))
+        # The second run overwrites every entry, archiving the first run's as revisions
+        target = db.for_user(db.ensure_user(f"restored_{fmt}"))
+        measured(f"import {fmt}", args.rows, lambda: import_entries(target, path))
+    db.close()
+
+if __name__ == "__main__":
+    main()
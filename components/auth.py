@@ -1,38 +1,91 @@
 import streamlit as st
 import streamlit_authenticator as stauth
+import extra_streamlit_components as stx
 import bcrypt
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, Optional
+from database.backend import StorageBackend
+from database.db_manager import get_database_manager
+from database.models import User
+from components.sessions import SessionStore
 from config.settings import Config
 
+# Accounts stored on first start. Only their bcrypt hashes are kept, in the
+# users table, so no process re-hashes them after that.
+SEED_USERS = {
+    'demo_user': {
+        'name': 'Demo User',
+        'password': 'demo123',
+        'email': 'demo@consciousday.app'
+    },
+    # ADD NEW USER HERE
+    'your_username': {
+        'name': 'Your Name',
+        'password': 'your_password',
+        'email': 'your@email.com'
+    }
+}
+
 class AuthManager:
-    def __init__(self):
+    """Password login against the users table, shared by every session (see get_auth_manager).
+
+    bcrypt checks run on a small worker pool, so a burst of logins cannot take
+    more than AUTH_VERIFY_WORKERS cores away from other sessions' reruns. A login
+    also sets a signed session cookie, so a returning browser is let in by
+    SessionStore without a password or a bcrypt check.
+    """
+
+    def __init__(self, db: Optional[StorageBackend] = None):
         self.cookie_name = Config.AUTH_COOKIE_NAME
         self.cookie_key = Config.AUTH_COOKIE_KEY
         self.cookie_expiry_days = Config.AUTH_COOKIE_EXPIRY_DAYS
-        
-        # Simple user database (in production, use proper database)
-        self.users = {
-            'demo_user': {
-                'name': 'Demo User',
-                'password': self._hash_password('demo123'),
-                'email': 'demo@consciousday.app'
-            },
-            # ADD NEW USER HERE
-            'your_username': {
-                'name': 'Your Name',
-                'password': self._hash_password('your_password'),
-                'email': 'your@email.com'
-            }
-        }
+        self.db = db or get_database_manager()
+        self.executor = ThreadPoolExecutor(max_workers=Config.AUTH_VERIFY_WORKERS, thread_name_prefix="auth-verify")
+        self.sessions = SessionStore(self.db)
+        self._seed_users()
+    
+    def _seed_users(self):
+        """Store a hash for each seed account that has no password yet."""
+        for username, info in SEED_USERS.items():
+            user = self.db.get_user(username)
+            if user is None or not user.password_hash:
+                self.db.save_user(User(
+                    username=username,
+                    name=info['name'],
+                    email=info['email'],
+                    password_hash=self._hash_password(info['password'])
+                ))
+                logging.info(f"Stored password hash for {username}")
     
     def _hash_password(self, password: str) -> str:
         """Hash a password using bcrypt."""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS)).decode('utf-8')
     
     def _verify_password(self, password: str, hashed: str) -> bool:
         """Verify a password against its hash."""
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
     
+    def verify(self, user: User, password: str) -> bool:
+        """Check a password on the verification pool, re-hashing it if the stored cost is outdated.
+
+        A stored hash that is not a valid bcrypt hash fails the check.
+        """
+        try:
+            if not self.executor.submit(self._verify_password, password, user.password_hash).result():
+                return False
+            # bcrypt hashes read $2b$<rounds>$<salt and hash>
+            rounds = int(user.password_hash.split('$')[2])
+        except (ValueError, IndexError) as e:
+            logging.error(f"Invalid password hash stored for {user.username}: {e}")
+            return False
+        if rounds != Config.BCRYPT_ROUNDS:
+            user.password_hash = self.executor.submit(self._hash_password, password).result()
+            self.db.save_user(user)
+        return True
+    
     def login_form(self) -> Optional[str]:
         """Display login form and handle authentication."""
         with st.form("login_form"):
@@ -45,11 +98,17 @@ class AuthManager:
             submitted = st.form_submit_button("Login")
             
             if submitted:
-                if username in self.users:
-                    if self._verify_password(password, self.users[username]['password']):
+                user = self.db.get_user(username)
+                if user and user.password_hash:
+                    if self.verify(user, password):
                         st.session_state['authenticated'] = True
+                        st.session_state['user_id'] = user.id
                         st.session_state['username'] = username
-                        st.session_state['name'] = self.users[username]['name']
+                        st.session_state['name'] = user.name
+                        token = self.sessions.issue(user)
+                        if token:
+                            st.session_state['session_token'] = token
+                            st.session_state['pending_cookie'] = token
                         st.success("Login successful!")
                         st.rerun()
                         return username
@@ -62,18 +121,63 @@ class AuthManager:
     
     def logout(self):
         """Handle user logout."""
-        for key in ['authenticated', 'username', 'name']:
+        token = st.session_state.get('session_token')
+        if token:
+            self.sessions.revoke(token)
+            st.session_state['pending_cookie'] = ""
+        for key in ['authenticated', 'user_id', 'username', 'name', 'session_token']:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
     
+    def sync_cookie(self):
+        """Set or clear the session cookie as requested by the previous run.
+        
+        Cookies are written by a browser component, which a st.rerun() in the
+        same run would discard, so login and logout leave the change for the
+        next run to make.
+        """
+        if 'pending_cookie' not in st.session_state:
+            return
+        token = st.session_state.pop('pending_cookie')
+        cookies = stx.CookieManager(key="auth_cookies")
+        if token:
+            expires_at = datetime.now() + timedelta(days=self.cookie_expiry_days)
+            cookies.set(self.cookie_name, token, key="auth_cookie_set", expires_at=expires_at)
+        else:
+            cookies.set(self.cookie_name, "", key="auth_cookie_clear", expires_at=datetime(1970, 1, 1))
+    
+    def _restore_session(self) -> bool:
+        """Log in from a valid session cookie sent by a returning browser."""
+        token = st.context.cookies.get(self.cookie_name)
+        session = self.sessions.validate(token) if token else None
+        if session is None:
+            return False
+        st.session_state['authenticated'] = True
+        st.session_state['user_id'] = session.user_id
+        st.session_state['username'] = session.username
+        st.session_state['name'] = session.name
+        st.session_state['session_token'] = token
+        return True
+    
     def is_authenticated(self) -> bool:
         """Check if user is authenticated."""
-        return st.session_state.get('authenticated', False)
+        if st.session_state.get('authenticated', False) and 'user_id' in st.session_state:
+            return True
+        return self._restore_session()
+    
+    def get_user_id(self) -> Optional[int]:
+        """Get the current user's id, which scopes every database query."""
+        return st.session_state.get('user_id')
     
     def get_user_info(self) -> Dict[str, str]:
         """Get current user information."""
         return {
             'username': st.session_state.get('username', ''),
             'name': st.session_state.get('name', '')
-        }
\ No newline at end of file
+        }
+
+@lru_cache(maxsize=None)
+def get_auth_manager() -> AuthManager:
+    """Return the process-wide AuthManager, so reruns do not rebuild it."""
+    return AuthManager()
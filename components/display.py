@@ -1,6 +1,14 @@
 import streamlit as st
 from database.models import JournalEntry
-from typing import Dict
+from agent.streaming import IncrementalSectionParser
+from typing import Dict, Iterable
+
+STREAM_SECTION_TITLES = {
+    'reflection': "🪞 Inner Reflection Summary",
+    'dream_interpretation': "🌙 Dream Interpretation",
+    'mindset_insight': "🧠 Energy & Mindset Insight",
+    'strategy': "🎯 Suggested Day Strategy",
+}
 
 class DisplayManager:
     def __init__(self):
@@ -49,6 +57,52 @@ class DisplayManager:
         # Show save confirmation
         st.info(f"💾 Entry saved for {entry_date}")
     
+    def stream_reflection_results(self, chunks: Iterable[str]) -> str:
+        """Render each section as soon as its header streams in; return the full text."""
+        parser = IncrementalSectionParser()
+        placeholders = {}
+        raw_placeholder = st.empty()
+        received = []
+        
+        for chunk in chunks:
+            received.append(chunk)
+            changed = parser.feed(chunk)
+            sections = parser.sections
+            
+            for key in changed:
+                if key not in placeholders:
+                    st.markdown(f"### {STREAM_SECTION_TITLES[key]}")
+                    placeholders[key] = st.empty()
+                placeholders[key].markdown(sections[key])
+            
+            if not placeholders:
+                # Nothing recognisable yet (or the model ignored the format)
+                raw_placeholder.markdown("".join(received))
+        
+        sections = parser.close()
+        if placeholders:
+            raw_placeholder.empty()
+            for key, placeholder in placeholders.items():
+                placeholder.markdown(sections.get(key, ""))
+        
+        st.success("✨ Your reflection has been generated!")
+        return "".join(received)
+    
+    def display_partial_reflection(self, response: str):
+        """Render the sections of a reflection that is still being generated."""
+        parser = IncrementalSectionParser()
+        parser.feed(response)
+        sections = parser.sections
+        
+        if not sections:
+            st.markdown(response)
+            return
+        
+        for key, title in STREAM_SECTION_TITLES.items():
+            if key in sections:
+                st.markdown(f"### {title}")
+                st.markdown(sections[key])
+    
     def display_historical_entry(self, entry: JournalEntry):
         """Display a historical journal entry."""
         st.markdown(f"## 📖 Journal Entry - {entry.date}")
@@ -75,12 +129,10 @@ class DisplayManager:
         # AI Analysis section
         st.markdown("### AI Analysis & Strategy")
         
-        # Parse the full response into sections
-        full_response = entry.reflection if entry.reflection else entry.strategy
+        # Sections were parsed once when the entry was saved
+        sections = entry.sections
         
-        if "## Inner Reflection Summary" in full_response:
-            sections = self._parse_response_sections(full_response)
-            
+        if entry.reflection_summary or entry.dream_interpretation or entry.mindset_insight:
             tab1, tab2, tab3, tab4 = st.tabs([
                 "🪞 Inner Reflection", 
                 "🌙 Dream Insights", 
@@ -107,44 +159,6 @@ class DisplayManager:
             st.markdown("**Strategy:**")
             st.markdown(entry.strategy)
     
-    def _parse_response_sections(self, response: str) -> Dict[str, str]:
-        """Parse AI response into sections."""
-        sections = {}
-        current_section = None
-        current_content = []
-        
-        lines = response.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('## Inner Reflection Summary'):
-                current_section = 'reflection'
-                current_content = []
-            elif line.startswith('## Dream Interpretation Summary'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'dream_interpretation'
-                current_content = []
-            elif line.startswith('## Energy/Mindset Insight'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'mindset_insight'
-                current_content = []
-            elif line.startswith('## Suggested Day Strategy'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = 'strategy'
-                current_content = []
-            elif current_section and line:
-                current_content.append(line)
-        
-        # Add the last section
-        if current_section and current_content:
-            sections[current_section] = '\n'.join(current_content).strip()
-        
-        return sections
-    
     def display_error(self, error_message: str):
         """Display error message."""
         st.error(f"❌ {error_message}")
@@ -1,6 +1,7 @@
 import streamlit as st
 from datetime import datetime, date
 from typing import Dict, Optional
+from utils.helpers import format_date, truncate_text
 
 class JournalForm:
     def __init__(self):
@@ -81,21 +82,110 @@ class DateSelector:
     def __init__(self, db_manager):
         self.db_manager = db_manager
     
+    @staticmethod
+    def _next_month_start(date_str: str) -> str:
+        year, month = int(date_str[:4]), int(date_str[5:7])
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return f"{year:04d}-{month:02d}-01"
+    
     def render_date_selector(self) -> Optional[str]:
-        """Render date selector for historical entries."""
+        """Render a month-at-a-time date selector for historical entries."""
         st.subheader("📅 View Previous Reflections")
         
-        available_dates = self.db_manager.get_all_dates()
+        month = st.session_state.get('history_month')
+        if not month:
+            latest = self.db_manager.get_dates_page(limit=1)
+            if not latest:
+                st.info("No previous entries found. Create your first journal entry!")
+                return None
+            month = latest[0][:7]
+        
+        # A month holds at most 31 dates, so one keyset page covers it
+        intentions = {
+            summary.date: summary.intention
+            for summary in self.db_manager.get_entry_summaries(before=self._next_month_start(month), limit=31)
+            if summary.date.startswith(month)
+        }
+        month_dates = list(intentions)
         
-        if not available_dates:
-            st.info("No previous entries found. Create your first journal entry!")
+        if not month_dates:
+            st.session_state.pop('history_month', None)
+            st.info("No entries this month.")
             return None
         
+        earlier = self.db_manager.get_dates_page(before=month_dates[-1], limit=1)
+        later = self.db_manager.get_dates_page(after=month_dates[0], limit=1)
+        
+        col1, col2, col3 = st.columns([1, 4, 1])
+        with col1:
+            if earlier and st.button("← Earlier", key="history_month_prev"):
+                st.session_state['history_month'] = earlier[0][:7]
+                st.rerun()
+        with col2:
+            st.markdown(f"**{datetime.strptime(month, '%Y-%m').strftime('%B %Y')}**")
+        with col3:
+            if later and st.button("Later →", key="history_month_next"):
+                st.session_state['history_month'] = later[0][:7]
+                st.rerun()
+        
         selected_date = st.selectbox(
             "Select a date to view:",
-            options=available_dates,
-            format_func=lambda x: datetime.strptime(x, "%Y-%m-%d").strftime("%B %d, %Y"),
-            help="Choose from your previous journal entries"
+            options=month_dates,
+            format_func=lambda d: f"{format_date(d)} — {truncate_text(intentions[d], 60)}",
+            help="Choose from your journal entries this month"
         )
         
-        return selected_date
\ No newline at end of file
+        return selected_date
+
+class SearchBox:
+    PAGE_SIZE = 10
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def render_search(self) -> Optional[str]:
+        """Render full-text search over past entries; returns the date picked from the results."""
+        query = st.text_input(
+            "🔎 Search your journal",
+            placeholder="e.g. presentation, flying, gratitude",
+            help="Find entries by words in your journal, intention, dream, priorities or reflection"
+        ).strip()
+
+        # A new query starts again from the first page with nothing selected
+        if query != st.session_state.get('search_query'):
+            st.session_state['search_query'] = query
+            st.session_state['search_page'] = 0
+            st.session_state.pop('search_selected_date', None)
+
+        if not query:
+            return None
+
+        page = st.session_state.get('search_page', 0)
+        results = self.db_manager.search(query, limit=self.PAGE_SIZE + 1, offset=page * self.PAGE_SIZE)
+        has_next = len(results) > self.PAGE_SIZE
+
+        if not results:
+            st.info("No entries match your search.")
+            return None
+
+        for result in results[:self.PAGE_SIZE]:
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.markdown(f"**{format_date(result.date)}** — {result.snippet}")
+            with col2:
+                if st.button("View", key=f"search_view_{result.entry_id}"):
+                    st.session_state['search_selected_date'] = result.date
+
+        col1, col2, col3 = st.columns([1, 4, 1])
+        with col1:
+            if page > 0 and st.button("← Previous", key="search_prev"):
+                st.session_state['search_page'] = page - 1
+                st.rerun()
+        with col2:
+            st.caption(f"Page {page + 1}")
+        with col3:
+            if has_next and st.button("Next →", key="search_next"):
+                st.session_state['search_page'] = page + 1
+                st.rerun()
+
+        return st.session_state.get('search_selected_date')
@@ -0,0 +1,105 @@
+import time
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+import jwt
+from database.backend import StorageBackend
+from database.models import User, UserSession
+from config.settings import Config
+
+ALGORITHM = "HS256"
+
+class SessionStore:
+    """Signed session tokens for the auth cookie, validated through an in-memory LRU.
+
+    A token is a JWT signed with AUTH_COOKIE_KEY whose jti names a row in the
+    sessions table. A cached token is trusted for SESSION_CACHE_TTL_SECONDS, so a
+    returning browser costs a dictionary lookup; after that, or on a miss, the
+    signature is checked and the row read again, which is where revocations by
+    other processes are noticed. Revocations in this process take effect at once.
+    """
+
+    def __init__(self, db: StorageBackend, key: str = Config.AUTH_COOKIE_KEY,
+                 expiry_days: float = Config.AUTH_COOKIE_EXPIRY_DAYS,
+                 cache_size: int = Config.SESSION_CACHE_SIZE,
+                 cache_ttl: float = Config.SESSION_CACHE_TTL_SECONDS):
+        self.db = db
+        self.key = key
+        self.expiry_seconds = int(expiry_days * 24 * 3600)
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[UserSession, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def issue(self, user: User) -> Optional[str]:
+        """Start a session for a user who just logged in; returns the cookie value."""
+        now = int(time.time())
+        session = UserSession(
+            id=secrets.token_urlsafe(16),
+            user_id=user.id,
+            username=user.username,
+            name=user.name,
+            expires_at=now + self.expiry_seconds
+        )
+        if not self.db.create_session(session):
+            return None
+        token = jwt.encode(
+            {"sub": str(user.id), "jti": session.id, "iat": now, "exp": session.expires_at},
+            self.key, algorithm=ALGORITHM
+        )
+        self._remember(token, session)
+        return token
+
+    def validate(self, token: str) -> Optional[UserSession]:
+        """The session a cookie value belongs to, or None if it is forged, expired or revoked."""
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached:
+                session, checked_at = cached
+                if now - checked_at < self.cache_ttl and now < session.expires_at:
+                    self._cache.move_to_end(token)
+                    return session
+                del self._cache[token]
+
+        claims = self._decode(token)
+        if claims is None:
+            return None
+        session = self.db.get_session(claims["jti"])
+        if session is None or str(session.user_id) != claims["sub"]:
+            return None
+        self._remember(token, session)
+        return session
+
+    def revoke(self, token: str) -> bool:
+        """End the session a cookie value belongs to, in every process."""
+        with self._lock:
+            self._cache.pop(token, None)
+        claims = self._decode(token, verify_exp=False)
+        return claims is not None and self.db.revoke_sessions(session_id=claims["jti"]) > 0
+
+    def revoke_user(self, user_id: int) -> int:
+        """End every session of a user (e.g. after a password change); returns how many."""
+        with self._lock:
+            for token in [token for token, (session, _) in self._cache.items() if session.user_id == user_id]:
+                del self._cache[token]
+        return self.db.revoke_sessions(user_id=user_id)
+
+    def _decode(self, token: str, verify_exp: bool = True) -> Optional[dict]:
+        try:
+            return jwt.decode(
+                token, self.key, algorithms=[ALGORITHM],
+                options={"require": ["exp", "jti", "sub"], "verify_exp": verify_exp}
+            )
+        except jwt.InvalidTokenError as e:
+            logging.info(f"Rejected session token: {e}")
+            return None
+
+    def _remember(self, token: str, session: UserSession):
+        with self._lock:
+            self._cache[token] = (session, time.time())
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
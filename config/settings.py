@@ -7,13 +7,75 @@ load_dotenv()
 class Config:
     # Database
     DATABASE_PATH = "entries.db"
+    # A postgresql:// URL stores everything in PostgreSQL instead (needs asyncpg),
+    # so several app replicas can share one database
+    DATABASE_URL = os.getenv("DATABASE_URL", "")
+    DATABASE_POOL_SIZE = 8
+    DATABASE_BUSY_TIMEOUT = 5.0  # seconds
+    DATABASE_CACHED_STATEMENTS = 64
+    ENTRY_BATCH_SIZE = 1000  # rows per executemany/fetchmany in bulk saves, imports and exports
+    # Compression of the journal and reflection text: None, "zlib", or "zstd" (needs
+    # zstandard). Existing rows stay readable whatever this is set to.
+    TEXT_COMPRESSION = None
+    TEXT_COMPRESSION_LEVEL = 6
+    TEXT_COMPRESSION_MIN_BYTES = 64  # shorter text is stored as is
+    TEXT_COMPRESSION_DICTIONARY_SIZE = 16384  # bytes; zlib uses at most 32 KiB
+    TEXT_COMPRESSION_DICTIONARY_SAMPLES = 2000  # newest entries a dictionary is trained from
+    SEARCH_CANDIDATE_WINDOW = 2000  # newest matches, ranked ahead of older ones
+    SEARCH_RANK_MAX_MATCHES = 20000  # commoner words are listed newest first instead of by bm25
+    # Account that owns the entries written before storage was per user
+    LEGACY_USERNAME = os.getenv("LEGACY_USERNAME", "demo_user")
     
     # API Configuration
     OPENROUTER_API_KEY = st.secrets["OPENROUTER_API_KEY"]
     OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+    HTTP_POOL_CONNECTIONS = 4  # distinct hosts kept warm
+    HTTP_POOL_MAXSIZE = 32  # concurrent keep-alive connections per host
+    LLM_REQUEST_TIMEOUT = 30  # seconds
+    
+    # Resilience: retries for transient failures, circuit breaker per model
+    RETRY_MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 0.5  # seconds
+    RETRY_MAX_DELAY = 8.0  # seconds; longer Retry-After values are not waited for
+    CIRCUIT_FAILURE_THRESHOLD = 5
+    CIRCUIT_RESET_TIMEOUT = 60.0  # seconds
     
     # Model Configuration
     DEFAULT_MODEL = "anthropic/claude-3-haiku"
+    STREAM_RESPONSES = True
+    # Ask for a JSON object (response_format json_schema) instead of markdown headers.
+    # Applies to blocking and fan-out generation; streamed responses stay markdown.
+    STRUCTURED_OUTPUT = False
+    
+    # Prompt Token Budget
+    TOKEN_ENCODING = "cl100k_base"  # used when tiktoken is installed; otherwise ~4 chars/token
+    PROMPT_INPUT_TOKEN_BUDGET = 3000  # journal, intention, dream and priorities combined
+    PROMPT_CACHE_CONTROL = True  # mark the static prompt prefix for provider prompt caching
+    
+    # Past-Entry Retrieval
+    RETRIEVAL_ENABLED = True  # add related past entries to the prompt
+    EMBEDDING_DIM = 512
+    RETRIEVAL_TOP_K = 3
+    RETRIEVAL_MIN_SCORE = 0.1  # cosine similarity below which a past entry is not used
+    CONTEXT_TOKEN_BUDGET = 600
+    RETRIEVAL_CACHED_USERS = 64  # per-user embedding indexes kept in memory
+    # Extra models for ConsciousDayAgent.agenerate_reflection fan-out (empty = DEFAULT_MODEL only)
+    FANOUT_MODELS = []
+    HEDGE_DELAY_SECONDS = 0.0
+    FANOUT_MAX_WORKERS = 16
+    
+    # Response cache
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_PATH = "response_cache.db"
+    RESPONSE_CACHE_MEMORY_ENTRIES = 256
+    RESPONSE_CACHE_DISK_ENTRIES = 5000
+    RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+    
+    # Background reflection jobs
+    BACKGROUND_JOBS = True
+    JOB_WORKERS = 8
+    JOB_POLL_INTERVAL = 0.5  # seconds between page reruns while a job runs
+    JOB_STALE_SECONDS = 300  # running jobs older than this are assumed abandoned
     
     # App Configuration
     APP_TITLE = "ConsciousDay Agent"
@@ -22,4 +84,8 @@ class Config:
     # Authentication
     AUTH_COOKIE_NAME = "consciousday_auth"
     AUTH_COOKIE_KEY = st.secrets["AUTH_COOKIE_KEY"]
-    AUTH_COOKIE_EXPIRY_DAYS = 30
\ No newline at end of file
+    AUTH_COOKIE_EXPIRY_DAYS = 30
+    SESSION_CACHE_SIZE = 1024  # validated session cookies kept in memory
+    SESSION_CACHE_TTL_SECONDS = 60  # longest a revocation by another process can go unnoticed
+    BCRYPT_ROUNDS = 12  # cost of new password hashes; older hashes are upgraded at login
+    AUTH_VERIFY_WORKERS = 2  # concurrent bcrypt checks across all sessions
\ No newline at end of file
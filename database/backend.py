@@ -0,0 +1,196 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from database.models import EntrySummary, JournalEntry, JournalStats, ReflectionJob, SearchResult, User, UserSession
+from config.settings import Config
+
+# Columns of an exported entry, in file order; ids are not exported
+EXPORT_COLUMNS = (
+    'date', 'journal', 'intention', 'dream', 'priorities', 'reflection', 'strategy',
+    'reflection_summary', 'dream_interpretation', 'mindset_insight', 'created_at'
+)
+POSTGRES_SCHEMES = ('postgres://', 'postgresql://')
+
+def is_postgres_url(location: str) -> bool:
+    """Whether a database location is a PostgreSQL URL rather than a SQLite file path."""
+    return location.startswith(POSTGRES_SCHEMES)
+
+class StorageBackend(ABC):
+    """Entry, job, account and statistics storage for one user of a database.
+
+    The app only talks to storage through these methods, so it runs unchanged on
+    any implementation: DatabaseManager (a SQLite file) or PostgresDatabaseManager
+    (a PostgreSQL server shared by several app replicas). get_database_manager()
+    picks one from the configured location. Managers for different users of the
+    same database share its connection pool; use for_user() to get one from another.
+
+    Unless a method says otherwise, errors are logged and an empty result
+    (False, None, 0, [] or {}) is returned.
+    """
+
+    # The SQLite file or PostgreSQL URL, and the user every entry and job method is scoped to
+    db_path: str
+    user_id: int
+
+    @abstractmethod
+    def for_user(self, user_id: int) -> 'StorageBackend':
+        """A manager for the same database scoped to another user."""
+
+    @abstractmethod
+    def close(self):
+        """Close the pooled connections for this database."""
+
+    @abstractmethod
+    def ensure_user(self, username: str, name: str = "", email: str = "") -> Optional[int]:
+        """Return the id of the account with this username, creating it first if needed."""
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[User]:
+        """Retrieve an account, with its password hash, by username."""
+
+    @abstractmethod
+    def save_user(self, user: User) -> Optional[int]:
+        """Create or update an account by username and return its id."""
+
+    @abstractmethod
+    def create_session(self, session: UserSession) -> bool:
+        """Record a new login session, dropping expired ones."""
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[UserSession]:
+        """Retrieve a login session unless it has expired or been revoked."""
+
+    @abstractmethod
+    def revoke_sessions(self, session_id: Optional[str] = None, user_id: Optional[int] = None) -> int:
+        """Revoke one session, or every session of a user; returns how many were revoked."""
+
+    @abstractmethod
+    def save_entry(self, entry: JournalEntry) -> bool:
+        """Save an entry, overwriting the date's existing one and keeping it as a revision."""
+
+    @abstractmethod
+    def save_entries(self, entries: List[JournalEntry]) -> int:
+        """Save many entries in a single transaction; returns the number saved."""
+
+    @abstractmethod
+    def export_rows(self, batch_size: int = Config.ENTRY_BATCH_SIZE) -> Iterator[List[tuple]]:
+        """Stream this user's entries, oldest first, as lists of EXPORT_COLUMNS tuples from one snapshot.
+
+        Errors are raised, not logged, so a backup is never silently cut short.
+        """
+
+    @abstractmethod
+    def import_entries(self, rows: Iterable[Dict[str, Any]], batch_size: int = Config.ENTRY_BATCH_SIZE) -> int:
+        """Save rows keyed by EXPORT_COLUMNS, one transaction per batch; returns the number saved.
+
+        A bad row stops the import; the batches before it stay saved.
+        """
+
+    @abstractmethod
+    def get_entry_by_date(self, date: str, deferred: bool = False) -> Optional[JournalEntry]:
+        """Retrieve an entry by date; with deferred, its DEFERRED_FIELDS are fetched on first access."""
+
+    @abstractmethod
+    def get_revisions(self, date: str) -> List[JournalEntry]:
+        """Earlier versions of the entry for a date, newest first; they share the entry's id."""
+
+    @abstractmethod
+    def get_all_dates(self) -> List[str]:
+        """Get all dates with entries, newest first."""
+
+    @abstractmethod
+    def get_entries_by_ids(self, entry_ids: List[int]) -> Dict[int, JournalEntry]:
+        """Retrieve several entries by id, with their journal and intention; other text is deferred."""
+
+    @abstractmethod
+    def get_entry_summaries(self, before: Optional[str] = None, limit: int = 31) -> List[EntrySummary]:
+        """Get one keyset page of entry summaries, newest first, strictly before `before`."""
+
+    @abstractmethod
+    def get_dates_page(self, before: Optional[str] = None, after: Optional[str] = None,
+                       limit: int = 31) -> List[str]:
+        """Get one keyset page of dates: newest first before `before`, or oldest first after `after`."""
+
+    @abstractmethod
+    def get_stats(self) -> JournalStats:
+        """Get the precomputed journaling statistics."""
+
+    @abstractmethod
+    def entry_exists_for_date(self, date: str) -> bool:
+        """Check if an entry exists for a given date."""
+
+    @abstractmethod
+    def get_embeddings(self, after_seq: int = 0) -> List[Tuple[int, int, str, bytes]]:
+        """(seq, entry id, date, vector) of this user's entry embeddings saved after a sequence number, in order."""
+
+    @abstractmethod
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[SearchResult]:
+        """Full-text search over entries with snippets highlighting matches in **bold**, best first."""
+
+    @abstractmethod
+    def train_compression_dictionary(self, samples: int = Config.TEXT_COMPRESSION_DICTIONARY_SAMPLES) -> Optional[int]:
+        """Train a shared dictionary for entry text compression; returns its id, or None if not supported."""
+
+    @abstractmethod
+    def create_job(self, job: ReflectionJob) -> bool:
+        """Persist a new pending reflection job."""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[ReflectionJob]:
+        """Retrieve a reflection job by id."""
+
+    @abstractmethod
+    def claim_job(self, job_id: str) -> bool:
+        """Move a pending job to running; False if another worker already took it."""
+
+    @abstractmethod
+    def complete_job(self, job_id: str, entry: JournalEntry, results: Dict[str, str]) -> Optional[int]:
+        """Save the job's entry and mark it done in one transaction; returns the entry id."""
+
+    @abstractmethod
+    def fail_job(self, job_id: str, error: str) -> bool:
+        """Mark a job as failed."""
+
+    @abstractmethod
+    def requeue_stale_jobs(self, stale_seconds: float) -> List[Tuple[str, int]]:
+        """Reset jobs left running by a dead process and return every pending (job id, user id), for all users."""
+
+    def _entry_params(self, entry: JournalEntry) -> tuple:
+        return (
+            self.user_id,
+            entry.date,
+            entry.journal,
+            entry.intention,
+            entry.dream,
+            entry.priorities,
+            entry.reflection,
+            entry.strategy,
+            entry.reflection_summary,
+            entry.dream_interpretation,
+            entry.mindset_insight,
+            entry.created_at
+        )
+
+    def _row_params(self, row: Dict[str, Any]) -> tuple:
+        """Entry parameters from an imported row keyed by EXPORT_COLUMNS; missing text is empty."""
+        if datetime.strptime(row['date'], "%Y-%m-%d").strftime("%Y-%m-%d") != row['date']:
+            raise ValueError(f"invalid date {row['date']!r}")
+        return (self.user_id, *(row.get(column) or '' for column in EXPORT_COLUMNS[:-1]), row.get('created_at') or None)
+
+def distinct_date_batches(params: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    """Group entry parameters, in order, into batches of at most batch_size distinct dates.
+
+    A repeated date starts a new batch, so each of its versions is archived in turn.
+    """
+    batch, dates = [], set()
+    for param in params:
+        if param[1] in dates:
+            yield batch
+            batch, dates = [], set()
+        batch.append(param)
+        dates.add(param[1])
+        if len(batch) == batch_size:
+            yield batch
+            batch, dates = [], set()
+    if batch:
+        yield batch
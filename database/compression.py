@@ -0,0 +1,163 @@
+import zlib
+import struct
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+from config.settings import Config
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd compression is unavailable, zlib still works
+    zstandard = None
+
+# Transparent compression of the large entry text columns. A compressed value is
+# a BLOB: a storage-format byte and the id of the shared dictionary it was
+# compressed with (0 for none), then the compressed UTF-8. A TEXT value is stored
+# as written (format 0), so rows saved before compression was enabled, and text
+# too short to be worth compressing, read unchanged. SQL reads the columns through
+# unpack_text() and writes them through pack_text(); both are registered on every
+# pooled connection by register_text_functions.
+FORMAT_ZLIB = 1
+FORMAT_ZSTD = 2
+CODECS = {'zlib': FORMAT_ZLIB, 'zstd': FORMAT_ZSTD}
+HEADER = struct.Struct('>BH')
+COMPRESSED_COLUMNS = (
+    'journal', 'dream', 'reflection', 'strategy', 'reflection_summary', 'dream_interpretation', 'mindset_insight'
+)
+# Deflate only looks back 32 KiB, so a longer zlib dictionary would be ignored
+ZLIB_MAX_DICTIONARY = 32768
+
+SELECT_ACTIVE_DICTIONARY_SQL = 'SELECT id, data FROM compression_dictionaries WHERE format = ? ORDER BY id DESC LIMIT 1'
+SELECT_DICTIONARY_SQL = 'SELECT data FROM compression_dictionaries WHERE id = ?'
+INSERT_DICTIONARY_SQL = 'INSERT INTO compression_dictionaries (format, data) VALUES (?, ?)'
+
+def unpacked(column: str, table: str = '') -> str:
+    """A select-list item reading a column as text, decompressing it if it is a compressed column."""
+    qualified = f"{table}.{column}" if table else column
+    return f"unpack_text({qualified}) AS {column}" if column in COMPRESSED_COLUMNS else qualified
+
+class TextCodec:
+    """Packs and unpacks compressed column values for the connections of one pool.
+
+    Dictionaries are read from the database on first use and cached; they are
+    never changed once stored, so a cached one is never stale. Writes use the
+    newest dictionary for the configured format until reset() is called.
+    """
+
+    def __init__(self, codec: Optional[str] = None, level: int = Config.TEXT_COMPRESSION_LEVEL,
+                 min_size: int = Config.TEXT_COMPRESSION_MIN_BYTES):
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unknown text compression {codec!r}; expected one of {', '.join(CODECS)}")
+        if codec == 'zstd' and zstandard is None:
+            logging.warning("zstandard is not installed; compressing text with zlib instead")
+            codec = 'zlib'
+        self.format = CODECS.get(codec, 0)
+        self.level = level
+        self.min_size = min_size
+        self._dictionaries: Dict[int, bytes] = {}
+        self._active: Optional[Tuple[int, bytes]] = None
+        # zstd (de)compressors are reusable but not thread-safe, so each thread keeps its own
+        self._local = threading.local()
+
+    def reset(self):
+        """Look up the newest dictionary again before the next write."""
+        self._active = None
+
+    def _dictionary(self, conn: sqlite3.Connection, dictionary_id: int) -> bytes:
+        data = self._dictionaries.get(dictionary_id)
+        if data is None:
+            row = conn.execute(SELECT_DICTIONARY_SQL, (dictionary_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"compression dictionary {dictionary_id} is missing")
+            data = self._dictionaries[dictionary_id] = row[0]
+        return data
+
+    def _active_dictionary(self, conn: sqlite3.Connection) -> Tuple[int, bytes]:
+        if self._active is None:
+            row = conn.execute(SELECT_ACTIVE_DICTIONARY_SQL, (self.format,)).fetchone()
+            self._active = (row[0], row[1]) if row else (0, b'')
+            if row:
+                self._dictionaries[row[0]] = row[1]
+        return self._active
+
+    def _zstd(self, kind: str, dictionary_id: int, data: bytes):
+        """This thread's zstd compressor or decompressor for a dictionary."""
+        cache = self._local.__dict__.setdefault(kind, {})
+        worker = cache.get(dictionary_id)
+        if worker is None:
+            dictionary = zstandard.ZstdCompressionDict(data) if dictionary_id else None
+            if kind == 'compressor':
+                worker = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary,
+                                                  write_checksum=False, write_dict_id=False)
+            else:
+                worker = zstandard.ZstdDecompressor(dict_data=dictionary)
+            cache[dictionary_id] = worker
+        return worker
+
+    def pack(self, conn: sqlite3.Connection, text: Optional[str]) -> Union[str, bytes, None]:
+        """The stored form of a column value: compressed if enabled and smaller, otherwise the text itself."""
+        if not self.format or text is None or len(text) < self.min_size:
+            return text
+        data = text.encode('utf-8')
+        dictionary_id, dictionary = self._active_dictionary(conn)
+        if self.format == FORMAT_ZSTD:
+            payload = self._zstd('compressor', dictionary_id, dictionary).compress(data)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=dictionary) if dictionary \
+                else zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+        packed = HEADER.pack(self.format, dictionary_id) + payload
+        return packed if len(packed) < len(data) else text
+
+    def unpack(self, conn: sqlite3.Connection, value: Union[str, bytes, None]) -> Optional[str]:
+        """The text of a stored column value, whichever format it was written in."""
+        if not isinstance(value, bytes):
+            return value
+        try:
+            fmt, dictionary_id = HEADER.unpack_from(value)
+            dictionary = self._dictionary(conn, dictionary_id) if dictionary_id else b''
+            payload = memoryview(value)[HEADER.size:]
+            if fmt == FORMAT_ZSTD:
+                if zstandard is None:
+                    raise RuntimeError("text was compressed with zstd: pip install zstandard")
+                data = self._zstd('decompressor', dictionary_id, dictionary).decompress(payload)
+            elif fmt == FORMAT_ZLIB:
+                decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+                data = decompressor.decompress(payload) + decompressor.flush()
+            else:
+                raise ValueError(f"unknown storage format {fmt}")
+            return data.decode('utf-8')
+        except Exception as e:
+            # SQLite only reports that the function failed, so say why here
+            logging.error(f"Error unpacking stored text: {e}")
+            raise
+
+def register_text_functions(conn: sqlite3.Connection, codec: TextCodec):
+    """Register pack_text() and unpack_text() for a codec on a connection."""
+    conn.create_function('pack_text', 1, lambda text: codec.pack(conn, text))
+    conn.create_function('unpack_text', 1, lambda value: codec.unpack(conn, value), deterministic=True)
+
+def ensure_text_functions(conn: sqlite3.Connection):
+    """Migration step: register the text functions, without compression, on a connection opened outside a pool."""
+    try:
+        conn.execute('SELECT unpack_text(NULL)')
+    except sqlite3.OperationalError:
+        register_text_functions(conn, TextCodec())
+
+def train_dictionary(fmt: int, samples: List[str], size: int = Config.TEXT_COMPRESSION_DICTIONARY_SIZE) -> bytes:
+    """Build a shared dictionary for a storage format from sample texts.
+
+    zstd trains one from the samples' common substrings. A zlib dictionary is
+    raw text that matches are copied from, with the most useful part last, so it
+    is the tail of the samples joined in order (put the most typical ones last).
+    """
+    if fmt == FORMAT_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd dictionaries need zstandard: pip install zstandard")
+        return zstandard.train_dictionary(size, [sample.encode('utf-8') for sample in samples]).as_bytes()
+    return '\n'.join(samples).encode('utf-8')[-min(size, ZLIB_MAX_DICTIONARY):]
+
+def store_dictionary(conn: sqlite3.Connection, fmt: int, data: bytes) -> int:
+    """Store a dictionary, returning its id; earlier ones are kept so the text compressed with them still reads."""
+    return conn.execute(INSERT_DICTIONARY_SQL, (fmt, data)).lastrowid
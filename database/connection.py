@@ -0,0 +1,136 @@
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from database.compression import TextCodec, register_text_functions
+from config.settings import Config
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared across Streamlit worker threads."""
+
+    def __init__(self, db_path: str, max_size: int = Config.DATABASE_POOL_SIZE,
+                 timeout: float = Config.DATABASE_BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        # Set by database.migrations.ensure_schema once the file is up to date.
+        self.schema_version = None
+        # get_pool() calls not yet matched by close_pool(); guarded by _pools_lock.
+        self.users = 0
+        self.codec = TextCodec(Config.TEXT_COMPRESSION)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection tuned for concurrent readers and a single writer."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=Config.DATABASE_CACHED_STATEMENTS
+        )
+        # WAL lets readers proceed while a write is in progress, which is what
+        # removes most of the "database is locked" stalls between sessions.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        register_text_functions(conn, self.codec)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, opening a new one while under the size limit."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Timed out waiting for a connection to {self.db_path}")
+
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, or close it if the pool was shut down."""
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for one transaction (commit on success, rollback on error)."""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close every idle connection; borrowed ones are closed when returned."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Return the process-wide connection pool for a database file.
+
+    Every call must be matched by one close_pool() call; the pool stays open
+    until the last of them.
+    """
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+            logging.info(f"Created connection pool for {db_path}")
+        pool.users += 1
+        return pool
+
+def close_pool(db_path: str):
+    """Release one get_pool() call, closing and forgetting the pool after the last."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            return
+        pool.users -= 1
+        if pool.users > 0:
+            return
+        del _pools[key]
+    pool.close()
@@ -1,108 +1,724 @@
-import sqlite3
+import re
+import json
+import time
 import logging
-from datetime import datetime
-from typing import List, Optional
-from database.models import JournalEntry
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from database.models import (
+    DEFERRED_FIELDS, EntrySummary, JournalEntry, JournalStats, ReflectionJob, SearchResult, User, UserSession
+)
+from database.backend import EXPORT_COLUMNS, StorageBackend, distinct_date_batches, is_postgres_url
+from database.stats import read_stats, record_entry_date
+from database.compression import train_dictionary, store_dictionary, unpacked
+from database.connection import get_pool, close_pool
+from database.migrations import LEGACY_USER_ID, ensure_schema
+from database.postgres import PostgresDatabaseManager
+from retrieval.embeddings import entry_vector
 from config.settings import Config
 
-class DatabaseManager:
-    def __init__(self, db_path: str = Config.DATABASE_PATH):
+# Statements are kept as module constants so every pooled connection reuses
+# the same prepared statement from sqlite3's per-connection statement cache.
+# Every entry and job statement is scoped to one user (the first parameter).
+# A user has one entry per date: saving a date again overwrites the entry in
+# place (keeping its id) after ARCHIVE_ENTRY_SQL has copied the old version to
+# entry_revisions. A new entry's created_at is the time of saving unless given.
+# The large text columns are written through pack_text() and read through
+# unpack_text(), which compress them when Config.TEXT_COMPRESSION is set.
+UPSERT_ENTRY_SQL = '''
+    INSERT INTO entries (user_id, date, journal, intention, dream, priorities, reflection, strategy,
+                         reflection_summary, dream_interpretation, mindset_insight, created_at)
+    VALUES (?, ?, pack_text(?), ?, pack_text(?), ?, pack_text(?), pack_text(?),
+            pack_text(?), pack_text(?), pack_text(?), coalesce(?, CURRENT_TIMESTAMP))
+    ON CONFLICT (user_id, date) DO UPDATE SET
+        journal = excluded.journal, intention = excluded.intention, dream = excluded.dream,
+        priorities = excluded.priorities, reflection = excluded.reflection, strategy = excluded.strategy,
+        reflection_summary = excluded.reflection_summary, dream_interpretation = excluded.dream_interpretation,
+        mindset_insight = excluded.mindset_insight, created_at = excluded.created_at
+'''
+ARCHIVE_ENTRY_SQL = '''
+    INSERT INTO entry_revisions (entry_id, journal, intention, dream, priorities, reflection, strategy,
+                                 reflection_summary, dream_interpretation, mindset_insight, created_at)
+    SELECT id, journal, intention, dream, priorities, reflection, strategy,
+           reflection_summary, dream_interpretation, mindset_insight, created_at
+    FROM entries WHERE user_id = ? AND date = ?
+'''
+SELECT_REVISIONS_SQL = '''
+    SELECT r.entry_id, e.date, unpack_text(r.journal), r.intention, unpack_text(r.dream), r.priorities,
+           unpack_text(r.reflection), unpack_text(r.strategy), r.created_at, unpack_text(r.reflection_summary),
+           unpack_text(r.dream_interpretation), unpack_text(r.mindset_insight)
+    FROM entries e JOIN entry_revisions r ON r.entry_id = e.id
+    WHERE e.user_id = ? AND e.date = ?
+    ORDER BY r.id DESC
+'''
+SELECT_ENTRY_BY_DATE_SQL = '''
+    SELECT id, date, unpack_text(journal), intention, unpack_text(dream), priorities, unpack_text(reflection),
+           unpack_text(strategy), created_at, unpack_text(reflection_summary), unpack_text(dream_interpretation),
+           unpack_text(mindset_insight)
+    FROM entries WHERE user_id = ? AND date = ?
+'''
+# Ids of a batch of dates; formatted with one placeholder per date
+SELECT_DATE_IDS_SQL = 'SELECT date, id FROM entries WHERE user_id = ? AND date IN ({})'
+# The app keeps entries_fts in step with entries (see migration 13): an entry's
+# old text is removed from the index before it is overwritten, and its new text
+# added after. Both read the text decompressed, through entries_fts_source.
+UNINDEX_ENTRY_SQL = '''
+    INSERT INTO entries_fts (entries_fts, rowid, journal, intention, dream, priorities, reflection, owner)
+    SELECT 'delete', id, journal, intention, dream, priorities, reflection, owner FROM entries_fts_source WHERE id = ?
+'''
+INDEX_ENTRY_SQL = '''
+    INSERT INTO entries_fts (rowid, journal, intention, dream, priorities, reflection, owner)
+    SELECT id, journal, intention, dream, priorities, reflection, owner FROM entries_fts_source WHERE id = ?
+'''
+SELECT_EXPORT_SQL = f"SELECT {', '.join(map(unpacked, EXPORT_COLUMNS))} FROM entries WHERE user_id = ? ORDER BY date"
+# Deferred entries are read without their text, which is fetched by id on first access
+SELECT_ENTRY_HEADER_BY_DATE_SQL = 'SELECT id, date, intention, priorities, created_at FROM entries WHERE user_id = ? AND date = ?'
+SELECT_DEFERRED_TEXT_SQL = f"SELECT {', '.join(map(unpacked, DEFERRED_FIELDS))} FROM entries WHERE user_id = ? AND id = ?"
+SELECT_LATEST_SUMMARIES_SQL = '''
+    SELECT id, date, intention, created_at FROM entries WHERE user_id = ? ORDER BY date DESC LIMIT ?
+'''
+SELECT_SUMMARIES_BEFORE_SQL = '''
+    SELECT id, date, intention, created_at FROM entries WHERE user_id = ? AND date < ? ORDER BY date DESC LIMIT ?
+'''
+SELECT_ALL_DATES_SQL = 'SELECT date FROM entries WHERE user_id = ? ORDER BY date DESC'
+SELECT_LATEST_DATES_SQL = 'SELECT date FROM entries WHERE user_id = ? ORDER BY date DESC LIMIT ?'
+SELECT_DATES_BEFORE_SQL = '''
+    SELECT date FROM entries WHERE user_id = ? AND date < ? ORDER BY date DESC LIMIT ?
+'''
+SELECT_DATES_AFTER_SQL = '''
+    SELECT date FROM entries WHERE user_id = ? AND date > ? ORDER BY date ASC LIMIT ?
+'''
+ENTRY_EXISTS_SQL = 'SELECT 1 FROM entries WHERE user_id = ? AND date = ? LIMIT 1'
+INSERT_USER_SQL = 'INSERT INTO users (username, name, email) VALUES (?, ?, ?) ON CONFLICT (username) DO NOTHING'
+SELECT_USER_ID_SQL = 'SELECT id FROM users WHERE username = ?'
+SELECT_USER_SQL = 'SELECT id, username, name, email, password_hash FROM users WHERE username = ?'
+SAVE_USER_SQL = '''
+    INSERT INTO users (username, name, email, password_hash) VALUES (?, ?, ?, ?)
+    ON CONFLICT (username) DO UPDATE SET
+        name = excluded.name, email = excluded.email, password_hash = excluded.password_hash
+'''
+INSERT_SESSION_SQL = 'INSERT INTO sessions (id, user_id, expires_at) VALUES (?, ?, ?)'
+SELECT_SESSION_SQL = '''
+    SELECT s.id, s.user_id, u.username, u.name, s.expires_at
+    FROM sessions s JOIN users u ON u.id = s.user_id
+    WHERE s.id = ? AND s.revoked = 0 AND s.expires_at > ?
+'''
+DELETE_EXPIRED_SESSIONS_SQL = 'DELETE FROM sessions WHERE expires_at <= ?'
+# Dictionary training samples: the newest entries of every user
+SELECT_DICTIONARY_SAMPLES_SQL = f'''
+    SELECT {', '.join(map(unpacked, ('journal', 'dream', 'reflection', 'strategy')))}
+    FROM entries ORDER BY id DESC LIMIT ?
+'''
+# REPLACE gives a rewritten vector a new seq, so embedding indexes pick it up
+SAVE_EMBEDDING_SQL = 'REPLACE INTO entry_embeddings (entry_id, user_id, vector) VALUES (?, ?, ?)'
+SELECT_EMBEDDINGS_SQL = '''
+    SELECT v.seq, e.id, e.date, v.vector
+    FROM entry_embeddings v JOIN entries e ON e.id = v.entry_id
+    WHERE v.user_id = ? AND v.seq > ?
+    ORDER BY v.seq
+'''
+# Results are the newest SEARCH_CANDIDATE_WINDOW matches ranked by score, then the
+# older matches ranked by score. Pages within the window only read it: FTS5 walks
+# doclists in rowid order, so the candidate scan stops early even for words that
+# appear in every entry. A page reaching past the window scores every match, so
+# older entries can still be paged to. Snippets are only built for the returned page.
+# The MATCH expression includes the owner (see DatabaseManager._match_expression).
+# bm25 weights follow the entries_fts column order: the user's own words rank
+# above the generated reflection text, and the owner column does not count.
+_SEARCH_SNIPPETS = '''
+    SELECT page.id, page.date, snippet(entries_fts, -1, '**', '**', '…', 16), page.score
+    FROM page
+    JOIN entries_fts ON entries_fts.rowid = page.id
+    WHERE entries_fts MATCH ?1
+'''
+_SEARCH_WINDOW_TEMPLATE = '''
+    WITH candidates AS (
+        SELECT rowid AS id, {score} AS score
+        FROM entries_fts
+        WHERE entries_fts MATCH ?1
+        ORDER BY rowid DESC
+        LIMIT ?2
+    ), page AS (
+        SELECT c.id, c.score, e.date
+        FROM candidates c
+        JOIN entries e ON e.id = c.id
+        ORDER BY c.score, c.id DESC
+        LIMIT ?3 OFFSET ?4
+    )''' + _SEARCH_SNIPPETS + '''
+    ORDER BY page.score, page.id DESC
+'''
+# bm25() cannot share a SELECT with a window function, so matches are scored first
+_SEARCH_ALL_TEMPLATE = '''
+    WITH matches AS (
+        SELECT rowid AS id, {score} AS score
+        FROM entries_fts
+        WHERE entries_fts MATCH ?1
+    ), candidates AS (
+        SELECT id, score, row_number() OVER (ORDER BY id DESC) > ?2 AS older
+        FROM matches
+    ), page AS (
+        SELECT c.id, c.score, c.older, e.date
+        FROM candidates c
+        JOIN entries e ON e.id = c.id
+        ORDER BY c.older, c.score, c.id DESC
+        LIMIT ?3 OFFSET ?4
+    )''' + _SEARCH_SNIPPETS + '''
+    ORDER BY page.older, page.score, page.id DESC
+'''
+RANKED_SCORE = 'bm25(entries_fts, 2.0, 1.5, 1.5, 1.0, 0.5, 0.0)'
+SEARCH_ENTRIES_RANKED_SQL = _SEARCH_WINDOW_TEMPLATE.format(score=RANKED_SCORE)
+SEARCH_ENTRIES_RECENT_SQL = _SEARCH_WINDOW_TEMPLATE.format(score='-rowid')
+SEARCH_ALL_ENTRIES_RANKED_SQL = _SEARCH_ALL_TEMPLATE.format(score=RANKED_SCORE)
+SEARCH_ALL_ENTRIES_RECENT_SQL = _SEARCH_ALL_TEMPLATE.format(score='-rowid')
+# Counts matches for one term, stopping once it is known to be too common to rank
+TERM_MATCH_COUNT_SQL = 'SELECT count(*) FROM (SELECT 1 FROM entries_fts WHERE entries_fts MATCH ? LIMIT ?)'
+# Rows indexed under the owner token, counted from the entries index instead
+USER_ENTRY_COUNT_SQL = 'SELECT count(*) FROM (SELECT 1 FROM entries WHERE user_id = ? LIMIT ?)'
+# Query terms only match the text columns, never the owner column
+SEARCH_COLUMNS = '{journal intention dream priorities reflection}'
+INSERT_JOB_SQL = '''
+    INSERT INTO reflection_jobs (user_id, id, status, date, journal, intention, dream, priorities)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SELECT_JOB_SQL = '''
+    SELECT id, status, date, journal, intention, dream, priorities, result, error, entry_id, created_at, updated_at,
+           user_id
+    FROM reflection_jobs WHERE user_id = ? AND id = ?
+'''
+
+class DatabaseManager(StorageBackend):
+    """StorageBackend on a SQLite file, for one user of it.
+
+    Instances for different users of the same file share its connection pool;
+    use for_user() to get one from another.
+    """
+
+    def __init__(self, db_path: str = Config.DATABASE_PATH, user_id: int = LEGACY_USER_ID):
         self.db_path = db_path
+        self.user_id = user_id
+        self.pool = get_pool(db_path)
+        self._closed = False
         self.init_database()
-    
+
+    def for_user(self, user_id: int) -> 'DatabaseManager':
+        """A manager for the same database file scoped to another user."""
+        return self if user_id == self.user_id else DatabaseManager(self.db_path, user_id)
+
     def init_database(self):
-        """Initialize the database with required tables."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS entries (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TEXT NOT NULL,
-                        journal TEXT NOT NULL,
-                        intention TEXT NOT NULL,
-                        dream TEXT,
-                        priorities TEXT NOT NULL,
-                        reflection TEXT NOT NULL,
-                        strategy TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                conn.commit()
-                logging.info("Database initialized successfully")
+        """Apply any pending schema migrations (a no-op after the first call per process)."""
+        try:
+            ensure_schema(self.pool)
         except Exception as e:
             logging.error(f"Database initialization error: {e}")
             raise
-    
+
+    def close(self):
+        """Release this manager's use of the pooled connections; the file's last open manager closes them."""
+        if not self._closed:
+            self._closed = True
+            close_pool(self.db_path)
+
+    def ensure_user(self, username: str, name: str = "", email: str = "") -> Optional[int]:
+        """Return the id of the account with this username, creating it first if needed.
+        
+        Accounts are shared by every manager of the file, whatever its user.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(INSERT_USER_SQL, (username, name, email))
+                return conn.execute(SELECT_USER_ID_SQL, (username,)).fetchone()[0]
+        except Exception as e:
+            logging.error(f"Error saving user: {e}")
+            return None
+
+    def get_user(self, username: str) -> Optional[User]:
+        """Retrieve an account, with its password hash, by username."""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(SELECT_USER_SQL, (username,)).fetchone()
+                if row:
+                    return User(id=row[0], username=row[1], name=row[2], email=row[3], password_hash=row[4])
+                return None
+        except Exception as e:
+            logging.error(f"Error retrieving user: {e}")
+            return None
+
+    def save_user(self, user: User) -> Optional[int]:
+        """Create or update an account by username and return its id."""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(SAVE_USER_SQL, (user.username, user.name, user.email, user.password_hash))
+                return conn.execute(SELECT_USER_ID_SQL, (user.username,)).fetchone()[0]
+        except Exception as e:
+            logging.error(f"Error saving user: {e}")
+            return None
+
+    def create_session(self, session: UserSession) -> bool:
+        """Record a new login session, dropping expired ones."""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(DELETE_EXPIRED_SESSIONS_SQL, (int(time.time()),))
+                conn.execute(INSERT_SESSION_SQL, (session.id, session.user_id, session.expires_at))
+                return True
+        except Exception as e:
+            logging.error(f"Error creating session: {e}")
+            return False
+
+    def get_session(self, session_id: str) -> Optional[UserSession]:
+        """Retrieve a login session unless it has expired or been revoked."""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(SELECT_SESSION_SQL, (session_id, int(time.time()))).fetchone()
+                if row:
+                    return UserSession(id=row[0], user_id=row[1], username=row[2], name=row[3], expires_at=row[4])
+                return None
+        except Exception as e:
+            logging.error(f"Error retrieving session: {e}")
+            return None
+
+    def revoke_sessions(self, session_id: Optional[str] = None, user_id: Optional[int] = None) -> int:
+        """Revoke one session, or every session of a user; returns how many were revoked."""
+        try:
+            with self.pool.connection() as conn:
+                if session_id is not None:
+                    cursor = conn.execute('UPDATE sessions SET revoked = 1 WHERE id = ? AND revoked = 0', (session_id,))
+                else:
+                    cursor = conn.execute('UPDATE sessions SET revoked = 1 WHERE user_id = ? AND revoked = 0', (user_id,))
+                return cursor.rowcount
+        except Exception as e:
+            logging.error(f"Error revoking sessions: {e}")
+            return 0
+
+    def _upsert_entries(self, conn, params: List[tuple]) -> Dict[str, int]:
+        """Save a batch of entry parameters with distinct dates on an open connection; returns ids by date.
+        
+        Dates that already had an entry get their old version archived first; the
+        others are folded into the statistics. The search index is updated here
+        rather than by triggers, so that it sees decompressed text.
+        """
+        dates = [param[1] for param in params]
+        select_ids = SELECT_DATE_IDS_SQL.format(', '.join('?' * len(dates)))
+        # The archive (a no-op for new dates) is the first statement, so the write
+        # lock is held before the existing dates are read
+        conn.executemany(ARCHIVE_ENTRY_SQL, [(self.user_id, date) for date in dates])
+        existing = dict(conn.execute(select_ids, [self.user_id, *dates]).fetchall())
+        conn.executemany(UNINDEX_ENTRY_SQL, [(entry_id,) for entry_id in existing.values()])
+        conn.executemany(UPSERT_ENTRY_SQL, params)
+        ids = dict(conn.execute(select_ids, [self.user_id, *dates]).fetchall())
+        conn.executemany(INDEX_ENTRY_SQL, [(entry_id,) for entry_id in ids.values()])
+        conn.executemany(SAVE_EMBEDDING_SQL, [
+            (ids[param[1]], self.user_id, entry_vector(param[2], param[3], param[4], param[5])) for param in params
+        ])
+        for date in sorted(set(dates) - existing.keys()):
+            record_entry_date(conn, self.user_id, date)
+        return ids
+
     def save_entry(self, entry: JournalEntry) -> bool:
         """Save a journal entry to the database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO entries (date, journal, intention, dream, priorities, reflection, strategy)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    entry.date,
-                    entry.journal,
-                    entry.intention,
-                    entry.dream,
-                    entry.priorities,
-                    entry.reflection,
-                    entry.strategy
-                ))
-                conn.commit()
+            with self.pool.connection() as conn:
+                self._upsert_entries(conn, [self._entry_params(entry)])
                 logging.info(f"Entry saved for date: {entry.date}")
                 return True
         except Exception as e:
             logging.error(f"Error saving entry: {e}")
             return False
-    
-    def get_entry_by_date(self, date: str) -> Optional[JournalEntry]:
-        """Retrieve an entry by date."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM entries WHERE date = ? ORDER BY created_at DESC LIMIT 1
-                ''', (date,))
-                row = cursor.fetchone()
-                
-                if row:
-                    return JournalEntry(
-                        id=row[0],
-                        date=row[1],
-                        journal=row[2],
-                        intention=row[3],
-                        dream=row[4],
-                        priorities=row[5],
-                        reflection=row[6],
-                        strategy=row[7],
-                        created_at=row[8] if len(row) > 8 else None
-                    )
-                return None
+
+    def save_entries(self, entries: List[JournalEntry]) -> int:
+        """Save many entries in a single transaction; returns the number saved."""
+        if not entries:
+            return 0
+        try:
+            with self.pool.connection() as conn:
+                for batch in distinct_date_batches(map(self._entry_params, entries), Config.ENTRY_BATCH_SIZE):
+                    self._upsert_entries(conn, batch)
+                logging.info(f"Saved {len(entries)} entries in one batch")
+                return len(entries)
+        except Exception as e:
+            logging.error(f"Error saving entries: {e}")
+            return 0
+
+    def export_rows(self, batch_size: int = Config.ENTRY_BATCH_SIZE) -> Iterator[List[tuple]]:
+        """Stream this user's entries, oldest first, as lists of EXPORT_COLUMNS tuples.
+        
+        One statement runs for the whole export, so it reads a consistent snapshot
+        while holding a single batch in memory. Errors are raised, not logged, so a
+        backup is never silently cut short.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.execute(SELECT_EXPORT_SQL, (self.user_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+
+    def import_entries(self, rows: Iterable[Dict[str, Any]], batch_size: int = Config.ENTRY_BATCH_SIZE) -> int:
+        """Save rows keyed by EXPORT_COLUMNS, one transaction per batch; returns the number saved.
+        
+        Rows are consumed lazily, so any number can be imported in constant memory.
+        A bad row stops the import; the batches before it stay saved.
+        """
+        saved = 0
+        try:
+            for batch in distinct_date_batches(map(self._row_params, rows), batch_size):
+                with self.pool.connection() as conn:
+                    self._upsert_entries(conn, batch)
+                saved += len(batch)
+            logging.info(f"Imported {saved} entries")
+        except Exception as e:
+            logging.error(f"Error importing entries after {saved} saved: {e}")
+        return saved
+
+    def get_entry_by_date(self, date: str, deferred: bool = False) -> Optional[JournalEntry]:
+        """Retrieve an entry by date.
+        
+        With deferred, only the id, date, intention and priorities are read; the
+        journal and reflection text are fetched the first time one is accessed.
+        """
+        try:
+            with self.pool.connection() as conn:
+                if deferred:
+                    row = conn.execute(SELECT_ENTRY_HEADER_BY_DATE_SQL, (self.user_id, date)).fetchone()
+                    return JournalEntry.deferred(
+                        self._text_loader(row[0]), id=row[0], date=row[1], intention=row[2], priorities=row[3],
+                        created_at=row[4]
+                    ) if row else None
+                row = conn.execute(SELECT_ENTRY_BY_DATE_SQL, (self.user_id, date)).fetchone()
+                return self._entry_from_row(row) if row else None
         except Exception as e:
             logging.error(f"Error retrieving entry: {e}")
             return None
-    
+
+    def _text_loader(self, entry_id: int) -> Callable[[], Optional[Dict[str, str]]]:
+        """Loader for a deferred entry's text columns."""
+        def load() -> Optional[Dict[str, str]]:
+            try:
+                with self.pool.connection() as conn:
+                    row = conn.execute(SELECT_DEFERRED_TEXT_SQL, (self.user_id, entry_id)).fetchone()
+                    return dict(zip(DEFERRED_FIELDS, row)) if row else None
+            except Exception as e:
+                logging.error(f"Error loading entry text: {e}")
+                return None
+        return load
+
+    def get_revisions(self, date: str) -> List[JournalEntry]:
+        """Earlier versions of the entry for a date, newest first; they share the entry's id."""
+        try:
+            with self.pool.connection() as conn:
+                return [self._entry_from_row(row) for row in conn.execute(SELECT_REVISIONS_SQL, (self.user_id, date))]
+        except Exception as e:
+            logging.error(f"Error retrieving revisions: {e}")
+            return []
+
+    @staticmethod
+    def _entry_from_row(row: tuple) -> JournalEntry:
+        return JournalEntry(
+            id=row[0],
+            date=row[1],
+            journal=row[2],
+            intention=row[3],
+            dream=row[4],
+            priorities=row[5],
+            reflection=row[6],
+            strategy=row[7],
+            created_at=row[8],
+            reflection_summary=row[9],
+            dream_interpretation=row[10],
+            mindset_insight=row[11]
+        )
+
     def get_all_dates(self) -> List[str]:
         """Get all dates with entries."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT DISTINCT date FROM entries ORDER BY date DESC')
-                return [row[0] for row in cursor.fetchall()]
+            with self.pool.connection() as conn:
+                return [row[0] for row in conn.execute(SELECT_ALL_DATES_SQL, (self.user_id,))]
         except Exception as e:
             logging.error(f"Error retrieving dates: {e}")
             return []
-    
+
+    def get_entries_by_ids(self, entry_ids: List[int]) -> Dict[int, JournalEntry]:
+        """Retrieve several entries by id, with their journal and intention; other text is deferred."""
+        if not entry_ids:
+            return {}
+        try:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT id, date, unpack_text(journal), intention, priorities, created_at FROM entries "
+                    f"WHERE user_id = ? AND id IN ({', '.join('?' * len(entry_ids))})",
+                    [self.user_id, *entry_ids]
+                ).fetchall()
+                return {
+                    row[0]: JournalEntry.deferred(self._text_loader(row[0]), id=row[0], date=row[1], journal=row[2],
+                                                  intention=row[3], priorities=row[4], created_at=row[5])
+                    for row in rows
+                }
+        except Exception as e:
+            logging.error(f"Error retrieving entries: {e}")
+            return {}
+
+    def get_entry_summaries(self, before: Optional[str] = None, limit: int = 31) -> List[EntrySummary]:
+        """Get one keyset page of entry summaries for listings, newest first, strictly before `before`.
+        
+        Summaries carry the intention but none of the journal or reflection text.
+        """
+        try:
+            with self.pool.connection() as conn:
+                if before is not None:
+                    rows = conn.execute(SELECT_SUMMARIES_BEFORE_SQL, (self.user_id, before, limit))
+                else:
+                    rows = conn.execute(SELECT_LATEST_SUMMARIES_SQL, (self.user_id, limit))
+                return [EntrySummary(*row) for row in rows]
+        except Exception as e:
+            logging.error(f"Error retrieving entry summaries: {e}")
+            return []
+
+    def get_dates_page(self, before: Optional[str] = None, after: Optional[str] = None,
+                       limit: int = 31) -> List[str]:
+        """Get one keyset page of dates with entries.
+        
+        Newest first, strictly before `before` (or from the latest date). With
+        `after`, oldest first, strictly after that date instead. Pass the last
+        date of a page back in to fetch the next one.
+        """
+        try:
+            with self.pool.connection() as conn:
+                if after is not None:
+                    rows = conn.execute(SELECT_DATES_AFTER_SQL, (self.user_id, after, limit))
+                elif before is not None:
+                    rows = conn.execute(SELECT_DATES_BEFORE_SQL, (self.user_id, before, limit))
+                else:
+                    rows = conn.execute(SELECT_LATEST_DATES_SQL, (self.user_id, limit))
+                return [row[0] for row in rows]
+        except Exception as e:
+            logging.error(f"Error retrieving dates page: {e}")
+            return []
+
+    def get_stats(self) -> JournalStats:
+        """Get the precomputed journaling statistics."""
+        try:
+            with self.pool.connection() as conn:
+                return read_stats(conn, self.user_id)
+        except Exception as e:
+            logging.error(f"Error retrieving stats: {e}")
+            return JournalStats()
+
     def entry_exists_for_date(self, date: str) -> bool:
         """Check if an entry exists for a given date."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT 1 FROM entries WHERE date = ? LIMIT 1', (date,))
-                return cursor.fetchone() is not None
+            with self.pool.connection() as conn:
+                return conn.execute(ENTRY_EXISTS_SQL, (self.user_id, date)).fetchone() is not None
         except Exception as e:
             logging.error(f"Error checking entry existence: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def _fts_terms(query: str) -> List[str]:
+        """Split free text into quoted FTS5 terms so operators in user input are treated as text.
+        
+        The porter tokenizer already matches word variants, so no prefix queries are
+        generated (they force FTS5 to merge every matching doclist).
+        """
+        return [f'"{term}"' for term in re.findall(r"\w+", query)]
+
+    def _owner_phrase(self) -> str:
+        return f'owner : "owner{self.user_id}"'
+
+    def _match_expression(self, terms: List[str]) -> str:
+        """All the terms, in the text columns of this user's entries.
+        
+        FTS5 intersects the owner's doclist with the terms', skipping other
+        users' rows instead of filtering them after the match.
+        """
+        return f"{self._owner_phrase()} AND {SEARCH_COLUMNS} : ({' '.join(terms)})"
+
+    def _is_rankable(self, conn, terms: List[str]) -> bool:
+        """Whether every phrase is rare enough for bm25, which counts each phrase's matches across the whole index."""
+        limit = Config.SEARCH_RANK_MAX_MATCHES
+        if conn.execute(USER_ENTRY_COUNT_SQL, (self.user_id, limit + 1)).fetchone()[0] > limit:
+            return False
+        return all(conn.execute(TERM_MATCH_COUNT_SQL, (term, limit + 1)).fetchone()[0] <= limit for term in terms)
+
+    def get_embeddings(self, after_seq: int = 0) -> List[Tuple[int, int, str, bytes]]:
+        """(seq, entry id, date, vector) of this user's entry embeddings saved after a sequence number, in order."""
+        try:
+            with self.pool.connection() as conn:
+                return conn.execute(SELECT_EMBEDDINGS_SQL, (self.user_id, after_seq)).fetchall()
+        except Exception as e:
+            logging.error(f"Error retrieving embeddings: {e}")
+            return []
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[SearchResult]:
+        """Full-text search over entries with highlighted snippets.
+        
+        Results are ordered by bm25 relevance, or newest first when the query
+        contains a word too common to rank quickly. The newest
+        SEARCH_CANDIDATE_WINDOW matches come first; pages past them continue
+        with the older matches, in the same order.
+        """
+        terms = self._fts_terms(query)
+        if not terms:
+            return []
+        try:
+            with self.pool.connection() as conn:
+                ranked = self._is_rankable(conn, terms)
+                if offset + limit <= Config.SEARCH_CANDIDATE_WINDOW:
+                    sql = SEARCH_ENTRIES_RANKED_SQL if ranked else SEARCH_ENTRIES_RECENT_SQL
+                else:
+                    sql = SEARCH_ALL_ENTRIES_RANKED_SQL if ranked else SEARCH_ALL_ENTRIES_RECENT_SQL
+                rows = conn.execute(
+                    sql, (self._match_expression(terms), Config.SEARCH_CANDIDATE_WINDOW, limit, offset)
+                ).fetchall()
+                return [SearchResult(entry_id=row[0], date=row[1], snippet=row[2], rank=row[3]) for row in rows]
+        except Exception as e:
+            logging.error(f"Error searching entries: {e}")
+            return []
+
+    def train_compression_dictionary(self, samples: int = Config.TEXT_COMPRESSION_DICTIONARY_SAMPLES) -> Optional[int]:
+        """Train a dictionary for the configured compression and use it for new writes; returns its id.
+        
+        The dictionary is shared by every user of the file, so like requeue_stale_jobs
+        this is not scoped: it samples the newest entries of all users. Text already
+        stored keeps the dictionary it was written with.
+        """
+        codec = self.pool.codec
+        if not codec.format:
+            logging.warning("Text compression is disabled; not training a dictionary")
+            return None
+        try:
+            with self.pool.connection() as conn:
+                rows = conn.execute(SELECT_DICTIONARY_SAMPLES_SQL, (samples,)).fetchall()
+                # Newest last, where a zlib dictionary is most useful
+                texts = [text for row in reversed(rows) for text in row if text]
+                dictionary_id = store_dictionary(conn, codec.format, train_dictionary(codec.format, texts))
+            codec.reset()
+            logging.info(f"Trained compression dictionary {dictionary_id} from {len(rows)} entries")
+            return dictionary_id
+        except Exception as e:
+            logging.error(f"Error training compression dictionary: {e}")
+            return None
+
+    def rebuild_search_index(self) -> bool:
+        """Rebuild the search index from the stored entries of every user.
+
+        Saves through the app keep the index current; this is for text that
+        another SQLite client wrote to entries directly.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')")
+            return True
+        except Exception as e:
+            logging.error(f"Error rebuilding search index: {e}")
+            return False
+
+    def create_job(self, job: ReflectionJob) -> bool:
+        """Persist a new pending reflection job."""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(INSERT_JOB_SQL, (
+                    self.user_id, job.id, job.status, job.date, job.journal, job.intention, job.dream, job.priorities
+                ))
+                return True
+        except Exception as e:
+            logging.error(f"Error creating job: {e}")
+            return False
+
+    def get_job(self, job_id: str) -> Optional[ReflectionJob]:
+        """Retrieve a reflection job by id."""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(SELECT_JOB_SQL, (self.user_id, job_id)).fetchone()
+                if row:
+                    return ReflectionJob(
+                        id=row[0],
+                        status=row[1],
+                        date=row[2],
+                        journal=row[3],
+                        intention=row[4],
+                        dream=row[5],
+                        priorities=row[6],
+                        result=json.loads(row[7]) if row[7] else None,
+                        error=row[8],
+                        entry_id=row[9],
+                        created_at=row[10],
+                        updated_at=row[11],
+                        user_id=row[12]
+                    )
+                return None
+        except Exception as e:
+            logging.error(f"Error retrieving job: {e}")
+            return None
+
+    def claim_job(self, job_id: str) -> bool:
+        """Move a pending job to running; False if another worker already took it."""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.execute('''
+                    UPDATE reflection_jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ? AND id = ? AND status = 'pending'
+                ''', (self.user_id, job_id))
+                return cursor.rowcount == 1
+        except Exception as e:
+            logging.error(f"Error claiming job: {e}")
+            return False
+
+    def complete_job(self, job_id: str, entry: JournalEntry, results: Dict[str, str]) -> Optional[int]:
+        """Save the job's entry and mark it done in one transaction; returns the entry id."""
+        try:
+            with self.pool.connection() as conn:
+                entry_id = self._upsert_entries(conn, [self._entry_params(entry)])[entry.date]
+                conn.execute('''
+                    UPDATE reflection_jobs
+                    SET status = 'done', result = ?, entry_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ? AND id = ?
+                ''', (json.dumps(results), entry_id, self.user_id, job_id))
+                logging.info(f"Entry saved for date: {entry.date} (job {job_id})")
+                return entry_id
+        except Exception as e:
+            logging.error(f"Error completing job: {e}")
+            return None
+
+    def fail_job(self, job_id: str, error: str) -> bool:
+        """Mark a job as failed."""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    UPDATE reflection_jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ? AND id = ?
+                ''', (error, self.user_id, job_id))
+                return True
+        except Exception as e:
+            logging.error(f"Error failing job: {e}")
+            return False
+
+    def requeue_stale_jobs(self, stale_seconds: float) -> List[Tuple[str, int]]:
+        """Reset jobs left running by a dead process and return every pending (job id, user id).
+        
+        Worker recovery spans all users, so unlike the other job methods this is not scoped.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    UPDATE reflection_jobs SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+                    WHERE status = 'running' AND updated_at < datetime('now', ?)
+                ''', (f"-{int(stale_seconds)} seconds",))
+                rows = conn.execute(
+                    "SELECT id, user_id FROM reflection_jobs WHERE status = 'pending' ORDER BY created_at"
+                ).fetchall()
+                return [(row[0], row[1]) for row in rows]
+        except Exception as e:
+            logging.error(f"Error requeueing jobs: {e}")
+            return []
+
+@lru_cache(maxsize=None)
+def get_database_manager(db_path: Optional[str] = None) -> StorageBackend:
+    """Return the process-wide manager for a database: a SQLite file path or a PostgreSQL URL.
+
+    Defaults to Config.DATABASE_URL when set, otherwise Config.DATABASE_PATH.
+    Works like st.cache_resource but does not need a running Streamlit script,
+    so workers and command-line tools share the same instance.
+    """
+    db_path = db_path or Config.DATABASE_URL or Config.DATABASE_PATH
+    if is_postgres_url(db_path):
+        return PostgresDatabaseManager(db_path)
+    return DatabaseManager(db_path)
\ No newline at end of file
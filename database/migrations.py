@@ -0,0 +1,473 @@
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Union
+from database.connection import ConnectionPool
+from database.compression import ensure_text_functions
+from database.stats import backfill_entry_stats, record_entry_date_queries, run_queries
+from agent.parsing import parse_sections
+from retrieval.embeddings import entry_vector
+from config.settings import Config
+
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    steps: Sequence[MigrationStep]
+
+BACKFILL_BATCH_SIZE = 500
+# Owner of the entries written before storage was per user
+LEGACY_USER_ID = 1
+
+def create_legacy_user(conn: sqlite3.Connection):
+    """Migration step: create the account that existing entries are assigned to."""
+    conn.execute(
+        'INSERT INTO users (id, username, name) VALUES (?, ?, ?)',
+        (LEGACY_USER_ID, Config.LEGACY_USERNAME, Config.LEGACY_USERNAME)
+    )
+
+# database.stats' statements against the single-user tables of migration 5, which
+# migration 8 replaces. Numbered parameters skip ?1, the user id they are passed.
+SINGLE_USER_STATS_SQL = {
+    'run_ending': 'SELECT start_date FROM entry_streaks WHERE end_date = ?2',
+    'run_starting': 'SELECT end_date FROM entry_streaks WHERE start_date = ?2',
+    'delete_run': 'DELETE FROM entry_streaks WHERE start_date = ?2',
+    'insert_run': 'INSERT INTO entry_streaks (start_date, end_date) VALUES (?2, ?3)',
+    'update_stats': '''
+        UPDATE entry_stats SET
+            total_days = total_days + 1,
+            first_date = min(coalesce(first_date, ?2), ?2),
+            last_date = max(coalesce(last_date, ?2), ?2),
+            longest_streak = max(longest_streak, ?3)
+        WHERE id = 1
+    ''',
+    'increment_weekday': '''
+        INSERT INTO entry_weekdays (weekday, days) VALUES (?2, 1)
+        ON CONFLICT (weekday) DO UPDATE SET days = days + 1
+    ''',
+}
+
+def backfill_single_user_stats(conn: sqlite3.Connection):
+    """Migration step: build migration 5's statistics from entries written before its tables existed."""
+    conn.execute('INSERT OR IGNORE INTO entry_stats (id) VALUES (1)')
+    for (date_str,) in conn.execute('SELECT DISTINCT date FROM entries ORDER BY date').fetchall():
+        run_queries(conn, record_entry_date_queries(LEGACY_USER_ID, date_str), SINGLE_USER_STATS_SQL)
+
+def backfill_entry_sections(conn: sqlite3.Connection):
+    """Migration step: parse stored reflections into the section columns, a batch of rows at a time."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, reflection FROM entries WHERE id > ? ORDER BY id LIMIT ?', (last_id, BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        updates = []
+        for entry_id, reflection in rows:
+            sections = parse_sections(reflection or '')
+            if sections:
+                updates.append((
+                    sections.get('reflection', ''), sections.get('dream_interpretation', ''),
+                    sections.get('mindset_insight', ''), entry_id
+                ))
+        conn.executemany(
+            'UPDATE entries SET reflection_summary = ?, dream_interpretation = ?, mindset_insight = ? WHERE id = ?',
+            updates
+        )
+        last_id = rows[-1][0]
+
+def backfill_entry_embeddings(conn: sqlite3.Connection):
+    """Migration step: embed entries written before entry_embeddings existed, a batch at a time."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, journal, intention, dream, priorities FROM entries WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        conn.executemany(
+            'INSERT INTO entry_embeddings (entry_id, vector) VALUES (?, ?)',
+            [(row[0], entry_vector(row[1], row[2], row[3] or '', row[4])) for row in rows]
+        )
+        last_id = rows[-1][0]
+
+# Append new migrations to the end of this list; never edit one that has shipped.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create entries table", (
+        '''
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            journal TEXT NOT NULL,
+            intention TEXT NOT NULL,
+            dream TEXT,
+            priorities TEXT NOT NULL,
+            reflection TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    )),
+    Migration(2, "Index entries by date and newest submission", (
+        # Serves the date lookup (seek + first row, no sort) and covers the
+        # DISTINCT date listing and the existence check without touching the table.
+        'CREATE INDEX IF NOT EXISTS idx_entries_date_created ON entries (date, created_at DESC)',
+    )),
+    Migration(3, "Create reflection_jobs table", (
+        '''
+        CREATE TABLE IF NOT EXISTS reflection_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL CHECK (status IN ('pending', 'running', 'done', 'failed')),
+            date TEXT NOT NULL,
+            journal TEXT NOT NULL,
+            intention TEXT NOT NULL,
+            dream TEXT,
+            priorities TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            entry_id INTEGER REFERENCES entries (id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_reflection_jobs_status ON reflection_jobs (status, updated_at)',
+    )),
+    Migration(4, "Full-text search index over entries", (
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+            journal, intention, dream, priorities, reflection,
+            content='entries', content_rowid='id', tokenize='porter unicode61'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts (rowid, journal, intention, dream, priorities, reflection)
+            VALUES (new.id, new.journal, new.intention, new.dream, new.priorities, new.reflection);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_fts_delete AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, journal, intention, dream, priorities, reflection)
+            VALUES ('delete', old.id, old.journal, old.intention, old.dream, old.priorities, old.reflection);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS entries_fts_update AFTER UPDATE ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, journal, intention, dream, priorities, reflection)
+            VALUES ('delete', old.id, old.journal, old.intention, old.dream, old.priorities, old.reflection);
+            INSERT INTO entries_fts (rowid, journal, intention, dream, priorities, reflection)
+            VALUES (new.id, new.journal, new.intention, new.dream, new.priorities, new.reflection);
+        END
+        ''',
+        # Index rows written before this migration
+        "INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')",
+    )),
+    Migration(5, "Precomputed journaling statistics", (
+        '''
+        CREATE TABLE IF NOT EXISTS entry_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_days INTEGER NOT NULL DEFAULT 0,
+            first_date TEXT,
+            last_date TEXT,
+            longest_streak INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        'CREATE TABLE IF NOT EXISTS entry_weekdays (weekday INTEGER PRIMARY KEY, days INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS entry_streaks (start_date TEXT PRIMARY KEY, end_date TEXT NOT NULL UNIQUE)',
+        backfill_single_user_stats,
+    )),
+    Migration(6, "Store parsed reflection sections as columns", (
+        "ALTER TABLE entries ADD COLUMN reflection_summary TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE entries ADD COLUMN dream_interpretation TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE entries ADD COLUMN mindset_insight TEXT NOT NULL DEFAULT ''",
+        # Only re-index when an indexed column changes, so the backfill below
+        # does not rewrite the whole full-text index
+        'DROP TRIGGER IF EXISTS entries_fts_update',
+        '''
+        CREATE TRIGGER entries_fts_update
+        AFTER UPDATE OF journal, intention, dream, priorities, reflection ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, journal, intention, dream, priorities, reflection)
+            VALUES ('delete', old.id, old.journal, old.intention, old.dream, old.priorities, old.reflection);
+            INSERT INTO entries_fts (rowid, journal, intention, dream, priorities, reflection)
+            VALUES (new.id, new.journal, new.intention, new.dream, new.priorities, new.reflection);
+        END
+        ''',
+        backfill_entry_sections,
+    )),
+    Migration(7, "Entry embeddings for past-entry retrieval", (
+        '''
+        CREATE TABLE IF NOT EXISTS entry_embeddings (
+            entry_id INTEGER PRIMARY KEY REFERENCES entries (id),
+            vector BLOB NOT NULL
+        )
+        ''',
+        backfill_entry_embeddings,
+    )),
+    Migration(8, "Per-user entries, jobs, statistics and search", (
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        create_legacy_user,
+        # A constant default is stored in the schema only, so existing rows are
+        # assigned to the legacy user without rewriting the table
+        f'ALTER TABLE entries ADD COLUMN user_id INTEGER NOT NULL DEFAULT {LEGACY_USER_ID} REFERENCES users (id)',
+        f'ALTER TABLE reflection_jobs ADD COLUMN user_id INTEGER NOT NULL DEFAULT {LEGACY_USER_ID} REFERENCES users (id)',
+        # Full-text token for the owner, distinct from any number in the entry text
+        "ALTER TABLE entries ADD COLUMN owner TEXT GENERATED ALWAYS AS ('owner' || user_id) VIRTUAL",
+        # Every entry query starts with the user, so one user's lookups seek
+        # within their own rows however many other users share the file
+        'DROP INDEX IF EXISTS idx_entries_date_created',
+        'CREATE INDEX idx_entries_user_date_created ON entries (user_id, date, created_at DESC)',
+        # Walks a user's entries in id order (embedding refresh, backfills)
+        'CREATE INDEX idx_entries_user_id ON entries (user_id, id)',
+        'DROP TABLE IF EXISTS entry_stats',
+        'DROP TABLE IF EXISTS entry_weekdays',
+        'DROP TABLE IF EXISTS entry_streaks',
+        '''
+        CREATE TABLE entry_stats (
+            user_id INTEGER PRIMARY KEY REFERENCES users (id),
+            total_days INTEGER NOT NULL DEFAULT 0,
+            first_date TEXT,
+            last_date TEXT,
+            longest_streak INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE entry_weekdays (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            weekday INTEGER NOT NULL,
+            days INTEGER NOT NULL,
+            PRIMARY KEY (user_id, weekday)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE entry_streaks (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            PRIMARY KEY (user_id, start_date),
+            UNIQUE (user_id, end_date)
+        ) WITHOUT ROWID
+        ''',
+        backfill_entry_stats,
+        # The owner is indexed as its own full-text column, so a search walks
+        # only the intersection of the query terms with the user's rows
+        'DROP TRIGGER IF EXISTS entries_fts_insert',
+        'DROP TRIGGER IF EXISTS entries_fts_delete',
+        'DROP TRIGGER IF EXISTS entries_fts_update',
+        'DROP TABLE IF EXISTS entries_fts',
+        '''
+        CREATE VIRTUAL TABLE entries_fts USING fts5(
+            journal, intention, dream, priorities, reflection, owner,
+            content='entries', content_rowid='id', tokenize='porter unicode61'
+        )
+        ''',
+        '''
+        CREATE TRIGGER entries_fts_insert AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_fts (rowid, journal, intention, dream, priorities, reflection, owner)
+            VALUES (new.id, new.journal, new.intention, new.dream, new.priorities, new.reflection, new.owner);
+        END
+        ''',
+        '''
+        CREATE TRIGGER entries_fts_delete AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, journal, intention, dream, priorities, reflection, owner)
+            VALUES ('delete', old.id, old.journal, old.intention, old.dream, old.priorities, old.reflection, old.owner);
+        END
+        ''',
+        '''
+        CREATE TRIGGER entries_fts_update
+        AFTER UPDATE OF journal, intention, dream, priorities, reflection, user_id ON entries BEGIN
+            INSERT INTO entries_fts (entries_fts, rowid, journal, intention, dream, priorities, reflection, owner)
+            VALUES ('delete', old.id, old.journal, old.intention, old.dream, old.priorities, old.reflection, old.owner);
+            INSERT INTO entries_fts (rowid, journal, intention, dream, priorities, reflection, owner)
+            VALUES (new.id, new.journal, new.intention, new.dream, new.priorities, new.reflection, new.owner);
+        END
+        ''',
+        "INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')",
+    )),
+    Migration(9, "Store password hashes with users", (
+        "ALTER TABLE users ADD COLUMN password_hash TEXT NOT NULL DEFAULT ''",
+    )),
+    Migration(10, "Login sessions for signed auth cookies", (
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            expires_at INTEGER NOT NULL,
+            revoked INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)',
+    )),
+    Migration(11, "One entry per user and date, with earlier versions kept as revisions", (
+        '''
+        CREATE TABLE IF NOT EXISTS entry_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER NOT NULL REFERENCES entries (id),
+            journal TEXT NOT NULL,
+            intention TEXT NOT NULL,
+            dream TEXT,
+            priorities TEXT NOT NULL,
+            reflection TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            reflection_summary TEXT NOT NULL DEFAULT '',
+            dream_interpretation TEXT NOT NULL DEFAULT '',
+            mindset_insight TEXT NOT NULL DEFAULT '',
+            created_at TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_entry_revisions_entry ON entry_revisions (entry_id, id)',
+        # Every overwrite used to append a row; the newest one per date is kept
+        # and the older ones become its revisions, oldest first
+        '''
+        CREATE TEMP TABLE superseded_entries AS
+        SELECT id, kept_id FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY user_id, date ORDER BY created_at DESC, id DESC
+            ) AS kept_id
+            FROM entries
+        )
+        WHERE id != kept_id
+        ''',
+        '''
+        INSERT INTO entry_revisions (entry_id, journal, intention, dream, priorities, reflection, strategy,
+                                     reflection_summary, dream_interpretation, mindset_insight, created_at)
+        SELECT s.kept_id, e.journal, e.intention, e.dream, e.priorities, e.reflection, e.strategy,
+               e.reflection_summary, e.dream_interpretation, e.mindset_insight, e.created_at
+        FROM superseded_entries s JOIN entries e ON e.id = s.id
+        ORDER BY e.created_at, e.id
+        ''',
+        '''
+        UPDATE reflection_jobs
+        SET entry_id = (SELECT kept_id FROM superseded_entries WHERE id = reflection_jobs.entry_id)
+        WHERE entry_id IN (SELECT id FROM superseded_entries)
+        ''',
+        'DELETE FROM entry_embeddings WHERE entry_id IN (SELECT id FROM superseded_entries)',
+        'DELETE FROM entries WHERE id IN (SELECT id FROM superseded_entries)',
+        'DROP TABLE superseded_entries',
+        'DROP INDEX IF EXISTS idx_entries_user_date_created',
+        'CREATE UNIQUE INDEX idx_entries_user_date ON entries (user_id, date)',
+        # An overwrite keeps the entry id, so vectors get a sequence number that a
+        # rewrite advances (REPLACE deletes and re-inserts the row); embedding
+        # indexes catch up by sequence within one user's rows
+        '''
+        CREATE TABLE entry_embeddings_new (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER NOT NULL UNIQUE REFERENCES entries (id),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            vector BLOB NOT NULL
+        )
+        ''',
+        '''
+        INSERT INTO entry_embeddings_new (entry_id, user_id, vector)
+        SELECT v.entry_id, e.user_id, v.vector
+        FROM entry_embeddings v JOIN entries e ON e.id = v.entry_id
+        ORDER BY v.entry_id
+        ''',
+        'DROP TABLE entry_embeddings',
+        'ALTER TABLE entry_embeddings_new RENAME TO entry_embeddings',
+        'CREATE INDEX idx_entry_embeddings_user_seq ON entry_embeddings (user_id, seq)',
+    )),
+    Migration(12, "Compression dictionaries for entry text", (
+        '''
+        CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            format INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    )),
+    Migration(13, "Search index fed decompressed entry text by the app", (
+        ensure_text_functions,
+        # Text columns may hold compressed BLOBs (see database.compression), which
+        # the index has to see as text. Triggers could only decompress through
+        # unpack_text(), which plain SQLite clients lack, so writes to entries
+        # would fail for them; instead DatabaseManager._upsert_entries updates
+        # the index. The index reads entry text through this view.
+        'DROP TRIGGER IF EXISTS entries_fts_insert',
+        'DROP TRIGGER IF EXISTS entries_fts_delete',
+        'DROP TRIGGER IF EXISTS entries_fts_update',
+        'DROP TABLE IF EXISTS entries_fts',
+        'DROP VIEW IF EXISTS entries_fts_source',
+        '''
+        CREATE VIEW entries_fts_source AS
+        SELECT id, unpack_text(journal) AS journal, intention, unpack_text(dream) AS dream, priorities,
+               unpack_text(reflection) AS reflection, owner
+        FROM entries
+        ''',
+        '''
+        CREATE VIRTUAL TABLE entries_fts USING fts5(
+            journal, intention, dream, priorities, reflection, owner,
+            content='entries_fts_source', content_rowid='id', tokenize='porter unicode61'
+        )
+        ''',
+        "INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')",
+    )),
+]
+
+_schema_lock = threading.Lock()
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the highest applied migration version (0 for a fresh database)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+def run_migrations(conn: sqlite3.Connection, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+    """Apply pending migrations, each in its own write transaction."""
+    applied = []
+    for migration in migrations:
+        # BEGIN IMMEDIATE takes the write lock before re-reading the version, so
+        # two processes starting against the same file cannot both apply it.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_schema_version(conn) >= migration.version:
+                conn.rollback()
+                continue
+            for step in migration.steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (migration.version, migration.description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+        logging.info(f"Applied schema migration {migration.version}: {migration.description}")
+    return applied
+
+def ensure_schema(pool: ConnectionPool) -> int:
+    """Bring the pool's database up to date, once per pool (i.e. per process and file)."""
+    if pool.schema_version is not None:
+        return pool.schema_version
+
+    with _schema_lock:
+        if pool.schema_version is None:
+            with pool.connection() as conn:
+                run_migrations(conn)
+                pool.schema_version = get_schema_version(conn)
+        return pool.schema_version
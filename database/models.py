@@ -1,19 +1,69 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Optional
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+class DeferredText:
+    """Field default for entry text that a deferred entry fetches the first time it is read.
+
+    Values live in the instance __dict__, so a fully loaded entry only pays for the
+    descriptor call on access.
+    """
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, entry, owner=None) -> str:
+        if entry is None:
+            return ""  # the dataclass default
+        if self.name not in entry.__dict__:
+            entry._load_deferred()
+        return entry.__dict__[self.name]
+
+    def __set__(self, entry, value: str):
+        entry.__dict__[self.name] = value
 
 @dataclass
 class JournalEntry:
     id: Optional[int] = None
     date: str = ""
-    journal: str = ""
+    journal: str = DeferredText()
     intention: str = ""
-    dream: str = ""
+    dream: str = DeferredText()
     priorities: str = ""
-    reflection: str = ""
-    strategy: str = ""
+    reflection: str = DeferredText()  # the full generated response
+    strategy: str = DeferredText()
+    reflection_summary: str = DeferredText()
+    dream_interpretation: str = DeferredText()
+    mindset_insight: str = DeferredText()
     created_at: Optional[datetime] = None
     
+    @classmethod
+    def deferred(cls, load: Callable[[], Optional[Dict[str, str]]], **values) -> 'JournalEntry':
+        """An entry holding only `values`; any DeferredText field not given is fetched with load() when first read."""
+        entry = cls.__new__(cls)
+        for f in fields(cls):
+            if f.name in values or f.name not in DEFERRED_FIELDS:
+                setattr(entry, f.name, values.get(f.name, f.default))
+        entry._load = load
+        return entry
+
+    def _load_deferred(self):
+        load = self.__dict__.pop('_load', None)
+        loaded = (load() if load else None) or {}
+        for name in DEFERRED_FIELDS:
+            self.__dict__.setdefault(name, loaded.get(name, ''))
+    
+    @property
+    def sections(self) -> Dict[str, str]:
+        """The parsed reflection sections that are present, keyed like the agent's results."""
+        sections = {
+            'reflection': self.reflection_summary,
+            'dream_interpretation': self.dream_interpretation,
+            'mindset_insight': self.mindset_insight,
+            'strategy': self.strategy,
+        }
+        return {key: value for key, value in sections.items() if value}
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -24,5 +74,76 @@ class JournalEntry:
             'priorities': self.priorities,
             'reflection': self.reflection,
             'strategy': self.strategy,
+            'reflection_summary': self.reflection_summary,
+            'dream_interpretation': self.dream_interpretation,
+            'mindset_insight': self.mindset_insight,
             'created_at': self.created_at
-        }
\ No newline at end of file
+        }
+
+# Entry text that can be left out of a query (see JournalEntry.deferred)
+DEFERRED_FIELDS = tuple(name for name, value in vars(JournalEntry).items() if isinstance(value, DeferredText))
+
+class EntrySummary(NamedTuple):
+    """An entry as shown in listings, without its journal or reflection text."""
+    id: int
+    date: str
+    intention: str
+    created_at: Optional[str] = None
+
+@dataclass
+class User:
+    id: Optional[int] = None
+    username: str = ""
+    name: str = ""
+    email: str = ""
+    password_hash: str = ""  # bcrypt; empty until a password is set
+
+@dataclass
+class UserSession:
+    id: str
+    user_id: int
+    username: str = ""
+    name: str = ""
+    expires_at: int = 0  # Unix time
+
+@dataclass
+class ReflectionJob:
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    id: str = ""
+    status: str = PENDING
+    date: str = ""
+    journal: str = ""
+    intention: str = ""
+    dream: str = ""
+    priorities: str = ""
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    entry_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    user_id: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+@dataclass
+class SearchResult:
+    entry_id: int
+    date: str
+    snippet: str
+    rank: float
+
+@dataclass
+class JournalStats:
+    total_days: int = 0
+    first_date: Optional[str] = None
+    last_date: Optional[str] = None
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_7_days: int = 0
+    weekday_counts: List[int] = field(default_factory=lambda: [0] * 7)  # Monday first
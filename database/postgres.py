@@ -0,0 +1,891 @@
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+from database.backend import EXPORT_COLUMNS, StorageBackend, distinct_date_batches
+from database.models import (
+    DEFERRED_FIELDS, EntrySummary, JournalEntry, JournalStats, ReflectionJob, SearchResult, User, UserSession
+)
+from database.migrations import LEGACY_USER_ID, Migration
+from database.stats import ROWS, VALUE, Query, read_stats_queries, record_entry_date_queries
+from retrieval.embeddings import entry_vector
+from config.settings import Config
+
+try:
+    import asyncpg
+except ImportError:  # optional: only needed when DATABASE_URL is a PostgreSQL URL
+    asyncpg = None
+
+# The same tables as the SQLite schema after its latest migration, with two
+# differences: full-text search is a weighted tsvector column with a GIN index
+# instead of an FTS5 table, and text is left to PostgreSQL's own TOAST
+# compression. Dates and timestamps are stored as UTC text ('YYYY-MM-DD HH:MM:SS',
+# SQLite's CURRENT_TIMESTAMP) so both backends return the same values. Statements
+# use asyncpg's $n placeholders; asyncpg prepares each one the first time a
+# connection runs it and reuses it from then on.
+NOW_TEXT = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+# Advisory lock classes (the first key of pg_advisory_xact_lock(int, int))
+MIGRATION_LOCK_CLASS = 0
+ENTRY_LOCK_CLASS = 1
+
+async def create_legacy_user(conn):
+    """Migration step: create the account that the default manager's entries belong to."""
+    await conn.execute(
+        'INSERT INTO users (id, username, name) VALUES ($1, $2, $2) ON CONFLICT DO NOTHING',
+        LEGACY_USER_ID, Config.LEGACY_USERNAME
+    )
+    await conn.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))")
+
+# Append new migrations to the end of this list; never edit one that has shipped.
+POSTGRES_MIGRATIONS: List[Migration] = [
+    Migration(1, "Create schema", (
+        f'''
+        CREATE TABLE users (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            password_hash TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL DEFAULT {NOW_TEXT}
+        )
+        ''',
+        create_legacy_user,
+        f'''
+        CREATE TABLE sessions (
+            id TEXT PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            expires_at BIGINT NOT NULL,
+            revoked BOOLEAN NOT NULL DEFAULT false,
+            created_at TEXT NOT NULL DEFAULT {NOW_TEXT}
+        )
+        ''',
+        'CREATE INDEX idx_sessions_user ON sessions (user_id)',
+        'CREATE INDEX idx_sessions_expires ON sessions (expires_at)',
+        f'''
+        CREATE TABLE entries (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            date TEXT NOT NULL,
+            journal TEXT NOT NULL,
+            intention TEXT NOT NULL,
+            dream TEXT,
+            priorities TEXT NOT NULL,
+            reflection TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            reflection_summary TEXT NOT NULL DEFAULT '',
+            dream_interpretation TEXT NOT NULL DEFAULT '',
+            mindset_insight TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL DEFAULT {NOW_TEXT},
+            -- Weighted like the SQLite bm25 columns: the user's own words rank above the reflection
+            search TSVECTOR GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', journal), 'A') ||
+                setweight(to_tsvector('english', intention || ' ' || coalesce(dream, '')), 'B') ||
+                setweight(to_tsvector('english', priorities), 'C') ||
+                setweight(to_tsvector('english', reflection), 'D')
+            ) STORED,
+            UNIQUE (user_id, date)
+        )
+        ''',
+        'CREATE INDEX idx_entries_user_id ON entries (user_id, id)',
+        'CREATE INDEX idx_entries_search ON entries USING GIN (search)',
+        '''
+        CREATE TABLE entry_revisions (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            entry_id BIGINT NOT NULL REFERENCES entries (id),
+            journal TEXT NOT NULL,
+            intention TEXT NOT NULL,
+            dream TEXT,
+            priorities TEXT NOT NULL,
+            reflection TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            reflection_summary TEXT NOT NULL DEFAULT '',
+            dream_interpretation TEXT NOT NULL DEFAULT '',
+            mindset_insight TEXT NOT NULL DEFAULT '',
+            created_at TEXT
+        )
+        ''',
+        'CREATE INDEX idx_entry_revisions_entry ON entry_revisions (entry_id, id)',
+        '''
+        CREATE TABLE entry_embeddings (
+            seq BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            entry_id BIGINT NOT NULL UNIQUE REFERENCES entries (id),
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            vector BYTEA NOT NULL
+        )
+        ''',
+        'CREATE INDEX idx_entry_embeddings_user_seq ON entry_embeddings (user_id, seq)',
+        '''
+        CREATE TABLE entry_stats (
+            user_id BIGINT PRIMARY KEY REFERENCES users (id),
+            total_days INTEGER NOT NULL DEFAULT 0,
+            first_date TEXT,
+            last_date TEXT,
+            longest_streak INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE entry_weekdays (
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            weekday INTEGER NOT NULL,
+            days INTEGER NOT NULL,
+            PRIMARY KEY (user_id, weekday)
+        )
+        ''',
+        '''
+        CREATE TABLE entry_streaks (
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            PRIMARY KEY (user_id, start_date),
+            UNIQUE (user_id, end_date)
+        )
+        ''',
+        f'''
+        CREATE TABLE reflection_jobs (
+            id TEXT PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users (id),
+            status TEXT NOT NULL CHECK (status IN ('pending', 'running', 'done', 'failed')),
+            date TEXT NOT NULL,
+            journal TEXT NOT NULL,
+            intention TEXT NOT NULL,
+            dream TEXT,
+            priorities TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            entry_id BIGINT REFERENCES entries (id),
+            created_at TEXT NOT NULL DEFAULT {NOW_TEXT},
+            updated_at TEXT NOT NULL DEFAULT {NOW_TEXT}
+        )
+        ''',
+        'CREATE INDEX idx_reflection_jobs_status ON reflection_jobs (status, updated_at)',
+    )),
+]
+
+CREATE_SCHEMA_VERSION_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+'''
+LOCK_SQL = 'SELECT pg_advisory_xact_lock($1, $2)'
+UPSERT_ENTRY_SQL = f'''
+    INSERT INTO entries (user_id, date, journal, intention, dream, priorities, reflection, strategy,
+                         reflection_summary, dream_interpretation, mindset_insight, created_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, coalesce($12, {NOW_TEXT}))
+    ON CONFLICT (user_id, date) DO UPDATE SET
+        journal = excluded.journal, intention = excluded.intention, dream = excluded.dream,
+        priorities = excluded.priorities, reflection = excluded.reflection, strategy = excluded.strategy,
+        reflection_summary = excluded.reflection_summary, dream_interpretation = excluded.dream_interpretation,
+        mindset_insight = excluded.mindset_insight, created_at = excluded.created_at
+'''
+ARCHIVE_ENTRY_SQL = '''
+    INSERT INTO entry_revisions (entry_id, journal, intention, dream, priorities, reflection, strategy,
+                                 reflection_summary, dream_interpretation, mindset_insight, created_at)
+    SELECT id, journal, intention, dream, priorities, reflection, strategy,
+           reflection_summary, dream_interpretation, mindset_insight, created_at
+    FROM entries WHERE user_id = $1 AND date = $2
+'''
+SELECT_DATE_IDS_SQL = 'SELECT date, id FROM entries WHERE user_id = $1 AND date = ANY($2::text[])'
+# A rewritten vector gets a new seq, so embedding indexes pick it up
+SAVE_EMBEDDING_SQL = '''
+    INSERT INTO entry_embeddings (entry_id, user_id, vector) VALUES ($1, $2, $3)
+    ON CONFLICT (entry_id) DO UPDATE SET vector = excluded.vector, seq = DEFAULT
+'''
+SELECT_EMBEDDINGS_SQL = '''
+    SELECT v.seq, e.id, e.date, v.vector
+    FROM entry_embeddings v JOIN entries e ON e.id = v.entry_id
+    WHERE v.user_id = $1 AND v.seq > $2
+    ORDER BY v.seq
+'''
+SELECT_REVISIONS_SQL = '''
+    SELECT r.entry_id, e.date, r.journal, r.intention, r.dream, r.priorities, r.reflection, r.strategy, r.created_at,
+           r.reflection_summary, r.dream_interpretation, r.mindset_insight
+    FROM entries e JOIN entry_revisions r ON r.entry_id = e.id
+    WHERE e.user_id = $1 AND e.date = $2
+    ORDER BY r.id DESC
+'''
+SELECT_ENTRY_BY_DATE_SQL = '''
+    SELECT id, date, journal, intention, dream, priorities, reflection, strategy, created_at,
+           reflection_summary, dream_interpretation, mindset_insight
+    FROM entries WHERE user_id = $1 AND date = $2
+'''
+SELECT_EXPORT_SQL = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM entries WHERE user_id = $1 ORDER BY date"
+SELECT_ENTRY_HEADER_BY_DATE_SQL = '''
+    SELECT id, date, intention, priorities, created_at FROM entries WHERE user_id = $1 AND date = $2
+'''
+SELECT_DEFERRED_TEXT_SQL = f"SELECT {', '.join(DEFERRED_FIELDS)} FROM entries WHERE user_id = $1 AND id = $2"
+SELECT_ENTRIES_BY_IDS_SQL = '''
+    SELECT id, date, journal, intention, priorities, created_at FROM entries WHERE user_id = $1 AND id = ANY($2::bigint[])
+'''
+SELECT_LATEST_SUMMARIES_SQL = '''
+    SELECT id, date, intention, created_at FROM entries WHERE user_id = $1 ORDER BY date DESC LIMIT $2
+'''
+SELECT_SUMMARIES_BEFORE_SQL = '''
+    SELECT id, date, intention, created_at FROM entries WHERE user_id = $1 AND date < $2 ORDER BY date DESC LIMIT $3
+'''
+SELECT_ALL_DATES_SQL = 'SELECT date FROM entries WHERE user_id = $1 ORDER BY date DESC'
+SELECT_LATEST_DATES_SQL = 'SELECT date FROM entries WHERE user_id = $1 ORDER BY date DESC LIMIT $2'
+SELECT_DATES_BEFORE_SQL = 'SELECT date FROM entries WHERE user_id = $1 AND date < $2 ORDER BY date DESC LIMIT $3'
+SELECT_DATES_AFTER_SQL = 'SELECT date FROM entries WHERE user_id = $1 AND date > $2 ORDER BY date ASC LIMIT $3'
+ENTRY_EXISTS_SQL = 'SELECT 1 FROM entries WHERE user_id = $1 AND date = $2'
+INSERT_USER_SQL = 'INSERT INTO users (username, name, email) VALUES ($1, $2, $3) ON CONFLICT (username) DO NOTHING'
+SELECT_USER_ID_SQL = 'SELECT id FROM users WHERE username = $1'
+SELECT_USER_SQL = 'SELECT id, username, name, email, password_hash FROM users WHERE username = $1'
+SAVE_USER_SQL = '''
+    INSERT INTO users (username, name, email, password_hash) VALUES ($1, $2, $3, $4)
+    ON CONFLICT (username) DO UPDATE SET
+        name = excluded.name, email = excluded.email, password_hash = excluded.password_hash
+    RETURNING id
+'''
+INSERT_SESSION_SQL = 'INSERT INTO sessions (id, user_id, expires_at) VALUES ($1, $2, $3)'
+SELECT_SESSION_SQL = '''
+    SELECT s.id, s.user_id, u.username, u.name, s.expires_at
+    FROM sessions s JOIN users u ON u.id = s.user_id
+    WHERE s.id = $1 AND NOT s.revoked AND s.expires_at > $2
+'''
+DELETE_EXPIRED_SESSIONS_SQL = 'DELETE FROM sessions WHERE expires_at <= $1'
+REVOKE_SESSION_SQL = 'UPDATE sessions SET revoked = true WHERE id = $1 AND NOT revoked'
+REVOKE_USER_SESSIONS_SQL = 'UPDATE sessions SET revoked = true WHERE user_id = $1 AND NOT revoked'
+# Ranked like SearchResult.rank from SQLite: lower is better. ts_rank weights are
+# given for the D, C, B and A labels of the search column, and headlines are only
+# built for the returned page.
+SEARCH_ENTRIES_SQL = '''
+    WITH page AS (
+        SELECT id, date, journal, intention, dream, priorities, reflection, query,
+               -ts_rank('{0.25, 0.5, 0.75, 1.0}', search, query) AS score
+        FROM entries, plainto_tsquery('english', $2) AS query
+        WHERE user_id = $1 AND search @@ query
+        ORDER BY score, id DESC
+        LIMIT $3 OFFSET $4
+    )
+    SELECT id, date,
+           ts_headline('english', concat_ws(' ', journal, intention, dream, priorities, reflection), query,
+                       'StartSel=**, StopSel=**, MaxWords=16, MinWords=8, MaxFragments=1, FragmentDelimiter=…'),
+           score
+    FROM page
+    ORDER BY score, id DESC
+'''
+INSERT_JOB_SQL = '''
+    INSERT INTO reflection_jobs (user_id, id, status, date, journal, intention, dream, priorities)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+'''
+SELECT_JOB_SQL = '''
+    SELECT id, status, date, journal, intention, dream, priorities, result, error, entry_id, created_at, updated_at,
+           user_id
+    FROM reflection_jobs WHERE user_id = $1 AND id = $2
+'''
+CLAIM_JOB_SQL = f'''
+    UPDATE reflection_jobs SET status = 'running', updated_at = {NOW_TEXT}
+    WHERE user_id = $1 AND id = $2 AND status = 'pending'
+'''
+COMPLETE_JOB_SQL = f'''
+    UPDATE reflection_jobs SET status = 'done', result = $1, entry_id = $2, updated_at = {NOW_TEXT}
+    WHERE user_id = $3 AND id = $4
+'''
+FAIL_JOB_SQL = f'''
+    UPDATE reflection_jobs SET status = 'failed', error = $1, updated_at = {NOW_TEXT} WHERE user_id = $2 AND id = $3
+'''
+REQUEUE_STALE_JOBS_SQL = f'''
+    UPDATE reflection_jobs SET status = 'pending', updated_at = {NOW_TEXT}
+    WHERE status = 'running'
+      AND updated_at < to_char((now() - make_interval(secs => $1)) AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')
+'''
+SELECT_PENDING_JOBS_SQL = "SELECT id, user_id FROM reflection_jobs WHERE status = 'pending' ORDER BY created_at"
+# database.stats' statements in PostgreSQL's dialect; run_stats_queries runs its logic
+POSTGRES_STATS_SQL: Dict[str, str] = {
+    'run_ending': 'SELECT start_date FROM entry_streaks WHERE user_id = $1 AND end_date = $2',
+    'run_starting': 'SELECT end_date FROM entry_streaks WHERE user_id = $1 AND start_date = $2',
+    'delete_run': 'DELETE FROM entry_streaks WHERE user_id = $1 AND start_date = $2',
+    'insert_run': 'INSERT INTO entry_streaks (user_id, start_date, end_date) VALUES ($1, $2, $3)',
+    'update_stats': '''
+        INSERT INTO entry_stats (user_id, total_days, first_date, last_date, longest_streak)
+        VALUES ($1, 1, $2, $2, $3)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_days = entry_stats.total_days + 1,
+            first_date = least(entry_stats.first_date, excluded.first_date),
+            last_date = greatest(entry_stats.last_date, excluded.last_date),
+            longest_streak = greatest(entry_stats.longest_streak, excluded.longest_streak)
+    ''',
+    'increment_weekday': '''
+        INSERT INTO entry_weekdays (user_id, weekday, days) VALUES ($1, $2, 1)
+        ON CONFLICT (user_id, weekday) DO UPDATE SET days = entry_weekdays.days + 1
+    ''',
+    'select_stats': 'SELECT total_days, first_date, last_date, longest_streak FROM entry_stats WHERE user_id = $1',
+    'select_weekdays': 'SELECT weekday, days FROM entry_weekdays WHERE user_id = $1',
+    'count_dates_since': 'SELECT count(*) FROM entries WHERE user_id = $1 AND date >= $2',
+}
+
+async def run_stats_queries(conn, queries: Generator[Query, Any, Any]) -> Any:
+    """Run a database.stats query generator to completion on an asyncpg connection; returns its result."""
+    result = None
+    try:
+        while True:
+            key, params, fetch = queries.send(result)
+            if fetch == ROWS:
+                result = await conn.fetch(POSTGRES_STATS_SQL[key], *params)
+            elif fetch == VALUE:
+                result = await conn.fetchval(POSTGRES_STATS_SQL[key], *params)
+            else:
+                result = await conn.execute(POSTGRES_STATS_SQL[key], *params)
+    except StopIteration as stop:
+        return stop.value
+
+def _rowcount(status: str) -> int:
+    """Rows affected, from an asyncpg command status such as 'UPDATE 2'."""
+    return int(status.split()[-1])
+
+class AsyncConnectionPool:
+    """asyncpg connection pool driven by its own event loop thread.
+
+    The app is synchronous (Streamlit reruns, worker threads), so callers submit
+    coroutines with wait() or run() and block on the result, while the loop
+    multiplexes every thread's queries over at most max_size connections.
+    """
+
+    def __init__(self, dsn: str, max_size: int = Config.DATABASE_POOL_SIZE,
+                 timeout: float = Config.DATABASE_BUSY_TIMEOUT):
+        if asyncpg is None:
+            raise RuntimeError("PostgreSQL storage needs asyncpg: pip install asyncpg")
+        self.dsn = dsn
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="postgres-pool", daemon=True)
+        self._thread.start()
+        # Set by ensure_postgres_schema once the database is up to date.
+        self.schema_version = None
+        # get_async_pool() calls not yet matched by close_async_pool(); guarded by _pools_lock.
+        self.users = 0
+
+        async def create():
+            # statement_cache_size bounds each connection's prepared statements, like
+            # DATABASE_CACHED_STATEMENTS does for sqlite3
+            return await asyncpg.create_pool(dsn, min_size=1, max_size=max_size,
+                                             statement_cache_size=Config.DATABASE_CACHED_STATEMENTS)
+        try:
+            self._pool = self.wait(create())
+        except Exception:
+            self._stop()
+            raise
+
+    def wait(self, awaitable: Awaitable) -> Any:
+        """Run an awaitable on the pool's loop and block until it finishes."""
+        async def run():
+            return await awaitable
+        return asyncio.run_coroutine_threadsafe(run(), self.loop).result()
+
+    def run(self, operation: Callable[[Any], Awaitable], transaction: bool = False) -> Any:
+        """Run operation(conn) on a borrowed connection, in a transaction if asked, and return its result."""
+        async def call():
+            async with self._pool.acquire(timeout=self.timeout) as conn:
+                if not transaction:
+                    return await operation(conn)
+                async with conn.transaction():
+                    return await operation(conn)
+        return self.wait(call())
+
+    def acquire(self):
+        """Borrow a connection for longer than one call; give it back with release()."""
+        return self.wait(self._pool.acquire(timeout=self.timeout))
+
+    def release(self, conn):
+        self.wait(self._pool.release(conn))
+
+    def _stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def close(self):
+        """Close every connection and stop the loop thread."""
+        try:
+            self.wait(self._pool.close())
+        finally:
+            self._stop()
+
+_pools: Dict[str, AsyncConnectionPool] = {}
+_pools_lock = threading.Lock()
+_schema_lock = threading.Lock()
+
+def get_async_pool(dsn: str) -> AsyncConnectionPool:
+    """Return the process-wide connection pool for a PostgreSQL URL.
+
+    Like database.connection.get_pool, every call must be matched by one
+    close_async_pool() call.
+    """
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = _pools[dsn] = AsyncConnectionPool(dsn)
+            logging.info("Created PostgreSQL connection pool")
+        pool.users += 1
+        return pool
+
+def close_async_pool(dsn: str):
+    """Release one get_async_pool() call, closing and forgetting the pool after the last."""
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            return
+        pool.users -= 1
+        if pool.users > 0:
+            return
+        del _pools[dsn]
+    pool.close()
+
+async def run_postgres_migrations(conn, migrations: Iterable[Migration] = POSTGRES_MIGRATIONS) -> int:
+    """Apply pending migrations in one transaction; returns the schema version."""
+    async with conn.transaction():
+        # Replicas starting together queue here, so each migration is applied once
+        await conn.execute(LOCK_SQL, MIGRATION_LOCK_CLASS, 0)
+        await conn.execute(CREATE_SCHEMA_VERSION_SQL)
+        version = await conn.fetchval('SELECT coalesce(max(version), 0) FROM schema_version')
+        for migration in migrations:
+            if migration.version <= version:
+                continue
+            for step in migration.steps:
+                if callable(step):
+                    await step(conn)
+                else:
+                    await conn.execute(step)
+            await conn.execute(
+                'INSERT INTO schema_version (version, description) VALUES ($1, $2)',
+                migration.version, migration.description
+            )
+            version = migration.version
+            logging.info(f"Applied PostgreSQL schema migration {migration.version}: {migration.description}")
+        return version
+
+def ensure_postgres_schema(pool: AsyncConnectionPool) -> int:
+    """Bring the pool's database up to date, once per pool (i.e. per process and URL)."""
+    if pool.schema_version is not None:
+        return pool.schema_version
+
+    with _schema_lock:
+        if pool.schema_version is None:
+            pool.schema_version = pool.run(run_postgres_migrations)
+        return pool.schema_version
+
+class PostgresDatabaseManager(StorageBackend):
+    """StorageBackend on a PostgreSQL server, for one user of it.
+
+    Several app replicas can share the database. Queries run on the shared
+    AsyncConnectionPool for the URL, and each method blocks until its result
+    is ready. Entry writes take a per-user advisory lock for the transaction, so
+    concurrent saves by one user are applied one at a time, as SQLite's single
+    writer applies them; other users' saves run in parallel.
+    """
+
+    def __init__(self, dsn: str, user_id: int = LEGACY_USER_ID):
+        self.db_path = dsn
+        self.user_id = user_id
+        self.pool = get_async_pool(dsn)
+        self._closed = False
+        self.init_database()
+
+    def for_user(self, user_id: int) -> 'PostgresDatabaseManager':
+        """A manager for the same database scoped to another user."""
+        return self if user_id == self.user_id else PostgresDatabaseManager(self.db_path, user_id)
+
+    def init_database(self):
+        """Apply any pending schema migrations (a no-op after the first call per process)."""
+        try:
+            ensure_postgres_schema(self.pool)
+        except Exception as e:
+            logging.error(f"Database initialization error: {e}")
+            raise
+
+    def close(self):
+        """Release this manager's use of the pooled connections; the database's last open manager closes them."""
+        if not self._closed:
+            self._closed = True
+            close_async_pool(self.db_path)
+
+    def ensure_user(self, username: str, name: str = "", email: str = "") -> Optional[int]:
+        """Return the id of the account with this username, creating it first if needed."""
+        async def ensure(conn):
+            await conn.execute(INSERT_USER_SQL, username, name, email)
+            return await conn.fetchval(SELECT_USER_ID_SQL, username)
+        try:
+            return self.pool.run(ensure, transaction=True)
+        except Exception as e:
+            logging.error(f"Error saving user: {e}")
+            return None
+
+    def get_user(self, username: str) -> Optional[User]:
+        """Retrieve an account, with its password hash, by username."""
+        try:
+            row = self.pool.run(lambda conn: conn.fetchrow(SELECT_USER_SQL, username))
+            if row:
+                return User(id=row[0], username=row[1], name=row[2], email=row[3], password_hash=row[4])
+            return None
+        except Exception as e:
+            logging.error(f"Error retrieving user: {e}")
+            return None
+
+    def save_user(self, user: User) -> Optional[int]:
+        """Create or update an account by username and return its id."""
+        try:
+            return self.pool.run(lambda conn: conn.fetchval(
+                SAVE_USER_SQL, user.username, user.name, user.email, user.password_hash
+            ))
+        except Exception as e:
+            logging.error(f"Error saving user: {e}")
+            return None
+
+    def create_session(self, session: UserSession) -> bool:
+        """Record a new login session, dropping expired ones."""
+        async def create(conn):
+            await conn.execute(DELETE_EXPIRED_SESSIONS_SQL, int(time.time()))
+            await conn.execute(INSERT_SESSION_SQL, session.id, session.user_id, session.expires_at)
+        try:
+            self.pool.run(create, transaction=True)
+            return True
+        except Exception as e:
+            logging.error(f"Error creating session: {e}")
+            return False
+
+    def get_session(self, session_id: str) -> Optional[UserSession]:
+        """Retrieve a login session unless it has expired or been revoked."""
+        try:
+            row = self.pool.run(lambda conn: conn.fetchrow(SELECT_SESSION_SQL, session_id, int(time.time())))
+            if row:
+                return UserSession(id=row[0], user_id=row[1], username=row[2], name=row[3], expires_at=row[4])
+            return None
+        except Exception as e:
+            logging.error(f"Error retrieving session: {e}")
+            return None
+
+    def revoke_sessions(self, session_id: Optional[str] = None, user_id: Optional[int] = None) -> int:
+        """Revoke one session, or every session of a user; returns how many were revoked."""
+        try:
+            if session_id is not None:
+                status = self.pool.run(lambda conn: conn.execute(REVOKE_SESSION_SQL, session_id))
+            else:
+                status = self.pool.run(lambda conn: conn.execute(REVOKE_USER_SESSIONS_SQL, user_id))
+            return _rowcount(status)
+        except Exception as e:
+            logging.error(f"Error revoking sessions: {e}")
+            return 0
+
+    async def _upsert_entries(self, conn, params: List[tuple]) -> Dict[str, int]:
+        """Save a batch of entry parameters with distinct dates in an open transaction; returns ids by date.
+
+        Dates that already had an entry get their old version archived first; the
+        others are folded into the statistics.
+        """
+        dates = [param[1] for param in params]
+        # Holding the user's lock keeps the existing dates read below true until
+        # commit, and commits their embeddings in seq order for EmbeddingIndex
+        await conn.execute(LOCK_SQL, ENTRY_LOCK_CLASS, self.user_id)
+        await conn.executemany(ARCHIVE_ENTRY_SQL, [(self.user_id, date) for date in dates])
+        existing = {row[0] for row in await conn.fetch(SELECT_DATE_IDS_SQL, self.user_id, dates)}
+        await conn.executemany(UPSERT_ENTRY_SQL, params)
+        ids = dict(await conn.fetch(SELECT_DATE_IDS_SQL, self.user_id, dates))
+        await conn.executemany(SAVE_EMBEDDING_SQL, [
+            (ids[param[1]], self.user_id, entry_vector(param[2], param[3], param[4], param[5])) for param in params
+        ])
+        for date_str in sorted(set(dates) - existing):
+            await run_stats_queries(conn, record_entry_date_queries(self.user_id, date_str))
+        return ids
+
+    def save_entry(self, entry: JournalEntry) -> bool:
+        """Save a journal entry to the database."""
+        try:
+            self.pool.run(lambda conn: self._upsert_entries(conn, [self._entry_params(entry)]), transaction=True)
+            logging.info(f"Entry saved for date: {entry.date}")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving entry: {e}")
+            return False
+
+    def save_entries(self, entries: List[JournalEntry]) -> int:
+        """Save many entries in a single transaction; returns the number saved."""
+        if not entries:
+            return 0
+
+        async def save(conn):
+            for batch in distinct_date_batches(map(self._entry_params, entries), Config.ENTRY_BATCH_SIZE):
+                await self._upsert_entries(conn, batch)
+        try:
+            self.pool.run(save, transaction=True)
+            logging.info(f"Saved {len(entries)} entries in one batch")
+            return len(entries)
+        except Exception as e:
+            logging.error(f"Error saving entries: {e}")
+            return 0
+
+    def export_rows(self, batch_size: int = Config.ENTRY_BATCH_SIZE) -> Iterator[List[tuple]]:
+        """Stream this user's entries, oldest first, as lists of EXPORT_COLUMNS tuples.
+
+        A server-side cursor in a read-only repeatable-read transaction gives a
+        consistent snapshot while one batch at a time is held in memory. Errors
+        are raised, not logged, so a backup is never silently cut short.
+        """
+        conn = self.pool.acquire()
+        try:
+            transaction = conn.transaction(isolation='repeatable_read', readonly=True)
+            self.pool.wait(transaction.start())
+            try:
+                cursor = self.pool.wait(conn.cursor(SELECT_EXPORT_SQL, self.user_id))
+                while True:
+                    rows = self.pool.wait(cursor.fetch(batch_size))
+                    if not rows:
+                        return
+                    yield [tuple(row) for row in rows]
+            finally:
+                self.pool.wait(transaction.rollback())
+        finally:
+            self.pool.release(conn)
+
+    def import_entries(self, rows: Iterable[Dict[str, Any]], batch_size: int = Config.ENTRY_BATCH_SIZE) -> int:
+        """Save rows keyed by EXPORT_COLUMNS, one transaction per batch; returns the number saved.
+
+        Rows are consumed lazily, so any number can be imported in constant memory.
+        A bad row stops the import; the batches before it stay saved.
+        """
+        saved = 0
+        try:
+            for batch in distinct_date_batches(map(self._row_params, rows), batch_size):
+                self.pool.run(lambda conn: self._upsert_entries(conn, batch), transaction=True)
+                saved += len(batch)
+            logging.info(f"Imported {saved} entries")
+        except Exception as e:
+            logging.error(f"Error importing entries after {saved} saved: {e}")
+        return saved
+
+    def get_entry_by_date(self, date: str, deferred: bool = False) -> Optional[JournalEntry]:
+        """Retrieve an entry by date.
+
+        With deferred, only the id, date, intention and priorities are read; the
+        journal and reflection text are fetched the first time one is accessed.
+        """
+        try:
+            if deferred:
+                row = self.pool.run(lambda conn: conn.fetchrow(SELECT_ENTRY_HEADER_BY_DATE_SQL, self.user_id, date))
+                return JournalEntry.deferred(
+                    self._text_loader(row[0]), id=row[0], date=row[1], intention=row[2], priorities=row[3],
+                    created_at=row[4]
+                ) if row else None
+            row = self.pool.run(lambda conn: conn.fetchrow(SELECT_ENTRY_BY_DATE_SQL, self.user_id, date))
+            return self._entry_from_row(row) if row else None
+        except Exception as e:
+            logging.error(f"Error retrieving entry: {e}")
+            return None
+
+    def _text_loader(self, entry_id: int) -> Callable[[], Optional[Dict[str, str]]]:
+        """Loader for a deferred entry's text columns."""
+        def load() -> Optional[Dict[str, str]]:
+            try:
+                row = self.pool.run(lambda conn: conn.fetchrow(SELECT_DEFERRED_TEXT_SQL, self.user_id, entry_id))
+                return dict(zip(DEFERRED_FIELDS, row)) if row else None
+            except Exception as e:
+                logging.error(f"Error loading entry text: {e}")
+                return None
+        return load
+
+    def get_revisions(self, date: str) -> List[JournalEntry]:
+        """Earlier versions of the entry for a date, newest first; they share the entry's id."""
+        try:
+            rows = self.pool.run(lambda conn: conn.fetch(SELECT_REVISIONS_SQL, self.user_id, date))
+            return [self._entry_from_row(row) for row in rows]
+        except Exception as e:
+            logging.error(f"Error retrieving revisions: {e}")
+            return []
+
+    @staticmethod
+    def _entry_from_row(row) -> JournalEntry:
+        return JournalEntry(
+            id=row[0],
+            date=row[1],
+            journal=row[2],
+            intention=row[3],
+            dream=row[4],
+            priorities=row[5],
+            reflection=row[6],
+            strategy=row[7],
+            created_at=row[8],
+            reflection_summary=row[9],
+            dream_interpretation=row[10],
+            mindset_insight=row[11]
+        )
+
+    def get_all_dates(self) -> List[str]:
+        """Get all dates with entries."""
+        try:
+            return [row[0] for row in self.pool.run(lambda conn: conn.fetch(SELECT_ALL_DATES_SQL, self.user_id))]
+        except Exception as e:
+            logging.error(f"Error retrieving dates: {e}")
+            return []
+
+    def get_entries_by_ids(self, entry_ids: List[int]) -> Dict[int, JournalEntry]:
+        """Retrieve several entries by id, with their journal and intention; other text is deferred."""
+        if not entry_ids:
+            return {}
+        try:
+            rows = self.pool.run(lambda conn: conn.fetch(SELECT_ENTRIES_BY_IDS_SQL, self.user_id, list(entry_ids)))
+            return {
+                row[0]: JournalEntry.deferred(self._text_loader(row[0]), id=row[0], date=row[1], journal=row[2],
+                                              intention=row[3], priorities=row[4], created_at=row[5])
+                for row in rows
+            }
+        except Exception as e:
+            logging.error(f"Error retrieving entries: {e}")
+            return {}
+
+    def get_entry_summaries(self, before: Optional[str] = None, limit: int = 31) -> List[EntrySummary]:
+        """Get one keyset page of entry summaries for listings, newest first, strictly before `before`."""
+        try:
+            if before is not None:
+                rows = self.pool.run(lambda conn: conn.fetch(SELECT_SUMMARIES_BEFORE_SQL, self.user_id, before, limit))
+            else:
+                rows = self.pool.run(lambda conn: conn.fetch(SELECT_LATEST_SUMMARIES_SQL, self.user_id, limit))
+            return [EntrySummary(*row) for row in rows]
+        except Exception as e:
+            logging.error(f"Error retrieving entry summaries: {e}")
+            return []
+
+    def get_dates_page(self, before: Optional[str] = None, after: Optional[str] = None,
+                       limit: int = 31) -> List[str]:
+        """Get one keyset page of dates with entries (see DatabaseManager.get_dates_page)."""
+        try:
+            if after is not None:
+                rows = self.pool.run(lambda conn: conn.fetch(SELECT_DATES_AFTER_SQL, self.user_id, after, limit))
+            elif before is not None:
+                rows = self.pool.run(lambda conn: conn.fetch(SELECT_DATES_BEFORE_SQL, self.user_id, before, limit))
+            else:
+                rows = self.pool.run(lambda conn: conn.fetch(SELECT_LATEST_DATES_SQL, self.user_id, limit))
+            return [row[0] for row in rows]
+        except Exception as e:
+            logging.error(f"Error retrieving dates page: {e}")
+            return []
+
+    def get_stats(self) -> JournalStats:
+        """Get the precomputed journaling statistics."""
+        try:
+            return self.pool.run(lambda conn: run_stats_queries(conn, read_stats_queries(self.user_id)))
+        except Exception as e:
+            logging.error(f"Error retrieving stats: {e}")
+            return JournalStats()
+
+    def entry_exists_for_date(self, date: str) -> bool:
+        """Check if an entry exists for a given date."""
+        try:
+            return self.pool.run(lambda conn: conn.fetchval(ENTRY_EXISTS_SQL, self.user_id, date)) is not None
+        except Exception as e:
+            logging.error(f"Error checking entry existence: {e}")
+            return False
+
+    def get_embeddings(self, after_seq: int = 0) -> List[Tuple[int, int, str, bytes]]:
+        """(seq, entry id, date, vector) of this user's entry embeddings saved after a sequence number, in order."""
+        try:
+            rows = self.pool.run(lambda conn: conn.fetch(SELECT_EMBEDDINGS_SQL, self.user_id, after_seq))
+            return [tuple(row) for row in rows]
+        except Exception as e:
+            logging.error(f"Error retrieving embeddings: {e}")
+            return []
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> List[SearchResult]:
+        """Full-text search over entries with highlighted snippets, most relevant first.
+
+        Every word must match (after English stemming), like the SQLite search.
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        try:
+            rows = self.pool.run(lambda conn: conn.fetch(SEARCH_ENTRIES_SQL, self.user_id, ' '.join(terms), limit, offset))
+            return [SearchResult(entry_id=row[0], date=row[1], snippet=row[2], rank=row[3]) for row in rows]
+        except Exception as e:
+            logging.error(f"Error searching entries: {e}")
+            return []
+
+    def train_compression_dictionary(self, samples: int = Config.TEXT_COMPRESSION_DICTIONARY_SAMPLES) -> Optional[int]:
+        """Not needed: PostgreSQL compresses long text values itself (TOAST)."""
+        logging.info("PostgreSQL compresses entry text itself; no dictionary is trained")
+        return None
+
+    def create_job(self, job: ReflectionJob) -> bool:
+        """Persist a new pending reflection job."""
+        try:
+            self.pool.run(lambda conn: conn.execute(
+                INSERT_JOB_SQL, self.user_id, job.id, job.status, job.date, job.journal, job.intention, job.dream,
+                job.priorities
+            ))
+            return True
+        except Exception as e:
+            logging.error(f"Error creating job: {e}")
+            return False
+
+    def get_job(self, job_id: str) -> Optional[ReflectionJob]:
+        """Retrieve a reflection job by id."""
+        try:
+            row = self.pool.run(lambda conn: conn.fetchrow(SELECT_JOB_SQL, self.user_id, job_id))
+            if row:
+                return ReflectionJob(
+                    id=row[0],
+                    status=row[1],
+                    date=row[2],
+                    journal=row[3],
+                    intention=row[4],
+                    dream=row[5],
+                    priorities=row[6],
+                    result=json.loads(row[7]) if row[7] else None,
+                    error=row[8],
+                    entry_id=row[9],
+                    created_at=row[10],
+                    updated_at=row[11],
+                    user_id=row[12]
+                )
+            return None
+        except Exception as e:
+            logging.error(f"Error retrieving job: {e}")
+            return None
+
+    def claim_job(self, job_id: str) -> bool:
+        """Move a pending job to running; False if another worker already took it."""
+        try:
+            return _rowcount(self.pool.run(lambda conn: conn.execute(CLAIM_JOB_SQL, self.user_id, job_id))) == 1
+        except Exception as e:
+            logging.error(f"Error claiming job: {e}")
+            return False
+
+    def complete_job(self, job_id: str, entry: JournalEntry, results: Dict[str, str]) -> Optional[int]:
+        """Save the job's entry and mark it done in one transaction; returns the entry id."""
+        async def complete(conn):
+            entry_id = (await self._upsert_entries(conn, [self._entry_params(entry)]))[entry.date]
+            await conn.execute(COMPLETE_JOB_SQL, json.dumps(results), entry_id, self.user_id, job_id)
+            return entry_id
+        try:
+            entry_id = self.pool.run(complete, transaction=True)
+            logging.info(f"Entry saved for date: {entry.date} (job {job_id})")
+            return entry_id
+        except Exception as e:
+            logging.error(f"Error completing job: {e}")
+            return None
+
+    def fail_job(self, job_id: str, error: str) -> bool:
+        """Mark a job as failed."""
+        try:
+            self.pool.run(lambda conn: conn.execute(FAIL_JOB_SQL, error, self.user_id, job_id))
+            return True
+        except Exception as e:
+            logging.error(f"Error failing job: {e}")
+            return False
+
+    def requeue_stale_jobs(self, stale_seconds: float) -> List[Tuple[str, int]]:
+        """Reset jobs left running by a dead process and return every pending (job id, user id).
+
+        Worker recovery spans all users, so unlike the other job methods this is not scoped.
+        """
+        async def requeue(conn):
+            await conn.execute(REQUEUE_STALE_JOBS_SQL, float(stale_seconds))
+            return await conn.fetch(SELECT_PENDING_JOBS_SQL)
+        try:
+            return [(row[0], row[1]) for row in self.pool.run(requeue, transaction=True)]
+        except Exception as e:
+            logging.error(f"Error requeueing jobs: {e}")
+            return []
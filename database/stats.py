@@ -0,0 +1,118 @@
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Dict, Generator, Optional, Tuple
+from database.models import JournalStats
+
+# entry_stats holds one row of running totals over distinct entry dates per user;
+# entry_streaks holds one row per run of consecutive dates. Both only grow,
+# because entries are never deleted, so each new date is an O(log n) update.
+#
+# The logic is written once, as generators that yield the queries they need and
+# are sent each result: run_queries() drives them on a sqlite3 connection with
+# STATS_SQL, and database.postgres drives them on asyncpg with its own dialect.
+STATS_SQL: Dict[str, str] = {
+    'run_ending': 'SELECT start_date FROM entry_streaks WHERE user_id = ? AND end_date = ?',
+    'run_starting': 'SELECT end_date FROM entry_streaks WHERE user_id = ? AND start_date = ?',
+    'delete_run': 'DELETE FROM entry_streaks WHERE user_id = ? AND start_date = ?',
+    'insert_run': 'INSERT INTO entry_streaks (user_id, start_date, end_date) VALUES (?, ?, ?)',
+    'update_stats': '''
+        INSERT INTO entry_stats (user_id, total_days, first_date, last_date, longest_streak)
+        VALUES (?1, 1, ?2, ?2, ?3)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_days = total_days + 1,
+            first_date = min(first_date, ?2),
+            last_date = max(last_date, ?2),
+            longest_streak = max(longest_streak, ?3)
+    ''',
+    'increment_weekday': '''
+        INSERT INTO entry_weekdays (user_id, weekday, days) VALUES (?, ?, 1)
+        ON CONFLICT (user_id, weekday) DO UPDATE SET days = days + 1
+    ''',
+    'select_stats': 'SELECT total_days, first_date, last_date, longest_streak FROM entry_stats WHERE user_id = ?',
+    'select_weekdays': 'SELECT weekday, days FROM entry_weekdays WHERE user_id = ?',
+    'count_dates_since': 'SELECT count(*) FROM entries WHERE user_id = ? AND date >= ?',
+}
+# What a query is sent back: nothing, the first column of its first row (None
+# without rows), or all its rows
+EXECUTE, VALUE, ROWS = 'execute', 'value', 'rows'
+# (STATS_SQL key, parameters, one of EXECUTE/VALUE/ROWS)
+Query = Tuple[str, tuple, str]
+
+def record_entry_date_queries(user_id: int, date_str: str) -> Generator[Query, Any, None]:
+    """Fold a date on which the user had no entry before into their running statistics."""
+    day = date.fromisoformat(date_str)
+    start = end = date_str
+
+    # Join the runs ending the day before and starting the day after, if any
+    before = yield ('run_ending', (user_id, (day - timedelta(days=1)).isoformat()), VALUE)
+    if before:
+        start = before
+        yield ('delete_run', (user_id, start), EXECUTE)
+    after = yield ('run_starting', (user_id, (day + timedelta(days=1)).isoformat()), VALUE)
+    if after:
+        end = after
+        yield ('delete_run', (user_id, (day + timedelta(days=1)).isoformat()), EXECUTE)
+    yield ('insert_run', (user_id, start, end), EXECUTE)
+
+    run_length = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    yield ('update_stats', (user_id, date_str, run_length), EXECUTE)
+    yield ('increment_weekday', (user_id, day.weekday()), EXECUTE)
+
+def read_stats_queries(user_id: int, today: Optional[date] = None) -> Generator[Query, Any, JournalStats]:
+    """Read a user's precomputed statistics plus the rolling 7-day window."""
+    today = today or date.today()
+    rows = yield ('select_stats', (user_id,), ROWS)
+    if not rows:
+        return JournalStats()
+    total_days, first_date, last_date, longest_streak = rows[0]
+    weekday_counts = [0] * 7
+    for weekday, days in (yield ('select_weekdays', (user_id,), ROWS)):
+        weekday_counts[weekday] = days
+
+    # The current streak is the run ending at the latest entry, if that is today or yesterday
+    current_streak = 0
+    if last_date and last_date >= (today - timedelta(days=1)).isoformat():
+        start = yield ('run_ending', (user_id, last_date), VALUE)
+        current_streak = (date.fromisoformat(last_date) - date.fromisoformat(start)).days + 1
+
+    return JournalStats(
+        total_days=total_days,
+        first_date=first_date,
+        last_date=last_date,
+        current_streak=current_streak,
+        longest_streak=longest_streak,
+        last_7_days=(yield ('count_dates_since', (user_id, (today - timedelta(days=6)).isoformat()), VALUE)),
+        weekday_counts=weekday_counts
+    )
+
+def run_queries(conn: sqlite3.Connection, queries: Generator[Query, Any, Any],
+                sql: Dict[str, str] = STATS_SQL) -> Any:
+    """Run a query generator to completion on a sqlite3 connection; returns its result."""
+    result = None
+    try:
+        while True:
+            key, params, fetch = queries.send(result)
+            cursor = conn.execute(sql[key], params)
+            if fetch == ROWS:
+                result = cursor.fetchall()
+            elif fetch == VALUE:
+                row = cursor.fetchone()
+                result = row[0] if row else None
+            else:
+                result = None
+    except StopIteration as stop:
+        return stop.value
+
+def record_entry_date(conn: sqlite3.Connection, user_id: int, date_str: str):
+    """Fold a date on which the user had no entry before into their running statistics."""
+    run_queries(conn, record_entry_date_queries(user_id, date_str))
+
+def backfill_entry_stats(conn: sqlite3.Connection):
+    """Migration step: build every user's statistics from entries written before the stats tables existed."""
+    rows = conn.execute('SELECT DISTINCT user_id, date FROM entries ORDER BY user_id, date').fetchall()
+    for user_id, date_str in rows:
+        record_entry_date(conn, user_id, date_str)
+
+def read_stats(conn: sqlite3.Connection, user_id: int, today: Optional[date] = None) -> JournalStats:
+    """Read a user's precomputed statistics plus the rolling 7-day window."""
+    return run_queries(conn, read_stats_queries(user_id, today))
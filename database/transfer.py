@@ -0,0 +1,110 @@
+import os
+import csv
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from database.backend import EXPORT_COLUMNS, StorageBackend
+from config.settings import Config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: Parquet export and import are unavailable
+    pa = pq = None
+
+# Streaming export and import of one user's entries. Files have one row per
+# entry with the EXPORT_COLUMNS fields, so an export can be restored into another
+# database or account, and JSONL/CSV exports are valid batch_reflections input.
+FORMATS = ('jsonl', 'csv', 'parquet')
+
+def detect_format(path: str) -> str:
+    """The transfer format named by a file's extension."""
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type {extension!r}; expected one of {', '.join(FORMATS)}")
+    return extension
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet files need pyarrow: pip install pyarrow")
+
+def write_rows(batches: Iterable[List[tuple]], path: str, fmt: str) -> int:
+    """Write batches of EXPORT_COLUMNS tuples to a file, one batch in memory at a time; returns the row count."""
+    count = 0
+    if fmt == 'parquet':
+        _require_pyarrow()
+        schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in batches:
+                # Each batch becomes one row group
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, pa.string()) for values in zip(*batch)], schema=schema
+                ))
+                count += len(batch)
+        return count
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for batch in batches:
+                writer.writerows(batch)
+                count += len(batch)
+        else:
+            for batch in batches:
+                f.writelines(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n' for row in batch)
+                count += len(batch)
+    return count
+
+def read_rows(path: str, fmt: str, batch_size: int = Config.ENTRY_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield rows from an export file as dicts, reading it incrementally."""
+    if fmt == 'parquet':
+        _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    elif fmt == 'csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def export_entries(db: StorageBackend, path: str, fmt: Optional[str] = None,
+                   batch_size: int = Config.ENTRY_BATCH_SIZE) -> int:
+    """Export the manager's user's entries to a file; returns how many were written.
+
+    The file is written beside the target and moved into place when complete,
+    so a failed export never leaves a truncated backup.
+    """
+    fmt = fmt or detect_format(path)
+    tmp_path = f"{path}.tmp"
+    try:
+        count = write_rows(db.export_rows(batch_size), tmp_path, fmt)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    logging.info(f"Exported {count} entries for user {db.user_id} to {path}")
+    return count
+
+def import_entries(db: StorageBackend, path: str, fmt: Optional[str] = None,
+                   batch_size: int = Config.ENTRY_BATCH_SIZE) -> Tuple[int, int]:
+    """Import an export file into the manager's user's entries; returns (rows read, entries saved).
+
+    A row for a date that already has an entry overwrites it, keeping the old
+    version as a revision. Fewer saved than read means the import stopped at a bad row.
+    """
+    fmt = fmt or detect_format(path)
+    read = 0
+
+    def counted(rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal read
+        for row in rows:
+            read += 1
+            yield row
+
+    saved = db.import_entries(counted(read_rows(path, fmt, batch_size)), batch_size)
+    return read, saved
@@ -0,0 +1,121 @@
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+from agent.langchain_agent import ConsciousDayAgent
+from database.backend import StorageBackend
+from database.db_manager import get_database_manager
+from database.models import JournalEntry, ReflectionJob
+from retrieval.context import build_context
+from config.settings import Config
+
+class ReflectionJobQueue:
+    """Runs reflection generation on a worker pool so page renders never block on the LLM.
+
+    Jobs are persisted in the reflection_jobs table, so a submission survives the
+    user navigating away, and pending work is picked up again after a restart.
+    While a job runs, the text streamed so far is available from get_partial().
+    Jobs belong to a user (the queue database's own user unless given), and
+    their entries are saved for that user.
+    """
+
+    def __init__(self, db: StorageBackend, agent_factory: Callable[[], ConsciousDayAgent] = ConsciousDayAgent,
+                 max_workers: int = Config.JOB_WORKERS):
+        self.db = db
+        self.agent_factory = agent_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reflection-job")
+        self._partial: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _db_for(self, user_id: Optional[int]) -> StorageBackend:
+        return self.db if user_id is None else self.db.for_user(user_id)
+
+    def submit(self, form_data: Dict[str, str], user_id: Optional[int] = None) -> Optional[str]:
+        """Persist a job for the form inputs and start it; returns the job id."""
+        db = self._db_for(user_id)
+        job = ReflectionJob(
+            id=uuid.uuid4().hex,
+            date=form_data['date'],
+            journal=form_data['journal'],
+            intention=form_data['intention'],
+            dream=form_data['dream'],
+            priorities=form_data['priorities']
+        )
+        if not db.create_job(job):
+            return None
+        self.executor.submit(self._run, job.id, db.user_id)
+        logging.info(f"Queued reflection job {job.id} for {job.date}")
+        return job.id
+
+    def recover(self) -> int:
+        """Restart pending jobs and jobs abandoned by a process that died mid-run."""
+        job_ids = self.db.requeue_stale_jobs(Config.JOB_STALE_SECONDS)
+        for job_id, user_id in job_ids:
+            self.executor.submit(self._run, job_id, user_id)
+        if job_ids:
+            logging.info(f"Recovered {len(job_ids)} reflection job(s)")
+        return len(job_ids)
+
+    def get_job(self, job_id: str, user_id: Optional[int] = None) -> Optional[ReflectionJob]:
+        return self._db_for(user_id).get_job(job_id)
+
+    def get_partial(self, job_id: str) -> str:
+        """Text streamed so far for a running job ('' if none or not in this process)."""
+        with self._lock:
+            return self._partial.get(job_id, "")
+
+    def _generate(self, job_id: str, agent: ConsciousDayAgent, job: ReflectionJob,
+                  db: StorageBackend) -> Dict[str, str]:
+        """Produce the reflection the same way the inline page flow would."""
+        inputs = dict(journal=job.journal, intention=job.intention, dream=job.dream, priorities=job.priorities)
+        if Config.RETRIEVAL_ENABLED:
+            inputs['context'] = build_context(db, exclude_date=job.date, **inputs)
+        if Config.STREAM_RESPONSES:
+            received = []
+            for chunk in agent.stream_reflection(**inputs):
+                received.append(chunk)
+                with self._lock:
+                    self._partial[job_id] = "".join(received)
+            return agent.build_results("".join(received))
+        if Config.FANOUT_MODELS:
+            return asyncio.run(agent.agenerate_reflection(**inputs))
+        return agent.generate_reflection(**inputs)
+
+    def _run(self, job_id: str, user_id: int):
+        """Worker body: claim, generate, then save the entry and result atomically."""
+        db = self._db_for(user_id)
+        if not db.claim_job(job_id):
+            return
+        try:
+            job = db.get_job(job_id)
+            results = self._generate(job_id, self.agent_factory(), job, db)
+            entry = JournalEntry(
+                date=job.date,
+                journal=job.journal,
+                intention=job.intention,
+                dream=job.dream,
+                priorities=job.priorities,
+                reflection=results['full_response'],
+                strategy=results.get('strategy', ''),
+                reflection_summary=results.get('reflection', ''),
+                dream_interpretation=results.get('dream_interpretation', ''),
+                mindset_insight=results.get('mindset_insight', '')
+            )
+            if db.complete_job(job_id, entry, results) is None:
+                db.fail_job(job_id, "Failed to save entry to database.")
+        except Exception as e:
+            logging.error(f"Reflection job {job_id} failed: {e}")
+            db.fail_job(job_id, str(e))
+        finally:
+            with self._lock:
+                self._partial.pop(job_id, None)
+
+@lru_cache(maxsize=None)
+def get_job_queue(db_path: Optional[str] = None) -> ReflectionJobQueue:
+    """Return the process-wide job queue, resuming any unfinished jobs on first use."""
+    queue = ReflectionJobQueue(get_database_manager(db_path))
+    queue.recover()
+    return queue
@@ -1,14 +1,17 @@
 import streamlit as st
-from components.forms import DateSelector
+from datetime import date
+from components.forms import DateSelector, SearchBox
 from components.display import DisplayManager
-from database.db_manager import DatabaseManager
-from components.auth import AuthManager 
+from database.db_manager import get_database_manager
+from components.auth import get_auth_manager
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
 
 def render_history_page():
     """Render the history page for viewing previous entries."""
 
     # Initialize auth
-    auth = AuthManager()
+    auth = get_auth_manager()
     
     # Check authentication
     if not auth.is_authenticated():
@@ -19,12 +22,15 @@ def render_history_page():
     st.markdown("*Review your journey of self-reflection and growth.*")
     
     # Initialize components
-    db = DatabaseManager()
+    db = get_database_manager().for_user(auth.get_user_id())
     date_selector = DateSelector(db)
+    search_box = SearchBox(db)
     display = DisplayManager()
     
-    # Render date selector
-    selected_date = date_selector.render_date_selector()
+    # A date picked from search results takes precedence over the date selector
+    selected_date = search_box.render_search()
+    if not selected_date:
+        selected_date = date_selector.render_date_selector()
     
     if selected_date:
         # Fetch and display the entry
@@ -39,28 +45,33 @@ def render_history_page():
     st.markdown("---")
     st.subheader("📊 Your Reflection Journey")
     
-    all_dates = db.get_all_dates()
+    stats = db.get_stats()
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Entries", len(all_dates))
+        st.metric("Total Entries", stats.total_days)
     
     with col2:
-        if all_dates:
-            from datetime import datetime
-            first_entry = datetime.strptime(all_dates[-1], "%Y-%m-%d")
-            days_since = (datetime.now() - first_entry).days
+        if stats.first_date:
+            days_since = (date.today() - date.fromisoformat(stats.first_date)).days
             st.metric("Days Since First Entry", days_since)
         else:
             st.metric("Days Since First Entry", 0)
     
     with col3:
-        # Calculate consistency (entries in last 7 days)
-        if all_dates:
-            from datetime import datetime, timedelta
-            recent_dates = [d for d in all_dates if datetime.strptime(d, "%Y-%m-%d") >= datetime.now() - timedelta(days=7)]
-            consistency = len(recent_dates)
-        else:
-            consistency = 0
-        st.metric("Entries (Last 7 Days)", consistency)
\ No newline at end of file
+        st.metric("Entries (Last 7 Days)", stats.last_7_days)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.metric("Current Streak", f"{stats.current_streak} days")
+    
+    with col2:
+        st.metric("Longest Streak", f"{stats.longest_streak} days")
+    
+    if stats.total_days:
+        st.caption("Entries by weekday")
+        for column, weekday, count in zip(st.columns(7), WEEKDAYS, stats.weekday_counts):
+            with column:
+                st.metric(weekday, count)
@@ -1,15 +1,20 @@
+import time
+import asyncio
 import streamlit as st
 from components.forms import JournalForm
 from components.display import DisplayManager
 from agent.langchain_agent import ConsciousDayAgent
-from database.db_manager import DatabaseManager
-from database.models import JournalEntry
-from components.auth import AuthManager
+from database.db_manager import get_database_manager
+from database.models import JournalEntry, ReflectionJob
+from jobs.queue import get_job_queue
+from retrieval.context import build_context
+from components.auth import get_auth_manager
+from config.settings import Config
 
 def render_home_page():
     """Render the main journaling page."""
 
-    auth = AuthManager()
+    auth = get_auth_manager()
     
     # Check authentication
     if not auth.is_authenticated():
@@ -23,13 +28,13 @@ def render_home_page():
     # Initialize components
     form = JournalForm()
     display = DisplayManager()
-    agent = ConsciousDayAgent()
-    db = DatabaseManager()
+    db = get_database_manager().for_user(auth.get_user_id())
     
     # Check if entry already exists for today
     from datetime import date
     today = date.today().strftime("%Y-%m-%d")
-    existing_entry = db.get_entry_by_date(today)
+    # Its text is only fetched if the user chooses to view it
+    existing_entry = db.get_entry_by_date(today, deferred=True)
     
     if existing_entry:
         st.info(f"📝 You already have an entry for today ({today}). You can view it below or create a new one.")
@@ -63,37 +68,97 @@ def render_home_page():
                         return
                 return
         
-        # Generate reflection
-        with st.spinner("🤖 Generating your personalized reflection and strategy..."):
-            try:
-                results = agent.generate_reflection(
-                    journal=form_data['journal'],
-                    intention=form_data['intention'],
-                    dream=form_data['dream'],
-                    priorities=form_data['priorities']
-                )
-                
-                # Create journal entry
-                entry = JournalEntry(
-                    date=form_data['date'],
-                    journal=form_data['journal'],
-                    intention=form_data['intention'],
-                    dream=form_data['dream'],
-                    priorities=form_data['priorities'],
-                    reflection=results['full_response'],
-                    strategy=results.get('strategy', '')
-                )
-                
-                # Save to database
-                if db.save_entry(entry):
-                    display.display_reflection_results(results, form_data['date'])
-                else:
-                    st.error("Failed to save entry to database.")
-                
-                # Reset confirmation state
-                if 'confirm_overwrite' in st.session_state:
-                    del st.session_state['confirm_overwrite']
-                    
-            except Exception as e:
-                st.error(f"An error occurred while generating your reflection: {str(e)}")
-                st.info("Please check your API configuration and try again.")
\ No newline at end of file
+        if Config.BACKGROUND_JOBS:
+            job_id = get_job_queue().submit(form_data, db.user_id)
+            if job_id:
+                st.session_state['pending_job'] = job_id
+            else:
+                st.error("Failed to queue your reflection. Please try again.")
+            
+            # Reset confirmation state
+            if 'confirm_overwrite' in st.session_state:
+                del st.session_state['confirm_overwrite']
+        else:
+            _generate_inline(form_data, display, db)
+    
+    if st.session_state.get('pending_job'):
+        _render_job_status(st.session_state['pending_job'], display, db.user_id)
+
+def _render_job_status(job_id: str, display: DisplayManager, user_id: int):
+    """Show a background job's progress, rerunning the page until it finishes."""
+    queue = get_job_queue()
+    job = queue.get_job(job_id, user_id)
+    
+    if job is None:
+        del st.session_state['pending_job']
+        return
+    
+    if job.status == ReflectionJob.DONE:
+        del st.session_state['pending_job']
+        display.display_reflection_results(job.result, job.date)
+    elif job.status == ReflectionJob.FAILED:
+        del st.session_state['pending_job']
+        st.error(f"An error occurred while generating your reflection: {job.error}")
+        st.info("Please check your API configuration and try again.")
+    else:
+        partial = queue.get_partial(job_id)
+        if partial:
+            display.display_partial_reflection(partial)
+        else:
+            st.info("🤖 Generating your personalized reflection and strategy...")
+        time.sleep(Config.JOB_POLL_INTERVAL)
+        st.rerun()
+
+def _generate_inline(form_data: dict, display: DisplayManager, db):
+    """Generate and save the reflection within this script run."""
+    agent = ConsciousDayAgent()
+    inputs = dict(
+        journal=form_data['journal'],
+        intention=form_data['intention'],
+        dream=form_data['dream'],
+        priorities=form_data['priorities']
+    )
+    if Config.RETRIEVAL_ENABLED:
+        inputs['context'] = build_context(db, exclude_date=form_data['date'], **inputs)
+    
+    try:
+        if Config.STREAM_RESPONSES:
+            full_response = display.stream_reflection_results(agent.stream_reflection(**inputs))
+            results = agent.build_results(full_response)
+        elif Config.FANOUT_MODELS:
+            with st.spinner("🤖 Generating your personalized reflection and strategy..."):
+                results = asyncio.run(agent.agenerate_reflection(**inputs))
+        else:
+            with st.spinner("🤖 Generating your personalized reflection and strategy..."):
+                results = agent.generate_reflection(**inputs)
+        
+        # Create journal entry
+        entry = JournalEntry(
+            date=form_data['date'],
+            journal=form_data['journal'],
+            intention=form_data['intention'],
+            dream=form_data['dream'],
+            priorities=form_data['priorities'],
+            reflection=results['full_response'],
+            strategy=results.get('strategy', ''),
+            reflection_summary=results.get('reflection', ''),
+            dream_interpretation=results.get('dream_interpretation', ''),
+            mindset_insight=results.get('mindset_insight', '')
+        )
+        
+        # Save to database
+        if db.save_entry(entry):
+            if Config.STREAM_RESPONSES:
+                st.info(f"💾 Entry saved for {form_data['date']}")
+            else:
+                display.display_reflection_results(results, form_data['date'])
+        else:
+            st.error("Failed to save entry to database.")
+        
+        # Reset confirmation state
+        if 'confirm_overwrite' in st.session_state:
+            del st.session_state['confirm_overwrite']
+            
+    except Exception as e:
+        st.error(f"An error occurred while generating your reflection: {str(e)}")
+        st.info("Please check your API configuration and try again.")
\ No newline at end of file
@@ -0,0 +1,26 @@
+import logging
+from typing import Optional
+from agent.tokens import trim_to_budget
+from retrieval.embeddings import EmbeddingIndex, entry_text, get_embedding_index
+from config.settings import Config
+
+def build_context(db, journal: str, intention: str, dream: str, priorities: str, exclude_date: str,
+                  index: Optional[EmbeddingIndex] = None) -> str:
+    """Snippets of the past entries most similar to today's, within CONTEXT_TOKEN_BUDGET ('' if none)."""
+    try:
+        index = index or get_embedding_index(db.db_path, db.user_id)
+        matches = index.search(entry_text(journal, intention, dream, priorities), exclude_date=exclude_date)
+        if not matches:
+            return ""
+        entries = db.get_entries_by_ids([entry_id for entry_id, _, _ in matches])
+        per_entry = Config.CONTEXT_TOKEN_BUDGET // len(matches)
+        lines = []
+        for entry_id, date, _ in matches:
+            entry = entries.get(entry_id)
+            if entry:
+                lines.append(f"- {trim_to_budget(f'{date}: {entry.journal} (Intention: {entry.intention})', per_entry)}")
+        logging.info(f"Retrieved {len(lines)} related past entries")
+        return "\n".join(lines)
+    except Exception as e:
+        logging.error(f"Error retrieving past entries: {e}")
+        return ""
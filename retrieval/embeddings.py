@@ -0,0 +1,147 @@
+import re
+import zlib
+import logging
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import numpy as np
+from config.settings import Config
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from had has have i i'm in is it it's me my of on or so that the "
+    "this to was we were will with you your am do did not no just about today".split()
+)
+
+class HashingEmbedder:
+    """Hashed term-frequency vectors: no model, no vocabulary, stable across processes.
+
+    Each word is hashed (crc32, unlike the salted built-in hash) to one of `dim`
+    signed buckets with sublinear term frequency, and the vector is L2-normalised.
+    Inverse document frequency is applied to the query by EmbeddingIndex, so stored
+    vectors never need re-weighting as the corpus grows.
+    """
+
+    def __init__(self, dim: int = Config.EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts = Counter(token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS)
+        if counts:
+            buckets = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in counts), np.uint32, len(counts))
+            weights = 1.0 + np.log(np.fromiter(counts.values(), np.float64, len(counts)))
+            weights[buckets & 0x80000000 != 0] *= -1.0
+            # One scatter-add per entry instead of a NumPy scalar update per word
+            np.add.at(vector, buckets % self.dim, weights.astype(np.float32))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+_default_embedder = HashingEmbedder()
+
+def entry_text(journal: str, intention: str, dream: str, priorities: str) -> str:
+    """The user's own words for an entry; generated reflections are not embedded."""
+    return "\n".join(part for part in (journal, intention, dream, priorities) if part)
+
+def entry_vector(journal: str, intention: str, dream: str, priorities: str) -> bytes:
+    """Serialized embedding stored in entry_embeddings.vector."""
+    return _default_embedder.embed(entry_text(journal, intention, dream, priorities)).tobytes()
+
+class EmbeddingIndex:
+    """In-memory NumPy matrix of one user's entry vectors, for top-k cosine search.
+
+    Vectors are written to entry_embeddings in the same transaction as their entry
+    (see DatabaseManager._upsert_entries); the matrix catches up incrementally by
+    vector sequence number before each search, so saves and overwrites from any
+    thread or process show up. An overwritten entry's old vector is zeroed.
+    """
+
+    def __init__(self, db_path: str, user_id: int, dim: int = Config.EMBEDDING_DIM):
+        # Imported here because the database package embeds entries with this module
+        from database.db_manager import get_database_manager
+        self.db = get_database_manager(db_path).for_user(user_id)
+        self.user_id = user_id
+        self.embedder = HashingEmbedder(dim)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._entry_ids = np.zeros(0, dtype=np.int64)
+        self._dates: List[str] = []
+        self._row_by_date: Dict[str, int] = {}
+        self._doc_freq = np.zeros(dim, dtype=np.float64)
+        self._size = 0
+        self._last_seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._row_by_date)
+
+    def _grow(self, needed: int):
+        capacity = max(needed, 2 * len(self._vectors), 1024)
+        vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        entry_ids = np.zeros(capacity, dtype=np.int64)
+        entry_ids[:self._size] = self._entry_ids[:self._size]
+        self._vectors, self._entry_ids = vectors, entry_ids
+
+    def _append(self, seq: int, entry_id: int, date: str, vector: np.ndarray):
+        if self._size == len(self._vectors):
+            self._grow(self._size + 1)
+        previous = self._row_by_date.get(date)
+        if previous is not None:
+            # The entry for this date was overwritten
+            self._doc_freq -= self._vectors[previous] != 0
+            self._vectors[previous] = 0
+        self._vectors[self._size] = vector
+        self._entry_ids[self._size] = entry_id
+        self._dates.append(date)
+        self._row_by_date[date] = self._size
+        self._doc_freq += vector != 0
+        self._size += 1
+        self._last_seq = seq
+
+    def refresh(self) -> int:
+        """Load vectors saved since the last refresh; returns how many were added."""
+        with self._lock:
+            rows = self.db.get_embeddings(self._last_seq)
+            if rows and self._size + len(rows) > len(self._vectors):
+                self._grow(self._size + len(rows))
+            for seq, entry_id, date, blob in rows:
+                self._append(seq, entry_id, date, np.frombuffer(blob, dtype=np.float32))
+            return len(rows)
+
+    def search(self, text: str, k: int = Config.RETRIEVAL_TOP_K, exclude_date: str = "",
+               min_score: float = Config.RETRIEVAL_MIN_SCORE) -> List[Tuple[int, str, float]]:
+        """Top-k (entry_id, date, score) most similar to text, best first."""
+        self.refresh()
+        query = self.embedder.embed(text)
+        with self._lock:
+            if not self._size or not query.any():
+                return []
+            # Cosine between each entry's tf vector and the query's tf-idf vector, so rare
+            # words count for more. Words no entry contains cannot match and are left
+            # out rather than diluting every score.
+            idf = np.log((1.0 + len(self._row_by_date)) / (1.0 + self._doc_freq)) + 1.0
+            weighted = np.where(self._doc_freq > 0, query * idf, 0.0).astype(np.float32)
+            norm = np.linalg.norm(weighted)
+            if not norm:
+                return []
+            weighted /= norm
+            scores = self._vectors[:self._size] @ weighted
+            excluded = self._row_by_date.get(exclude_date)
+            if excluded is not None:
+                scores[excluded] = -np.inf
+
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (int(self._entry_ids[row]), self._dates[row], float(scores[row]))
+                for row in top if scores[row] >= min_score
+            ]
+
+@lru_cache(maxsize=Config.RETRIEVAL_CACHED_USERS)
+def get_embedding_index(db_path: str, user_id: int) -> EmbeddingIndex:
+    """Process-wide embedding index for a user, loaded on first use; the least recently used are dropped."""
+    index = EmbeddingIndex(db_path, user_id)
+    logging.info(f"Loaded {index.refresh()} entry embeddings for user {user_id}")
+    return index
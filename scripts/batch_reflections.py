@@ -0,0 +1,162 @@
+"""Generate reflections for a bulk import of past journal entries.
+
+Reads a JSONL or CSV file with date, journal, intention, dream and priorities
+columns, runs ConsciousDayAgent.generate_reflection over the rows with bounded
+concurrency and a request rate limit, and saves the entries in batches.
+Progress is checkpointed after every batch, so an interrupted run resumes
+where it stopped.
+
+    python -m scripts.batch_reflections import.jsonl --workers 4 --rate 2
+"""
+import os
+import csv
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from agent.langchain_agent import ConsciousDayAgent
+from agent.resilience import RateLimiter
+from database.backend import StorageBackend
+from database.db_manager import get_database_manager
+from database.models import JournalEntry
+from utils.helpers import sanitize_input
+
+REQUIRED_FIELDS = ('date', 'journal', 'intention', 'priorities')
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    """Yield input rows from a .jsonl or .csv file."""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def validate_row(row: Dict[str, str]) -> Optional[str]:
+    """Return an error message for an unusable row, mirroring JournalForm's checks."""
+    # JSONL lines can hold any JSON value, not just objects of strings
+    if not isinstance(row, dict):
+        return "row is not an object"
+    for field in REQUIRED_FIELDS + ('dream',):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return f"{field} is not text"
+    for field in REQUIRED_FIELDS:
+        if not (row.get(field) or '').strip():
+            return f"missing {field}"
+    try:
+        datetime.strptime(row['date'].strip(), "%Y-%m-%d")
+    except ValueError:
+        return f"invalid date {row['date']!r}"
+    return None
+
+def load_checkpoint(path: str) -> int:
+    """Return the number of input rows already processed."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('next_row', 0)
+
+def save_checkpoint(path: str, next_row: int):
+    """Atomically record how many input rows are done."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'next_row': next_row}, f)
+    os.replace(tmp_path, path)
+
+def reflect_row(agent: ConsciousDayAgent, limiter: RateLimiter, row: Dict[str, str]) -> Tuple[Optional[JournalEntry], Optional[str]]:
+    """Generate the reflection for one row; returns (entry, error)."""
+    error = validate_row(row)
+    if error:
+        return None, error
+
+    inputs = {field: sanitize_input(row.get(field) or '') for field in ('journal', 'intention', 'dream', 'priorities')}
+    limiter.acquire()
+    results = agent.generate_reflection(**inputs)
+    if results['full_response'] == agent._get_fallback_response():
+        return None, "reflection generation failed"
+
+    return JournalEntry(
+        date=row['date'].strip(),
+        reflection=results['full_response'],
+        strategy=results.get('strategy', ''),
+        reflection_summary=results.get('reflection', ''),
+        dream_interpretation=results.get('dream_interpretation', ''),
+        mindset_insight=results.get('mindset_insight', ''),
+        **inputs
+    ), None
+
+def run_batch(rows: Iterator[Dict[str, str]], db: StorageBackend, agent: ConsciousDayAgent,
+              checkpoint_path: str, workers: int = 4, rate: float = 2.0, batch_size: int = 50) -> Dict[str, int]:
+    """Process rows in checkpointed batches; returns saved/failed/skipped counts."""
+    start_row = load_checkpoint(checkpoint_path)
+    limiter = RateLimiter(rate, burst=workers)
+    counts = {'saved': 0, 'failed': 0, 'skipped': start_row}
+    batch: List[Tuple[int, Dict[str, str]]] = []
+
+    def flush(batch):
+        futures = [(index, executor.submit(reflect_row, agent, limiter, row)) for index, row in batch]
+        entries = []
+        for index, future in futures:
+            entry, error = future.result()
+            if entry:
+                entries.append(entry)
+            else:
+                counts['failed'] += 1
+                logging.error(f"Row {index + 1}: {error}")
+        if entries and db.save_entries(entries) != len(entries):
+            raise RuntimeError(f"Failed to save batch ending at row {batch[-1][0] + 1}")
+        counts['saved'] += len(entries)
+        save_checkpoint(checkpoint_path, batch[-1][0] + 1)
+        logging.info(f"Processed {batch[-1][0] + 1} rows ({counts['saved']} saved, {counts['failed']} failed)")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, row in enumerate(rows):
+            if index < start_row:
+                continue
+            batch.append((index, row))
+            if len(batch) == batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    return counts
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL or CSV file of journal rows")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM requests")
+    parser.add_argument("--rate", type=float, default=2.0, help="max requests started per second (0 = unlimited)")
+    parser.add_argument("--batch-size", type=int, default=50, help="rows per insert transaction and checkpoint")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <input>.checkpoint)")
+    parser.add_argument("--database", help="SQLite file or postgresql:// URL (default: Config.DATABASE_URL, else Config.DATABASE_PATH)")
+    parser.add_argument("--user", help="username that owns the imported entries (default: Config.LEGACY_USERNAME)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    db = get_database_manager(args.database) if args.database else get_database_manager()
+    if args.user:
+        user_id = db.ensure_user(args.user)
+        if user_id is None:
+            print(f"Could not find or create user {args.user!r}")
+            return 1
+        db = db.for_user(user_id)
+    counts = run_batch(
+        read_rows(args.input),
+        db,
+        ConsciousDayAgent(),
+        args.checkpoint or f"{args.input}.checkpoint",
+        workers=args.workers,
+        rate=args.rate,
+        batch_size=args.batch_size
+    )
+    print(f"Saved {counts['saved']}, failed {counts['failed']}, skipped {counts['skipped']} already processed")
+    return 1 if counts['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Export or import one user's journal entries as JSONL, CSV or Parquet.
+
+Exports stream from the database in batches and imports save in batched
+transactions, so memory stays flat however many entries are moved. The format
+follows the file extension (.jsonl, .csv or .parquet; Parquet needs pyarrow).
+
+    python -m scripts.transfer_entries export backup.jsonl --user alice
+    python -m scripts.transfer_entries import backup.parquet --user alice
+"""
+import sys
+import logging
+import argparse
+from typing import List, Optional
+from database.db_manager import get_database_manager
+from database.transfer import FORMATS, export_entries, import_entries
+from config.settings import Config
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", help="file to write or read")
+    parser.add_argument("--format", choices=FORMATS, help="file format (default: from the extension)")
+    parser.add_argument("--batch-size", type=int, default=Config.ENTRY_BATCH_SIZE,
+                        help="rows per fetch, write and insert transaction")
+    parser.add_argument("--database", help="SQLite file or postgresql:// URL (default: Config.DATABASE_URL, else Config.DATABASE_PATH)")
+    parser.add_argument("--user", help="username whose entries are moved (default: Config.LEGACY_USERNAME)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    db = get_database_manager(args.database) if args.database else get_database_manager()
+    if args.user:
+        user_id = db.ensure_user(args.user)
+        if user_id is None:
+            print(f"Could not find or create user {args.user!r}")
+            return 1
+        db = db.for_user(user_id)
+
+    if args.action == "export":
+        count = export_entries(db, args.path, args.format, args.batch_size)
+        print(f"Exported {count} entries to {args.path}")
+        return 0
+
+    read, saved = import_entries(db, args.path, args.format, args.batch_size)
+    print(f"Imported {saved} of {read} rows from {args.path}")
+    return 0 if saved == read else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,43 @@
+import os
+import time
+import asyncio
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from agent.langchain_agent import ConsciousDayAgent
+from agent.cache import ResponseCache
+from agent.resilience import CircuitBreaker, RetryPolicy
+from agent.parsing import parse_sections
+from database.connection import close_pool
+from config.settings import Config
 
 class TestConsciousDayAgent(unittest.TestCase):
     def setUp(self):
         """Set up test agent."""
-        self.agent = ConsciousDayAgent()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.cache_dir.name, "cache.db")
+        self.agent = ConsciousDayAgent(
+            cache=ResponseCache(self.cache_path),
+            retry_policy=RetryPolicy(max_attempts=1),
+            circuit_breaker=CircuitBreaker("test")
+        )
+    
+    def tearDown(self):
+        """Clean up the test cache."""
+        close_pool(self.cache_path)
+        self.cache_dir.cleanup()
     
     def test_agent_initialization(self):
         """Test agent initialization."""
         self.assertIsNotNone(self.agent)
     
-    @patch('agent.langchain_agent.requests.post')
+    def test_agents_share_http_session(self):
+        """Test that every agent reuses the process-wide pooled session."""
+        other = ConsciousDayAgent(cache=self.agent.cache)
+        self.assertIs(self.agent.session, other.session)
+        self.assertEqual(self.agent.session.get_adapter("https://openrouter.ai")._pool_maxsize, Config.HTTP_POOL_MAXSIZE)
+    
+    @patch('requests.Session.post')
     def test_generate_reflection_success(self, mock_post):
         """Test successful reflection generation."""
         # Mock successful API response
@@ -49,7 +75,7 @@ Test strategy content"""
         self.assertIn('strategy', result)
         self.assertIn('full_response', result)
     
-    @patch('agent.langchain_agent.requests.post')
+    @patch('requests.Session.post')
     def test_generate_reflection_api_failure(self, mock_post):
         """Test reflection generation with API failure."""
         # Mock API failure
@@ -71,6 +97,100 @@ Test strategy content"""
         self.assertIn('reflection', result)
         self.assertIn('strategy', result)
     
+    @patch('requests.Session.post')
+    def test_identical_resubmission_is_cached(self, mock_post):
+        """Test that a repeated submission is served from the cache."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "choices": [{"message": {"content": "## Inner Reflection Summary\nCached reflection"}}]
+        }
+        mock_post.return_value = mock_response
+        
+        first = self.agent.generate_reflection("Test journal", "Test intention", "", "Test priorities")
+        second = self.agent.generate_reflection("  Test   journal ", "Test intention", "", "Test priorities")
+        
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(self.agent.cache.stats["memory_hits"], 1)
+    
+    @patch('requests.Session.post')
+    def test_fallback_is_not_cached(self, mock_post):
+        """Test that failed requests are retried on the next submission."""
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_response.text = "Internal Server Error"
+        mock_post.return_value = mock_response
+        
+        self.agent.generate_reflection("Test journal", "Test intention", "", "Test priorities")
+        self.agent.generate_reflection("Test journal", "Test intention", "", "Test priorities")
+        
+        self.assertEqual(mock_post.call_count, 2)
+    
+    def _fake_model_requests(self, delays, responses):
+        """Replace the blocking request with per-model delays and canned responses."""
+        calls = []
+        
+        def fake_request(messages, model=None):
+            calls.append(model)
+            time.sleep(delays[model])
+            return responses[model]
+        
+        self.agent._make_api_request = fake_request
+        return calls
+    
+    def test_fanout_first_valid_wins(self):
+        """Test that the fastest valid model wins and invalid answers are skipped."""
+        full = "## Inner Reflection Summary\nA\n## Dream Interpretation Summary\nB"
+        self._fake_model_requests(
+            {"fast-broken": 0.0, "medium": 0.05, "slow": 0.3},
+            {"fast-broken": self.agent._get_fallback_response(), "medium": full, "slow": full + " slow"}
+        )
+        
+        start = time.perf_counter()
+        result = asyncio.run(self.agent.agenerate_reflection(
+            "journal", "intention", "", "priorities", models=["fast-broken", "medium", "slow"]
+        ))
+        
+        self.assertEqual(result["full_response"], full)
+        self.assertLess(time.perf_counter() - start, 0.3)
+    
+    def test_fanout_hedge_delay_skips_backup_when_primary_is_fast(self):
+        """Test that backup models only start once the hedge delay passes."""
+        full = "## Inner Reflection Summary\nA"
+        calls = self._fake_model_requests({"primary": 0.0, "backup": 0.0}, {"primary": full, "backup": full})
+        
+        asyncio.run(self.agent.agenerate_reflection(
+            "journal", "intention", "", "priorities", models=["primary", "backup"], hedge_delay=0.5
+        ))
+        
+        self.assertEqual(calls, ["primary"])
+    
+    def test_fanout_best_uses_scorer(self):
+        """Test that the best strategy picks the most complete response."""
+        partial = "## Inner Reflection Summary\nA"
+        complete = partial + "\n## Dream Interpretation Summary\nB\n## Energy/Mindset Insight\nC\n## Suggested Day Strategy\nD"
+        self._fake_model_requests({"a": 0.0, "b": 0.05}, {"a": partial, "b": complete})
+        
+        result = asyncio.run(self.agent.agenerate_reflection(
+            "journal", "intention", "", "priorities", models=["a", "b"], strategy="best"
+        ))
+        self.assertEqual(result["full_response"], complete)
+        
+        self.agent.cache.clear()
+        result = asyncio.run(self.agent.agenerate_reflection(
+            "journal", "intention", "", "priorities", models=["a", "b"], strategy="best",
+            scorer=lambda results: -len(results["full_response"])
+        ))
+        self.assertEqual(result["full_response"], partial)
+    
+    def test_parse_sections_ignores_preamble_and_blank_lines(self):
+        """Test the shared section parser on loosely formatted output."""
+        response = "Sure! Here you go.\n\n  ## Inner Reflection Summary (today)\n\n  Calm.  \n\n## Suggested Day Strategy\n1. Focus\n"
+
+        self.assertEqual(parse_sections(response), {'reflection': "Calm.", 'strategy': "1. Focus"})
+        self.assertEqual(parse_sections("No headers at all"), {})
+
     def test_parse_response(self):
         """Test response parsing."""
         test_response = """## Inner Reflection Summary
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from components.auth import SEED_USERS, AuthManager
+from database.db_manager import DatabaseManager
+from database.migrations import LEGACY_USER_ID
+from config.settings import Config
+
+# The lowest bcrypt cost keeps hashing fast in tests
+@patch.object(Config, "BCRYPT_ROUNDS", 4)
+class TestAuthManager(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary credential store."""
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.db_dir.name, "entries.db"))
+
+    def tearDown(self):
+        """Clean up the temporary database."""
+        self.db.close()
+        self.db_dir.cleanup()
+
+    def _auth(self) -> AuthManager:
+        auth = AuthManager(self.db)
+        self.addCleanup(auth.executor.shutdown)
+        return auth
+
+    def test_seed_hashes_are_stored_once(self):
+        """Test that seed passwords are hashed on first start only."""
+        self._auth()
+        stored = {username: self.db.get_user(username).password_hash for username in SEED_USERS}
+
+        with patch.object(AuthManager, "_hash_password") as mock_hash:
+            self._auth()
+        mock_hash.assert_not_called()
+        self.assertEqual({username: self.db.get_user(username).password_hash for username in SEED_USERS}, stored)
+        self.assertEqual(self.db.get_user("demo_user").id, LEGACY_USER_ID)
+        self.assertNotIn("demo123", stored["demo_user"])
+
+    def test_verify(self):
+        """Test password checks against the stored hash."""
+        auth = self._auth()
+        user = self.db.get_user("demo_user")
+
+        self.assertTrue(auth.verify(user, "demo123"))
+        self.assertFalse(auth.verify(user, "wrong"))
+
+    def test_verify_rejects_invalid_stored_hash(self):
+        """Test that a corrupted or non-bcrypt stored hash fails the check instead of raising."""
+        auth = self._auth()
+        user = self.db.get_user("demo_user")
+
+        for password_hash in ("not-a-hash", "$2b$", "$2b$xx$" + "a" * 53):
+            with self.subTest(password_hash=password_hash):
+                user.password_hash = password_hash
+                with self.assertLogs(level="ERROR"):
+                    self.assertFalse(auth.verify(user, "demo123"))
+        self.assertTrue(self.db.get_user("demo_user").password_hash.startswith("$2b$04$"))
+
+    def test_outdated_cost_is_rehashed_at_login(self):
+        """Test that a successful login upgrades a hash made with another cost."""
+        auth = self._auth()
+        old_hash = self.db.get_user("demo_user").password_hash
+
+        with patch.object(Config, "BCRYPT_ROUNDS", 5):
+            self.assertTrue(auth.verify(self.db.get_user("demo_user"), "demo123"))
+
+        new_hash = self.db.get_user("demo_user").password_hash
+        self.assertNotEqual(new_hash, old_hash)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from database.db_manager import DatabaseManager
+from scripts.batch_reflections import load_checkpoint, read_rows, run_batch
+
+def make_rows(count):
+    return [
+        {'date': f"2023-01-{i + 1:02d}", 'journal': f"Journal {i}", 'intention': "Intention",
+         'dream': "", 'priorities': "Priorities"}
+        for i in range(count)
+    ]
+
+class TestBatchReflections(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary database, checkpoint and mocked agent."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp_dir.name, "entries.db"))
+        self.checkpoint = os.path.join(self.tmp_dir.name, "import.checkpoint")
+        self.agent = MagicMock()
+        self.agent._get_fallback_response.return_value = "fallback"
+        self.agent.generate_reflection.side_effect = lambda **inputs: {
+            "strategy": "Strategy", "full_response": f"Reflection on {inputs['journal']}"
+        }
+
+    def tearDown(self):
+        """Clean up the temporary files."""
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_rows_are_saved_in_batches(self):
+        """Test that every valid row is saved through batched inserts."""
+        with patch.object(self.db, 'save_entries', wraps=self.db.save_entries) as mock_save:
+            counts = run_batch(iter(make_rows(7)), self.db, self.agent, self.checkpoint,
+                               workers=3, rate=0, batch_size=3)
+
+        self.assertEqual(counts, {'saved': 7, 'failed': 0, 'skipped': 0})
+        self.assertEqual([len(call.args[0]) for call in mock_save.call_args_list], [3, 3, 1])
+        self.assertEqual(self.db.get_entry_by_date("2023-01-05").reflection, "Reflection on Journal 4")
+        self.assertEqual(load_checkpoint(self.checkpoint), 7)
+
+    def test_resume_skips_checkpointed_rows(self):
+        """Test that a rerun only processes rows after the checkpoint."""
+        run_batch(iter(make_rows(4)), self.db, self.agent, self.checkpoint, workers=2, rate=0, batch_size=2)
+        self.agent.generate_reflection.reset_mock()
+
+        counts = run_batch(iter(make_rows(6)), self.db, self.agent, self.checkpoint, workers=2, rate=0, batch_size=2)
+
+        self.assertEqual(counts, {'saved': 2, 'failed': 0, 'skipped': 4})
+        self.assertEqual(self.agent.generate_reflection.call_count, 2)
+        self.assertEqual(len(self.db.get_all_dates()), 6)
+
+    def test_invalid_and_failed_rows_are_not_saved(self):
+        """Test that bad rows and fallback responses are reported, not stored."""
+        rows = make_rows(3)
+        rows[0]['intention'] = ""
+        rows[1]['journal'] = "fail me"
+        self.agent.generate_reflection.side_effect = lambda **inputs: {
+            "full_response": "fallback" if inputs['journal'] == "fail me" else "ok"
+        }
+
+        counts = run_batch(iter(rows), self.db, self.agent, self.checkpoint, workers=2, rate=0, batch_size=10)
+
+        self.assertEqual(counts, {'saved': 1, 'failed': 2, 'skipped': 0})
+        self.assertEqual(self.db.get_all_dates(), ["2023-01-03"])
+
+    def test_non_text_fields_are_invalid_rows(self):
+        """Test that JSON values other than strings fail their row instead of the batch."""
+        rows = make_rows(4)
+        rows[0]['date'] = 20230101
+        rows[1]['journal'] = None
+        rows[2]['dream'] = ["a", "list"]
+        rows.insert(0, None)
+
+        counts = run_batch(iter(rows), self.db, self.agent, self.checkpoint, workers=2, rate=0, batch_size=10)
+
+        self.assertEqual(counts, {'saved': 1, 'failed': 4, 'skipped': 0})
+        self.assertEqual(self.db.get_all_dates(), ["2023-01-04"])
+
+    def test_read_rows_csv(self):
+        """Test CSV input."""
+        path = os.path.join(self.tmp_dir.name, "rows.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("date,journal,intention,dream,priorities\n2023-01-01,J,I,,P\n")
+        self.assertEqual(list(read_rows(path))[0]['journal'], "J")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from agent.cache import ResponseCache
+from database.connection import close_pool
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        """Set up a cache backed by a temporary database."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "cache.db")
+        self.cache = ResponseCache(self.db_path, max_memory_entries=2, max_disk_entries=3, ttl_seconds=60)
+
+    def tearDown(self):
+        """Clean up the cache database."""
+        close_pool(self.db_path)
+        self.tmp_dir.cleanup()
+
+    def test_key_ignores_whitespace_but_not_content(self):
+        """Test that keys are built from normalized inputs."""
+        key = ResponseCache.make_key("model", "1", journal="Feeling  good\n", dream="")
+        self.assertEqual(key, ResponseCache.make_key("model", "1", journal=" Feeling good", dream=""))
+        self.assertNotEqual(key, ResponseCache.make_key("model", "2", journal="Feeling good", dream=""))
+        self.assertNotEqual(key, ResponseCache.make_key("other", "1", journal="Feeling good", dream=""))
+
+    def test_disk_tier_survives_memory_eviction(self):
+        """Test that entries evicted from memory are still found on disk."""
+        for key in ("a", "b", "c"):
+            self.cache.set(key, f"response {key}")
+
+        self.assertEqual(self.cache.get("a"), "response a")
+        self.assertEqual(self.cache.stats["disk_hits"], 1)
+        self.assertEqual(self.cache.get("a"), "response a")
+        self.assertEqual(self.cache.stats["memory_hits"], 1)
+
+    def test_disk_tier_size_eviction(self):
+        """Test that the disk tier keeps only the most recently used entries."""
+        for key in ("a", "b", "c", "d"):
+            self.cache.set(key, key)
+        self.cache._memory.clear()
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("d"), "d")
+
+    def test_expired_entries_miss(self):
+        """Test that entries older than the TTL are not served."""
+        self.cache.set("a", "stale")
+        with patch("agent.cache.time.time", return_value=10 ** 12):
+            self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats["misses"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from database import compression
+from database.compression import FORMAT_ZLIB, FORMAT_ZSTD, HEADER
+from database.db_manager import DatabaseManager
+from database.models import JournalEntry
+from config.settings import Config
+
+REFLECTION = (
+    "## Inner Reflection Summary\nYou carried the deadline calmly and noticed your breath.\n\n"
+    "## Dream Interpretation\nFlying over water suggests you want distance from the project.\n\n"
+    "## Energy/Mindset Insight\nPatience gives you energy.\n\n"
+    "## Suggested Day Strategy\n1. Walk before the meeting\n2. Write the presentation\n3. Rest early"
+)
+
+JOURNAL = "Walked by the lighthouse and thought about the presentation all morning."
+
+def make_entry(day: int, journal: str = JOURNAL) -> JournalEntry:
+    return JournalEntry(
+        date=f"2024-03-{day:02d}", journal=journal, intention="Stay calm", dream="Flying over a quiet ocean, " * 3,
+        priorities="1. Presentation", reflection=REFLECTION, strategy="1. Walk before the meeting\n2. Rest early\n" * 3,
+        reflection_summary="You carried the deadline calmly and noticed your breath."
+    )
+
+class TestTextCompression(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary database path; each test opens it with its own compression setting."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "entries.db")
+        self.db = None
+
+    def tearDown(self):
+        """Clean up the temporary database."""
+        if self.db:
+            self.db.close()
+        self.tmp_dir.cleanup()
+
+    def _open(self, codec) -> DatabaseManager:
+        """Close the last manager opened, so its pool goes, and reopen the database using the given compression."""
+        if self.db:
+            self.db.close()
+        with patch.object(Config, 'TEXT_COMPRESSION', codec):
+            self.db = DatabaseManager(self.path)
+        return self.db
+
+    def _stored(self, db: DatabaseManager, date: str, column: str = 'reflection'):
+        with db.pool.connection() as conn:
+            return conn.execute(f"SELECT {column} FROM entries WHERE date = ?", (date,)).fetchone()[0]
+
+    def test_compressed_text_reads_transparently(self):
+        """Test that compressed entries read, export and search like uncompressed ones."""
+        for codec, fmt in (("zlib", FORMAT_ZLIB),) + ((("zstd", FORMAT_ZSTD),) if compression.zstandard else ()):
+            with self.subTest(codec=codec):
+                db = self._open(codec)
+                entry = make_entry(1)
+                self.assertTrue(db.save_entry(entry))
+
+                stored = self._stored(db, entry.date)
+                self.assertIsInstance(stored, bytes)
+                self.assertEqual(HEADER.unpack_from(stored), (fmt, 0))
+                self.assertLess(len(stored), len(REFLECTION))
+                # Too short to be worth compressing
+                self.assertEqual(self._stored(db, entry.date, 'intention'), "Stay calm")
+
+                saved = db.get_entry_by_date(entry.date)
+                self.assertEqual((saved.journal, saved.reflection, saved.strategy, saved.dream),
+                                 (entry.journal, entry.reflection, entry.strategy, entry.dream))
+                self.assertEqual(db.get_entry_by_date(entry.date, deferred=True).reflection, REFLECTION)
+                self.assertEqual(next(db.export_rows())[0][5], REFLECTION)
+                results = db.search("lighthouse")
+                self.assertEqual(len(results), 1)
+                self.assertIn("**lighthouse**", results[0].snippet)
+
+                db.save_entry(make_entry(1, journal="A second version about the volcano, written much later that night."))
+                self.assertEqual(db.get_revisions(entry.date)[0].journal, entry.journal)
+                self.assertEqual(db.search("lighthouse"), [])
+                self.assertEqual(len(db.search("volcano")), 1)
+                db.close()
+                os.remove(self.path)
+
+    def test_uncompressed_rows_still_read(self):
+        """Test that rows written before compression was enabled read and re-index after it is."""
+        db = self._open(None)
+        db.save_entry(make_entry(1))
+        self.assertIsInstance(self._stored(db, "2024-03-01"), str)
+
+        db = self._open("zlib")
+        db.save_entry(make_entry(2))
+
+        self.assertIsInstance(self._stored(db, "2024-03-02"), bytes)
+        self.assertEqual([db.get_entry_by_date(f"2024-03-0{day}").reflection for day in (1, 2)], [REFLECTION] * 2)
+        self.assertEqual(len(db.search("lighthouse")), 2)
+
+        # Overwriting an uncompressed row removes its old text from the index
+        db.save_entry(make_entry(1, journal="Rewritten about the volcano, long enough to be compressed this time."))
+        self.assertEqual(len(db.search("lighthouse")), 1)
+        self.assertEqual(db.get_revisions("2024-03-01")[0].journal, JOURNAL)
+
+    def test_plain_clients_write_with_compression_enabled(self):
+        """Test that a SQLite client without the Python functions can still write to entries."""
+        db = self._open("zlib")
+        db.save_entry(make_entry(1))
+        db.close()
+
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE entries SET journal = 'Edited by hand near the harbour.' WHERE date = '2024-03-01'")
+        conn.commit()
+        conn.close()
+
+        db = self._open("zlib")
+        self.assertEqual(db.get_entry_by_date("2024-03-01").journal, "Edited by hand near the harbour.")
+        self.assertTrue(db.rebuild_search_index())
+        self.assertEqual(len(db.search("harbour")), 1)
+        self.assertEqual(db.search("lighthouse"), [])
+
+        db.save_entry(make_entry(1, journal="Back on the ferry, which was late again this morning."))
+        self.assertEqual(db.get_revisions("2024-03-01")[0].journal, "Edited by hand near the harbour.")
+        self.assertEqual(len(db.search("ferry")), 1)
+        self.assertEqual(db.search("harbour"), [])
+
+    def test_trained_dictionary(self):
+        """Test that new writes use a trained dictionary and every earlier format still reads."""
+        db = self._open("zlib")
+        db.save_entries([make_entry(day) for day in range(1, 11)])
+
+        dictionary_id = db.train_compression_dictionary()
+        self.assertIsNotNone(dictionary_id)
+        db.save_entry(make_entry(11))
+
+        stored = self._stored(db, "2024-03-11")
+        self.assertEqual(HEADER.unpack_from(stored), (FORMAT_ZLIB, dictionary_id))
+        self.assertLess(len(stored), len(self._stored(db, "2024-03-10")))
+
+        # A new process loads the dictionary from the file
+        db = self._open("zlib")
+        self.assertEqual([db.get_entry_by_date(f"2024-03-{day:02d}").reflection for day in (10, 11)], [REFLECTION] * 2)
+
+    def test_training_needs_compression(self):
+        """Test that no dictionary is trained while compression is disabled."""
+        db = self._open(None)
+        db.save_entry(make_entry(1))
+
+        self.assertIsNone(db.train_compression_dictionary())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,18 @@
 import unittest
 import tempfile
 import os
+import sqlite3
+import threading
+from unittest.mock import patch
 from datetime import date
-from database.db_manager import DatabaseManager
+from database.db_manager import (
+    DatabaseManager, get_database_manager, SELECT_ENTRY_BY_DATE_SQL, SELECT_ALL_DATES_SQL,
+    SELECT_DATES_BEFORE_SQL, SELECT_DATES_AFTER_SQL
+)
+from database.migrations import LEGACY_USER_ID, MIGRATIONS, get_schema_version, run_migrations
 from database.models import JournalEntry
+from database.stats import read_stats
+from config.settings import Config
 
 class TestDatabaseManager(unittest.TestCase):
     def setUp(self):
@@ -14,8 +23,10 @@ class TestDatabaseManager(unittest.TestCase):
     
     def tearDown(self):
         """Clean up test database."""
-        if os.path.exists(self.test_db_file.name):
-            os.unlink(self.test_db_file.name)
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.test_db_file.name + suffix):
+                os.unlink(self.test_db_file.name + suffix)
     
     def test_database_initialization(self):
         """Test database initialization."""
@@ -91,5 +102,403 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertIn("2024-01-02", dates)
         self.assertIn("2024-01-03", dates)
 
+    def test_concurrent_saves_share_pool(self):
+        """Test that saves from several threads all land through the pool."""
+        errors = []
+
+        def worker(n):
+            entry = JournalEntry(
+                date=f"2024-02-{n + 1:02d}",
+                journal=f"Journal {n}",
+                intention="Intention",
+                dream="",
+                priorities="Priorities",
+                reflection="Reflection",
+                strategy="Strategy"
+            )
+            if not self.db.save_entry(entry):
+                errors.append(n)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.db.get_all_dates()), 20)
+        self.assertLessEqual(self.db.pool._created, self.db.pool.max_size)
+
+    def test_closing_one_manager_keeps_the_shared_pool(self):
+        """Test that closing one of two managers of a file leaves the other working until it closes too."""
+        other = self.db.for_user(self.db.ensure_user("other_user"))
+        self.assertIs(other.pool, self.db.pool)
+        other.close()
+        other.close()
+
+        self.assertTrue(self.db.save_entry(JournalEntry(
+            date="2024-01-01", journal="Journal", intention="Intention", dream="",
+            priorities="Priorities", reflection="Reflection", strategy="Strategy"
+        )))
+        self.assertEqual(self.db.get_all_dates(), ["2024-01-01"])
+
+        pool = self.db.pool
+        self.db.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            with pool.connection():
+                pass
+
+    def test_schema_version_recorded(self):
+        """Test that migrations record the current schema version."""
+        with self.db.pool.connection() as conn:
+            self.assertEqual(get_schema_version(conn), MIGRATIONS[-1].version)
+            # A second run finds nothing to apply
+            self.assertEqual(run_migrations(conn), [])
+
+    def test_init_database_runs_once_per_process(self):
+        """Test that constructing more managers does not re-run migrations."""
+        with patch('database.migrations.run_migrations') as mock_run:
+            DatabaseManager(self.test_db_file.name).close()
+            DatabaseManager(self.test_db_file.name).close()
+        mock_run.assert_not_called()
+
+    def test_get_database_manager_is_cached(self):
+        """Test that the factory returns one manager per database file."""
+        first = get_database_manager(self.test_db_file.name)
+        self.assertIs(first, get_database_manager(self.test_db_file.name))
+        first.close()
+        get_database_manager.cache_clear()
+
+    def test_date_queries_use_index(self):
+        """Test that date lookups seek the index instead of scanning and sorting."""
+        with self.db.pool.connection() as conn:
+            by_date = conn.execute('EXPLAIN QUERY PLAN ' + SELECT_ENTRY_BY_DATE_SQL, (1, '2024-01-01')).fetchall()
+            all_dates = conn.execute('EXPLAIN QUERY PLAN ' + SELECT_ALL_DATES_SQL, (1,)).fetchall()
+
+        self.assertIn('idx_entries_user_date (user_id=? AND date=?)', by_date[0][3])
+        self.assertIn('COVERING INDEX idx_entries_user_date (user_id=?)', all_dates[0][3])
+        self.assertFalse(any('TEMP B-TREE' in row[3] for row in by_date + all_dates))
+
+    def test_get_dates_page(self):
+        """Test keyset pagination over entry dates in both directions."""
+        for entry_date in ("2024-01-30", "2024-02-01", "2024-02-01", "2024-02-15", "2024-03-02"):
+            self._save(entry_date, "Journal")
+
+        first = self.db.get_dates_page(limit=2)
+        second = self.db.get_dates_page(before=first[-1], limit=2)
+        third = self.db.get_dates_page(before=second[-1], limit=2)
+
+        self.assertEqual(first, ["2024-03-02", "2024-02-15"])
+        self.assertEqual(second, ["2024-02-01", "2024-01-30"])
+        self.assertEqual(third, [])
+        self.assertEqual(self.db.get_dates_page(after="2024-02-01", limit=5), ["2024-02-15", "2024-03-02"])
+
+    def test_dates_page_queries_use_index(self):
+        """Test that date pages seek the covering index instead of scanning and sorting."""
+        with self.db.pool.connection() as conn:
+            plans = [
+                conn.execute('EXPLAIN QUERY PLAN ' + sql, (1, '2024-01-01', 31)).fetchall()
+                for sql in (SELECT_DATES_BEFORE_SQL, SELECT_DATES_AFTER_SQL)
+            ]
+
+        for plan in plans:
+            self.assertIn('COVERING INDEX idx_entries_user_date (user_id=? AND date', plan[0][3])
+            self.assertFalse(any('TEMP B-TREE' in row[3] for row in plan))
+
+    def test_stats_track_days_and_streaks(self):
+        """Test that stats count distinct days and merge streaks saved out of order."""
+        for entry_date in ("2024-03-01", "2024-03-03", "2024-03-10", "2024-03-02", "2024-03-02"):
+            self._save(entry_date, "Journal")
+
+        with self.db.pool.connection() as conn:
+            stats = read_stats(conn, self.db.user_id, today=date(2024, 3, 11))
+
+        self.assertEqual(stats.total_days, 4)
+        self.assertEqual((stats.first_date, stats.last_date), ("2024-03-01", "2024-03-10"))
+        self.assertEqual(stats.longest_streak, 3)
+        self.assertEqual(stats.current_streak, 1)
+        self.assertEqual(stats.last_7_days, 1)
+        self.assertEqual(stats.weekday_counts, [0, 0, 0, 0, 1, 1, 2])
+
+    def test_stats_current_streak_lapses(self):
+        """Test that the current streak resets once a day is missed."""
+        self.db.save_entries([
+            JournalEntry(date=d, journal="Journal", intention="Intention")
+            for d in ("2024-03-01", "2024-03-02", "2024-03-02")
+        ])
+
+        with self.db.pool.connection() as conn:
+            self.assertEqual(read_stats(conn, self.db.user_id, today=date(2024, 3, 3)).current_streak, 2)
+            self.assertEqual(read_stats(conn, self.db.user_id, today=date(2024, 3, 4)).current_streak, 0)
+        self.assertEqual(self.db.get_stats().total_days, 2)
+
+    def test_stats_backfilled_by_migration(self):
+        """Test that the stats migration counts entries written before it."""
+        self.db.close()
+        os.unlink(self.test_db_file.name)
+        conn = sqlite3.connect(self.test_db_file.name, isolation_level=None)
+        run_migrations(conn, MIGRATIONS[:4])
+        conn.executemany(
+            "INSERT INTO entries (date, journal, intention, priorities, reflection, strategy) VALUES (?, 'J', 'I', 'P', 'R', 'S')",
+            [("2024-01-01",), ("2024-01-02",), ("2024-01-02",), ("2024-01-05",)]
+        )
+        run_migrations(conn, MIGRATIONS[:5])
+        self.assertEqual(conn.execute("SELECT * FROM entry_stats").fetchall(), [(1, 3, "2024-01-01", "2024-01-05", 2)])
+        self.assertEqual(conn.execute("SELECT * FROM entry_streaks ORDER BY start_date").fetchall(),
+                         [("2024-01-01", "2024-01-02"), ("2024-01-05", "2024-01-05")])
+        run_migrations(conn)
+
+        stats = read_stats(conn, LEGACY_USER_ID, today=date(2024, 1, 5))
+        conn.close()
+        self.assertEqual((stats.total_days, stats.longest_streak, stats.current_streak), (3, 2, 1))
+
+    def test_sections_round_trip(self):
+        """Test that parsed sections are stored as columns and read back without parsing."""
+        self.db.save_entry(JournalEntry(
+            date="2024-01-01", journal="Journal", intention="Intention", priorities="1. One",
+            reflection="## Inner Reflection Summary\nCalm.", strategy="Focus.",
+            reflection_summary="Calm.", dream_interpretation="Flight.", mindset_insight="Steady."
+        ))
+
+        entry = self.db.get_entry_by_date("2024-01-01")
+
+        self.assertEqual(entry.sections, {
+            'reflection': "Calm.", 'dream_interpretation': "Flight.",
+            'mindset_insight': "Steady.", 'strategy': "Focus."
+        })
+
+    def test_sections_backfilled_by_migration(self):
+        """Test that the sections migration parses reflections stored before it."""
+        self.db.close()
+        os.unlink(self.test_db_file.name)
+        conn = sqlite3.connect(self.test_db_file.name, isolation_level=None)
+        run_migrations(conn, MIGRATIONS[:5])
+        full_response = "## Inner Reflection Summary\nCalm.\n## Energy/Mindset Insight\nSteady.\n## Suggested Day Strategy\nFocus."
+        conn.executemany(
+            "INSERT INTO entries (date, journal, intention, priorities, reflection, strategy) VALUES (?, 'J', 'I', 'P', ?, ?)",
+            [("2024-01-01", full_response, "Focus."), ("2024-01-02", "Unstructured text", "")]
+        )
+        with patch("database.migrations.BACKFILL_BATCH_SIZE", 1):
+            run_migrations(conn)
+        conn.close()
+
+        self.db = DatabaseManager(self.test_db_file.name)
+        self.assertEqual(self.db.get_entry_by_date("2024-01-01").sections, {
+            'reflection': "Calm.", 'mindset_insight': "Steady.", 'strategy': "Focus."
+        })
+        self.assertEqual(self.db.get_entry_by_date("2024-01-02").sections, {})
+        self.assertEqual(len(self.db.search("calm")), 1)
+
+    def test_users_are_isolated(self):
+        """Test that every query only sees the scoped user's entries."""
+        other = self.db.for_user(self.db.ensure_user("other_user", "Other", "other@example.com"))
+        self._save("2024-01-01", "Walked to the lighthouse")
+        other.save_entry(JournalEntry(date="2024-01-02", journal="Lighthouse keeper dream", intention="I",
+                                      priorities="P", reflection="R", strategy="S"))
+
+        self.assertEqual(self.db.get_all_dates(), ["2024-01-01"])
+        self.assertEqual(other.get_all_dates(), ["2024-01-02"])
+        self.assertIsNone(other.get_entry_by_date("2024-01-01"))
+        self.assertFalse(self.db.entry_exists_for_date("2024-01-02"))
+        self.assertEqual([result.date for result in self.db.search("lighthouse")], ["2024-01-01"])
+        self.assertEqual([result.date for result in other.search("lighthouse")], ["2024-01-02"])
+        self.assertEqual(other.search(str(self.db.user_id)), [])
+        self.assertEqual((self.db.get_stats().total_days, other.get_stats().total_days), (1, 1))
+        self.assertEqual(other.get_entries_by_ids([self.db.get_entry_by_date("2024-01-01").id]), {})
+
+    def test_ensure_user_is_idempotent(self):
+        """Test that a username always maps to the same account."""
+        user_id = self.db.ensure_user("someone", "Someone")
+
+        self.assertEqual(self.db.ensure_user("someone"), user_id)
+        self.assertEqual(self.db.ensure_user(Config.LEGACY_USERNAME), LEGACY_USER_ID)
+        self.assertIs(self.db.for_user(self.db.user_id), self.db)
+
+    def test_existing_entries_assigned_to_legacy_user(self):
+        """Test that the per-user migration keeps entries written before it readable and searchable."""
+        self.db.close()
+        os.unlink(self.test_db_file.name)
+        conn = sqlite3.connect(self.test_db_file.name, isolation_level=None)
+        run_migrations(conn, MIGRATIONS[:7])
+        conn.executemany(
+            "INSERT INTO entries (date, journal, intention, priorities, reflection, strategy) VALUES (?, ?, 'I', 'P', 'R', 'S')",
+            [("2024-01-01", "Morning swim"), ("2024-01-02", "Evening swim")]
+        )
+        run_migrations(conn)
+        conn.close()
+
+        self.db = DatabaseManager(self.test_db_file.name)
+        other = self.db.for_user(self.db.ensure_user("new_user"))
+        self.assertEqual(self.db.get_all_dates(), ["2024-01-02", "2024-01-01"])
+        self.assertEqual(len(self.db.search("swimming")), 2)
+        self.assertEqual(self.db.get_stats().longest_streak, 2)
+        self.assertEqual((other.get_all_dates(), other.search("swim")), ([], []))
+
+    def test_overwrite_updates_in_place(self):
+        """Test that saving a date again keeps one row and moves the old version to its revisions."""
+        self._save("2024-01-01", "First draft about the harbour")
+        entry_id = self.db.get_entry_by_date("2024-01-01").id
+        self._save("2024-01-01", "Second draft about the mountains")
+        self.db.save_entries([JournalEntry(date="2024-01-01", journal="Third draft", intention="I")])
+
+        entry = self.db.get_entry_by_date("2024-01-01")
+        revisions = self.db.get_revisions("2024-01-01")
+        with self.db.pool.connection() as conn:
+            counts = [conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                      for table in ("entries", "entry_embeddings")]
+
+        self.assertEqual((entry.id, entry.journal), (entry_id, "Third draft"))
+        self.assertEqual([revision.journal for revision in revisions],
+                         ["Second draft about the mountains", "First draft about the harbour"])
+        self.assertEqual(counts, [1, 1])
+        self.assertEqual((self.db.search("harbour"), len(self.db.search("third"))), ([], 1))
+        self.assertEqual(self.db.get_stats().total_days, 1)
+        self.assertEqual(self.db.for_user(self.db.ensure_user("other_user")).get_revisions("2024-01-01"), [])
+
+    def test_duplicates_compacted_by_migration(self):
+        """Test that the upsert migration keeps the newest entry per date and the rest as revisions."""
+        self.db.close()
+        os.unlink(self.test_db_file.name)
+        conn = sqlite3.connect(self.test_db_file.name, isolation_level=None)
+        run_migrations(conn, MIGRATIONS[:10])
+        conn.executemany(
+            "INSERT INTO entries (date, journal, intention, priorities, reflection, strategy, created_at) "
+            "VALUES (?, ?, 'I', 'P', 'R', 'S', ?)",
+            [("2024-01-01", "Old river walk", "2024-01-01 08:00:00"), ("2024-01-02", "Only entry", "2024-01-02 08:00:00"),
+             ("2024-01-01", "New river walk", "2024-01-01 09:00:00")]
+        )
+        conn.execute("INSERT INTO entry_embeddings (entry_id, vector) SELECT id, x'' FROM entries")
+        conn.execute("INSERT INTO reflection_jobs (id, status, date, journal, intention, priorities, entry_id) "
+                     "VALUES ('job', 'done', '2024-01-01', 'J', 'I', 'P', 1)")
+        run_migrations(conn)
+        job_entry_id = conn.execute("SELECT entry_id FROM reflection_jobs").fetchone()[0]
+        embedded = [row[0] for row in conn.execute("SELECT entry_id FROM entry_embeddings ORDER BY seq")]
+        conn.close()
+
+        self.db = DatabaseManager(self.test_db_file.name)
+        entry = self.db.get_entry_by_date("2024-01-01")
+        self.assertEqual((entry.id, entry.journal), (3, "New river walk"))
+        self.assertEqual([revision.journal for revision in self.db.get_revisions("2024-01-01")], ["Old river walk"])
+        self.assertEqual((job_entry_id, embedded), (3, [2, 3]))
+        self.assertEqual([result.entry_id for result in self.db.search("river")], [3])
+        self.assertEqual(self.db.get_all_dates(), ["2024-01-02", "2024-01-01"])
+
+    def test_deferred_entry_loads_text_on_first_access(self):
+        """Test that a deferred entry reads its text once, when first accessed."""
+        self._save("2024-01-01", "Long journal", reflection="Long reflection")
+        full = self.db.get_entry_by_date("2024-01-01")
+
+        entry = self.db.get_entry_by_date("2024-01-01", deferred=True)
+
+        self.assertEqual((entry.id, entry.intention, entry.priorities), (full.id, "Intention", "1. One"))
+        self.assertNotIn("reflection", entry.__dict__)
+        with patch.object(self.db.pool, "connection", wraps=self.db.pool.connection) as mock_connection:
+            self.assertEqual(entry.reflection, "Long reflection")
+            self.assertEqual(entry.journal, "Long journal")
+        self.assertEqual(mock_connection.call_count, 1)
+        self.assertEqual(entry, full)
+        self.assertIsNone(self.db.get_entry_by_date("2024-01-02", deferred=True))
+        with self.assertRaises(AttributeError):
+            entry.missing
+
+    def test_entries_by_ids_defer_unselected_text(self):
+        """Test that entries fetched for retrieval still read the rest of their text on demand."""
+        self._save("2024-01-01", "Journal", reflection="Reflection text")
+        entry_id = self.db.get_entry_by_date("2024-01-01").id
+
+        entry = self.db.get_entries_by_ids([entry_id])[entry_id]
+
+        self.assertEqual(entry.journal, "Journal")
+        self.assertNotIn("reflection", entry.__dict__)
+        self.assertEqual(entry.reflection, "Reflection text")
+
+    def test_entry_summaries(self):
+        """Test keyset pages of summaries without journal or reflection text."""
+        for entry_date in ("2024-01-30", "2024-02-01", "2024-02-15"):
+            self._save(entry_date, "Journal " * 1000)
+
+        first = self.db.get_entry_summaries(limit=2)
+        second = self.db.get_entry_summaries(before=first[-1].date, limit=2)
+
+        self.assertEqual([summary.date for summary in first], ["2024-02-15", "2024-02-01"])
+        self.assertEqual([(summary.date, summary.intention) for summary in second], [("2024-01-30", "Intention")])
+        self.assertNotIn("journal", first[0]._fields)
+        self.assertEqual(self.db.for_user(self.db.ensure_user("other_user")).get_entry_summaries(), [])
+
+    def _save(self, entry_date: str, journal: str, reflection: str = "Reflection"):
+        self.db.save_entry(JournalEntry(
+            date=entry_date, journal=journal, intention="Intention", dream="",
+            priorities="1. One", reflection=reflection, strategy=""
+        ))
+
+    def test_search_finds_matching_entries(self):
+        """Test full-text search across entry fields with highlighted snippets."""
+        self._save("2024-01-01", "Walked to the lighthouse at dawn")
+        self._save("2024-01-02", "Quiet day at home", reflection="You mentioned the lighthouse again")
+        self._save("2024-01-03", "Nothing relevant here")
+
+        results = self.db.search("lighthouse")
+
+        self.assertEqual({result.date for result in results}, {"2024-01-01", "2024-01-02"})
+        self.assertEqual(results[0].date, "2024-01-01")
+        self.assertTrue(all("**lighthouse**" in result.snippet for result in results))
+
+    def test_search_uses_stemming_and_latest_entry_per_date(self):
+        """Test stemmed matching and that overwritten entries are not returned."""
+        self._save("2024-01-01", "Running through the park")
+        with self.db.pool.connection() as conn:
+            conn.execute("UPDATE entries SET created_at = '2024-01-01 08:00:00'")
+        self._save("2024-01-01", "Stayed in and read")
+        self._save("2024-01-02", "I run every morning")
+
+        results = self.db.search("runs")
+
+        self.assertEqual([result.date for result in results], ["2024-01-02"])
+
+    def test_search_ignores_query_syntax(self):
+        """Test that FTS operators and punctuation in user input do not raise."""
+        self._save("2024-01-01", "Feeling anxious about the presentation")
+
+        self.assertEqual(len(self.db.search('anxious* "presentation')), 1)
+        self.assertEqual(self.db.search('"" () *'), [])
+
+    def test_search_lists_common_words_newest_first(self):
+        """Test that words too common for bm25 fall back to newest-first order."""
+        self._save("2024-01-01", "calm calm calm")
+        self._save("2024-01-02", "calm")
+
+        with patch.object(Config, "SEARCH_RANK_MAX_MATCHES", 1):
+            results = self.db.search("calm")
+
+        self.assertEqual([result.date for result in results], ["2024-01-02", "2024-01-01"])
+
+    def test_search_pagination(self):
+        """Test limit/offset paging over search results."""
+        for day in range(1, 8):
+            self._save(f"2024-01-{day:02d}", "Morning gratitude practice")
+
+        first = self.db.search("gratitude", limit=5)
+        second = self.db.search("gratitude", limit=5, offset=5)
+
+        self.assertEqual(len(first), 5)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({r.entry_id for r in first} & {r.entry_id for r in second})
+
+    def test_search_pages_past_candidate_window(self):
+        """Test that older matches follow the ranked newest window and can all be paged to."""
+        for day in range(1, 8):
+            # Older entries mention the word more often, so they would outrank the window
+            self._save(f"2024-01-{day:02d}", "sunrise " * (9 - day) + "walk")
+
+        with patch.object(Config, "SEARCH_CANDIDATE_WINDOW", 3):
+            pages = [self.db.search("sunrise", limit=2, offset=offset) for offset in range(0, 8, 2)]
+
+        dates = [result.date for page in pages for result in page]
+        self.assertEqual(sorted(dates), [f"2024-01-{day:02d}" for day in range(1, 8)])
+        self.assertEqual(set(dates[:3]), {"2024-01-05", "2024-01-06", "2024-01-07"})
+        # Within each part, more mentions rank first
+        self.assertEqual(dates, ["2024-01-05", "2024-01-06", "2024-01-07",
+                                 "2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from database.db_manager import DatabaseManager
+from database.models import ReflectionJob
+from jobs.queue import ReflectionJobQueue
+from config.settings import Config
+
+FORM_DATA = {
+    'date': "2024-03-01",
+    'journal': "Test journal",
+    'intention': "Test intention",
+    'dream': "",
+    'priorities': "Test priorities"
+}
+
+class TestReflectionJobQueue(unittest.TestCase):
+    def setUp(self):
+        """Set up a queue over a temporary database with a mocked agent."""
+        self.test_db_file = tempfile.NamedTemporaryFile(delete=False)
+        self.test_db_file.close()
+        self.db = DatabaseManager(self.test_db_file.name)
+        self.agent = MagicMock()
+        self.agent.generate_reflection.return_value = {
+            "reflection": "Reflection", "strategy": "Strategy", "full_response": "## Inner Reflection Summary\nReflection"
+        }
+        self.queue = ReflectionJobQueue(self.db, agent_factory=lambda: self.agent, max_workers=2)
+        self.patcher = patch.multiple(Config, STREAM_RESPONSES=False, FANOUT_MODELS=[])
+        self.patcher.start()
+
+    def tearDown(self):
+        """Clean up the queue and test database."""
+        self.patcher.stop()
+        self.queue.executor.shutdown(wait=True)
+        self.db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.test_db_file.name + suffix):
+                os.unlink(self.test_db_file.name + suffix)
+
+    def wait_for(self, job_id, timeout=5.0):
+        """Poll a job until it finishes."""
+        return self.wait_for_user(job_id, None, timeout)
+
+    def wait_for_user(self, job_id, user_id, timeout=5.0):
+        """Poll a user's job until it finishes."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get_job(job_id, user_id)
+            if job.finished:
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} did not finish")
+
+    def test_submit_saves_entry_when_done(self):
+        """Test that a submitted job generates, saves the entry and stores the result."""
+        job_id = self.queue.submit(FORM_DATA)
+        job = self.wait_for(job_id)
+
+        self.assertEqual(job.status, ReflectionJob.DONE)
+        self.assertEqual(job.result["strategy"], "Strategy")
+        entry = self.db.get_entry_by_date("2024-03-01")
+        self.assertEqual(entry.id, job.entry_id)
+        self.assertEqual(entry.reflection, "## Inner Reflection Summary\nReflection")
+
+    def test_failed_generation_marks_job_failed(self):
+        """Test that an exception in the worker is recorded on the job."""
+        self.agent.generate_reflection.side_effect = RuntimeError("boom")
+
+        job = self.wait_for(self.queue.submit(FORM_DATA))
+
+        self.assertEqual(job.status, ReflectionJob.FAILED)
+        self.assertEqual(job.error, "boom")
+        self.assertFalse(self.db.entry_exists_for_date("2024-03-01"))
+
+    def test_recover_resumes_pending_jobs(self):
+        """Test that jobs persisted before a restart are picked up again."""
+        job = ReflectionJob(id="left-over", **FORM_DATA)
+        self.db.create_job(job)
+
+        self.assertEqual(self.queue.recover(), 1)
+        self.assertEqual(self.wait_for("left-over").status, ReflectionJob.DONE)
+
+    def test_jobs_belong_to_their_user(self):
+        """Test that a job saves its entry for the submitting user only."""
+        user_id = self.db.ensure_user("other_user")
+        job = self.wait_for_user(self.queue.submit(FORM_DATA, user_id), user_id)
+
+        self.assertEqual((job.status, job.user_id), (ReflectionJob.DONE, user_id))
+        self.assertIsNone(self.queue.get_job(job.id))
+        self.assertFalse(self.db.entry_exists_for_date("2024-03-01"))
+        self.assertEqual(self.db.for_user(user_id).get_entry_by_date("2024-03-01").id, job.entry_id)
+
+    def test_job_is_claimed_once(self):
+        """Test that a job cannot be claimed by two workers."""
+        self.db.create_job(ReflectionJob(id="once", **FORM_DATA))
+        self.assertTrue(self.db.claim_job("once"))
+        self.assertFalse(self.db.claim_job("once"))
+
+if __name__ == '__main__':
+    unittest.main()
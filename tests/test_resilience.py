@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from agent.langchain_agent import ConsciousDayAgent
+from agent.resilience import CircuitBreaker, RetryPolicy, parse_retry_after
+from config.settings import Config
+
+def make_response(status_code, content=None, headers=None):
+    """Build a mocked requests.Response."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.text = "error"
+    response.headers = headers or {}
+    response.json.return_value = {"choices": [{"message": {"content": content}}]}
+    return response
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff_is_jittered_and_capped(self):
+        """Test that delays stay within the exponential envelope and the cap."""
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for attempt in range(1, 6):
+            delay = policy.backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5.0, 2 ** (attempt - 1)))
+
+    def test_backoff_honors_retry_after(self):
+        """Test that Retry-After sets a floor on the delay."""
+        policy = RetryPolicy(base_delay=0.01, max_delay=10.0)
+        self.assertEqual(policy.backoff(1, retry_after=3.0), 3.0)
+
+    def test_parse_retry_after(self):
+        """Test both Retry-After formats."""
+        self.assertEqual(parse_retry_after("2"), 2.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold_and_recovers(self):
+        """Test closed -> open -> half-open -> closed."""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+        with patch("agent.resilience.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow_request())
+            breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            self.assertFalse(breaker.allow_request())
+
+        with patch("agent.resilience.time.monotonic", return_value=131.0):
+            self.assertTrue(breaker.allow_request())
+            # Only one trial request while half-open
+            self.assertFalse(breaker.allow_request())
+            breaker.record_success()
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        metrics = breaker.metrics()
+        self.assertEqual(metrics["times_opened"], 1)
+        self.assertEqual(metrics["short_circuited"], 2)
+
+    def test_failed_trial_reopens(self):
+        """Test that a failing half-open trial re-opens the circuit."""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+        with patch("agent.resilience.time.monotonic", return_value=0.0):
+            breaker.record_failure()
+        with patch("agent.resilience.time.monotonic", return_value=31.0):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow_request())
+
+class TestAgentResilience(unittest.TestCase):
+    def setUp(self):
+        """Set up an agent without caching and with a private breaker."""
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        self.session = MagicMock()
+        with patch.object(Config, "RESPONSE_CACHE_ENABLED", False):
+            self.agent = ConsciousDayAgent(
+                session=self.session,
+                retry_policy=RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=4.0),
+                circuit_breaker=self.breaker
+            )
+        self.messages = [{"role": "user", "content": "hi"}]
+
+    @patch("agent.langchain_agent.time.sleep")
+    def test_transient_errors_are_retried(self, mock_sleep):
+        """Test that 503 and 429 are retried and Retry-After is honored."""
+        self.session.post.side_effect = [
+            make_response(503),
+            make_response(429, headers={"Retry-After": "2"}),
+            make_response(200, "ok"),
+        ]
+
+        self.assertEqual(self.agent._make_api_request(self.messages), "ok")
+        self.assertEqual(self.session.post.call_count, 3)
+        self.assertEqual(mock_sleep.call_args_list[1][0][0], 2.0)
+        self.assertEqual(self.breaker.metrics()["successes"], 1)
+
+    @patch("agent.langchain_agent.time.sleep")
+    def test_auth_errors_are_not_retried(self, mock_sleep):
+        """Test that a 401 falls back immediately."""
+        self.session.post.return_value = make_response(401)
+
+        response = self.agent._make_api_request(self.messages)
+
+        self.assertEqual(response, self.agent._get_fallback_response())
+        self.assertEqual(self.session.post.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch("agent.langchain_agent.time.sleep")
+    def test_open_circuit_short_circuits(self, mock_sleep):
+        """Test that an open breaker skips the provider entirely."""
+        self.session.post.return_value = make_response(401)
+        self.agent._make_api_request(self.messages)
+        self.agent._make_api_request(self.messages)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.session.post.reset_mock()
+        response = self.agent._make_api_request(self.messages)
+
+        self.assertEqual(response, self.agent._get_fallback_response())
+        self.session.post.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch
+from agent.langchain_agent import ConsciousDayAgent
+from agent.resilience import CircuitBreaker, RetryPolicy
+from agent.tokens import count_tokens
+from database.db_manager import DatabaseManager
+from database.models import JournalEntry
+from retrieval.context import build_context
+from retrieval.embeddings import EmbeddingIndex, HashingEmbedder
+from config.settings import Config
+
+class TestHashingEmbedder(unittest.TestCase):
+    def test_embeddings_are_stable_and_normalised(self):
+        """Test that the same text always maps to the same unit vector."""
+        embedder = HashingEmbedder(dim=64)
+        vector = embedder.embed("Nervous about the presentation")
+
+        np.testing.assert_array_equal(vector, HashingEmbedder(dim=64).embed("nervous about THE presentation"))
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertFalse(embedder.embed("the and of it").any())
+
+class TestEmbeddingIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary database and index."""
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.db_dir.name, "entries.db"))
+        self.index = EmbeddingIndex(self.db.db_path, self.db.user_id)
+
+    def tearDown(self):
+        """Clean up the temporary database."""
+        self.db.close()
+        self.db_dir.cleanup()
+
+    def _save(self, entry_date: str, journal: str):
+        self.db.save_entry(JournalEntry(date=entry_date, journal=journal, intention="Stay calm", priorities="1. Work"))
+
+    def test_search_finds_similar_entries(self):
+        """Test that the most similar past entry ranks first and today's is excluded."""
+        self._save("2024-01-01", "Nervous about the quarterly presentation to the board")
+        self._save("2024-01-02", "Long hike in the mountains with my sister")
+        self._save("2024-01-03", "Presentation tomorrow, nervous and not sleeping well")
+
+        matches = self.index.search("Feeling nervous before the presentation", exclude_date="2024-01-03")
+
+        self.assertEqual([date for _, date, _ in matches][0], "2024-01-01")
+        self.assertNotIn("2024-01-03", [date for _, date, _ in matches])
+
+    def test_index_is_incremental_and_keeps_latest_per_date(self):
+        """Test that new saves are picked up and overwritten entries drop out."""
+        self._save("2024-01-01", "Garden planting tomatoes")
+        self.assertEqual(len(self.index.search("tomatoes garden")), 1)
+
+        self._save("2024-01-01", "Office deadline stress")
+        self._save("2024-01-02", "More tomatoes in the garden")
+
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual([date for _, date, _ in self.index.search("tomatoes garden")], ["2024-01-02"])
+
+    def test_index_only_sees_its_user(self):
+        """Test that another user's entries are never retrieved."""
+        other = self.db.for_user(self.db.ensure_user("other_user"))
+        other.save_entry(JournalEntry(date="2024-01-01", journal="Tomatoes in the garden", intention="Grow",
+                                      priorities="1. Water"))
+
+        self.assertEqual(self.index.search("tomatoes garden"), [])
+        self.assertEqual(len(EmbeddingIndex(self.db.db_path, other.user_id).search("tomatoes garden")), 1)
+
+    def test_batch_saves_are_embedded(self):
+        """Test that save_entries writes a vector for every entry in the batch."""
+        self.db.save_entries([
+            JournalEntry(date=f"2024-02-{day:02d}", journal=f"Swimming lesson number {day}",
+                         intention="Breathe", priorities="1. Swim")
+            for day in range(1, 6)
+        ])
+
+        matches = self.index.search("swimming lesson", k=10)
+        self.assertEqual(sorted(date for _, date, _ in matches), [f"2024-02-{day:02d}" for day in range(1, 6)])
+
+    def test_context_fits_budget(self):
+        """Test that retrieved snippets are trimmed to the context budget."""
+        for day in range(1, 4):
+            self._save(f"2024-03-0{day}", "Anxious about the product launch " + "details " * 400)
+
+        with patch.object(Config, "CONTEXT_TOKEN_BUDGET", 90):
+            context = build_context(self.db, "Product launch anxiety", "", "", "", exclude_date="2024-03-04",
+                                    index=self.index)
+
+        self.assertEqual(context.count("\n- ") + 1, 3)
+        self.assertIn("2024-03-01: Anxious about the product launch", context)
+        self.assertLessEqual(count_tokens(context), 110)
+        self.assertEqual(build_context(self.db, "zebra xylophone", "", "", "", exclude_date="", index=self.index), "")
+
+    def test_context_reaches_prompt_and_cache_key(self):
+        """Test that past entries are sent to the model and separate cache entries."""
+        with patch.object(Config, "RESPONSE_CACHE_ENABLED", False):
+            agent = ConsciousDayAgent(retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=CircuitBreaker("test"))
+        messages = agent._build_messages("journal", "intention", "dream", "priorities", context="- 2024-01-01: Hike")
+
+        self.assertIn("RELATED PAST ENTRIES:\n- 2024-01-01: Hike", messages[1]["content"])
+        agent.cache = object()
+        self.assertNotEqual(
+            agent._cache_key("journal", "intention", "dream", "priorities"),
+            agent._cache_key("journal", "intention", "dream", "priorities", context="- 2024-01-01: Hike")
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import time
+import tempfile
+import unittest
+import jwt
+from unittest.mock import patch
+from components.sessions import SessionStore
+from database.db_manager import DatabaseManager
+from database.models import User
+
+KEY = "test-session-signing-key-of-32-bytes"
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary database with one account."""
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.db_dir.name, "entries.db"))
+        self.user = User(username="reader", name="Reader")
+        self.user.id = self.db.save_user(self.user)
+        self.store = SessionStore(self.db, key=KEY)
+
+    def tearDown(self):
+        """Clean up the temporary database."""
+        self.db.close()
+        self.db_dir.cleanup()
+
+    def test_issued_token_validates_from_cache(self):
+        """Test that a returning cookie is accepted without a signature check or a query."""
+        token = self.store.issue(self.user)
+
+        with patch.object(self.db, "get_session") as mock_get, patch("jwt.decode") as mock_decode:
+            session = self.store.validate(token)
+
+        mock_get.assert_not_called()
+        mock_decode.assert_not_called()
+        self.assertEqual((session.user_id, session.username, session.name), (self.user.id, "reader", "Reader"))
+
+    def test_validates_after_restart(self):
+        """Test that a cookie issued by another process is checked against the sessions table."""
+        token = self.store.issue(self.user)
+
+        session = SessionStore(self.db, key=KEY).validate(token)
+
+        self.assertEqual(session.user_id, self.user.id)
+
+    def test_rejects_forged_and_expired_tokens(self):
+        """Test that tokens with a bad signature or past expiry are refused."""
+        token = self.store.issue(self.user)
+        claims = jwt.decode(token, KEY, algorithms=["HS256"])
+        fresh = SessionStore(self.db, key=KEY)
+
+        self.assertIsNone(fresh.validate(jwt.encode(claims, "another-key-of-at-least-32-bytes!!", algorithm="HS256")))
+        self.assertIsNone(fresh.validate(jwt.encode({**claims, "sub": "999"}, KEY, algorithm="HS256")))
+        self.assertIsNone(fresh.validate(jwt.encode({**claims, "exp": int(time.time()) - 1}, KEY, algorithm="HS256")))
+        self.assertIsNone(fresh.validate("not a token"))
+
+    def test_revocation(self):
+        """Test that revoked sessions are refused here at once and elsewhere after the cache TTL."""
+        other_process = SessionStore(self.db, key=KEY, cache_ttl=0)
+        first, second = self.store.issue(self.user), self.store.issue(self.user)
+        self.assertIsNotNone(other_process.validate(first))
+
+        self.assertTrue(self.store.revoke(first))
+        self.assertIsNone(self.store.validate(first))
+        self.assertIsNone(other_process.validate(first))
+
+        self.assertEqual(self.store.revoke_user(self.user.id), 1)
+        self.assertIsNone(self.store.validate(second))
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently validated sessions are evicted first."""
+        store = SessionStore(self.db, key=KEY, cache_size=2)
+        tokens = [store.issue(self.user) for _ in range(3)]
+
+        self.assertEqual(list(store._cache), tokens[1:])
+        self.assertIsNotNone(store.validate(tokens[0]))
+        self.assertEqual(list(store._cache), [tokens[2], tokens[0]])
+
+if __name__ == '__main__':
+    unittest.main()
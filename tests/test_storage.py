@@ -0,0 +1,237 @@
+import os
+import time
+import uuid
+import asyncio
+import tempfile
+import unittest
+from database import postgres
+from database.backend import EXPORT_COLUMNS, StorageBackend
+from database.db_manager import DatabaseManager, get_database_manager
+from database.models import JournalEntry, ReflectionJob, User, UserSession
+from database.postgres import PostgresDatabaseManager
+
+try:
+    import pgserver
+except ImportError:  # optional: embedded PostgreSQL for the storage tests
+    pgserver = None
+
+# PostgreSQL tests run against the server at this URL, or else a throwaway one
+# started by pgserver; either way each test gets a fresh schema
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+def make_entry(date: str, journal: str = "Walked by the lighthouse before work.") -> JournalEntry:
+    return JournalEntry(
+        date=date, journal=journal, intention="Stay calm", dream="Flying over the sea",
+        priorities="1. Presentation", reflection="You noticed your breath.", strategy="1. Walk early"
+    )
+
+class StorageConformance:
+    """Behaviour every StorageBackend must share; subclasses provide open_backend()."""
+
+    def open_backend(self) -> StorageBackend:
+        raise NotImplementedError
+
+    def setUp(self):
+        self.db = self.open_backend()
+        self.user_id = self.db.ensure_user("alice", "Alice")
+        self.alice = self.db.for_user(self.user_id)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_save_overwrite_and_revisions(self):
+        """Test that saving a date again updates the entry in place and archives the old version."""
+        self.assertTrue(self.alice.save_entry(make_entry("2024-03-01")))
+        first = self.alice.get_entry_by_date("2024-03-01")
+        self.assertTrue(self.alice.save_entry(make_entry("2024-03-01", journal="Rewrote it about the volcano.")))
+
+        saved = self.alice.get_entry_by_date("2024-03-01")
+        self.assertEqual((saved.id, saved.journal), (first.id, "Rewrote it about the volcano."))
+        self.assertEqual([revision.journal for revision in self.alice.get_revisions("2024-03-01")],
+                         ["Walked by the lighthouse before work."])
+        self.assertEqual(self.alice.get_entry_by_date("2024-03-01", deferred=True).reflection,
+                         "You noticed your breath.")
+        self.assertTrue(self.alice.entry_exists_for_date("2024-03-01"))
+        self.assertIsNone(self.alice.get_entry_by_date("2024-03-02"))
+
+    def test_users_are_isolated(self):
+        """Test that each user only sees their own entries."""
+        self.alice.save_entry(make_entry("2024-03-01"))
+        bob = self.db.for_user(self.db.ensure_user("bob"))
+
+        self.assertEqual(bob.get_all_dates(), [])
+        self.assertIsNone(bob.get_entry_by_date("2024-03-01"))
+        self.assertEqual(bob.search("lighthouse"), [])
+        self.assertEqual(bob.get_embeddings(), [])
+        self.assertEqual(self.db.ensure_user("alice"), self.user_id)
+
+    def test_listing_pages(self):
+        """Test keyset pages of dates and summaries, and lookups by id."""
+        self.assertEqual(self.alice.save_entries([make_entry(f"2024-03-{day:02d}") for day in range(1, 6)]), 5)
+
+        self.assertEqual(self.alice.get_all_dates()[:2], ["2024-03-05", "2024-03-04"])
+        self.assertEqual(self.alice.get_dates_page(limit=2), ["2024-03-05", "2024-03-04"])
+        self.assertEqual(self.alice.get_dates_page(before="2024-03-04", limit=2), ["2024-03-03", "2024-03-02"])
+        self.assertEqual(self.alice.get_dates_page(after="2024-03-03", limit=5), ["2024-03-04", "2024-03-05"])
+        summaries = self.alice.get_entry_summaries(before="2024-03-03")
+        self.assertEqual([summary.date for summary in summaries], ["2024-03-02", "2024-03-01"])
+        entries = self.alice.get_entries_by_ids([summary.id for summary in summaries])
+        self.assertEqual(entries[summaries[0].id].date, "2024-03-02")
+        self.assertEqual(entries[summaries[0].id].strategy, "1. Walk early")
+
+    def test_stats(self):
+        """Test that statistics count distinct days and streaks."""
+        for date in ("2024-03-01", "2024-03-02", "2024-03-02", "2024-03-04", "2024-03-03"):
+            self.alice.save_entry(make_entry(date))
+
+        stats = self.alice.get_stats()
+        self.assertEqual((stats.total_days, stats.first_date, stats.last_date, stats.longest_streak),
+                         (4, "2024-03-01", "2024-03-04", 4))
+        self.assertEqual(sum(stats.weekday_counts), 4)
+
+    def test_search(self):
+        """Test that search matches every word, highlights it and ranks journal matches first."""
+        self.alice.save_entry(make_entry("2024-03-01"))
+        self.alice.save_entry(make_entry("2024-03-02", journal="A quiet day at home."))
+        entry = make_entry("2024-03-03", journal="A quiet day at home.")
+        entry.reflection = "You thought about the lighthouse."
+        self.alice.save_entry(entry)
+
+        results = self.alice.search("lighthouse")
+        self.assertEqual([result.date for result in results], ["2024-03-01", "2024-03-03"])
+        self.assertIn("**lighthouse**", results[0].snippet)
+        self.assertEqual(sorted(result.date for result in self.alice.search("quiet home")), ["2024-03-02", "2024-03-03"])
+        self.assertEqual(self.alice.search("lighthouse volcano"), [])
+        self.assertEqual(self.alice.search("  "), [])
+
+    def test_embeddings_follow_writes(self):
+        """Test that each save yields an embedding with a newer sequence number."""
+        self.alice.save_entry(make_entry("2024-03-01"))
+        self.alice.save_entry(make_entry("2024-03-02"))
+        seqs = [row[0] for row in self.alice.get_embeddings()]
+        self.assertEqual(len(seqs), 2)
+
+        self.alice.save_entry(make_entry("2024-03-01", journal="Rewritten."))
+        newer = self.alice.get_embeddings(max(seqs))
+        self.assertEqual([row[2] for row in newer], ["2024-03-01"])
+        self.assertIsInstance(newer[0][3], bytes)
+
+    def test_export_and_import(self):
+        """Test that exported rows import into another user unchanged."""
+        self.alice.save_entries([make_entry(f"2024-03-{day:02d}") for day in range(1, 4)])
+        batches = list(self.alice.export_rows(batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+
+        rows = [dict(zip(EXPORT_COLUMNS, row)) for batch in batches for row in batch]
+        bob = self.db.for_user(self.db.ensure_user("bob"))
+        self.assertEqual(bob.import_entries(rows), 3)
+        self.assertEqual([row for batch in bob.export_rows() for row in batch],
+                         [row for batch in batches for row in batch])
+        self.assertEqual(bob.get_stats().total_days, 3)
+
+    def test_users_and_sessions(self):
+        """Test account upserts and session expiry and revocation."""
+        user_id = self.db.save_user(User(username="carol", name="Carol", password_hash="hash"))
+        self.assertEqual(self.db.save_user(User(username="carol", name="Caroline", password_hash="new")), user_id)
+        self.assertEqual((self.db.get_user("carol").name, self.db.get_user("carol").password_hash),
+                         ("Caroline", "new"))
+        self.assertIsNone(self.db.get_user("nobody"))
+
+        now = int(time.time())
+        self.assertTrue(self.db.create_session(UserSession(id="a", user_id=user_id, expires_at=now + 60)))
+        self.assertTrue(self.db.create_session(UserSession(id="b", user_id=user_id, expires_at=now + 60)))
+        self.assertTrue(self.db.create_session(UserSession(id="old", user_id=user_id, expires_at=now - 1)))
+        self.assertEqual(self.db.get_session("a").username, "carol")
+        self.assertIsNone(self.db.get_session("old"))
+        self.assertEqual(self.db.revoke_sessions(session_id="a"), 1)
+        self.assertIsNone(self.db.get_session("a"))
+        # "b" and the expired "old"
+        self.assertEqual(self.db.revoke_sessions(user_id=user_id), 2)
+
+    def test_job_lifecycle(self):
+        """Test that a job is claimed once and completes with its entry saved."""
+        job = ReflectionJob(id="job-1", date="2024-03-01", journal="j", intention="i", dream="", priorities="p")
+        self.assertTrue(self.alice.create_job(job))
+        self.assertEqual(self.alice.requeue_stale_jobs(60), [("job-1", self.user_id)])
+        self.assertTrue(self.alice.claim_job("job-1"))
+        self.assertFalse(self.alice.claim_job("job-1"))
+        running = self.alice.get_job("job-1")
+        self.assertEqual(running.status, "running")
+        # Timestamps are the same UTC text on every backend
+        for value in (running.created_at, running.updated_at):
+            self.assertRegex(value, r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d$")
+
+        entry_id = self.alice.complete_job("job-1", make_entry("2024-03-01"), {"reflection": "r"})
+        job = self.alice.get_job("job-1")
+        self.assertEqual((job.status, job.entry_id, job.result), ("done", entry_id, {"reflection": "r"}))
+        self.assertEqual(self.alice.get_entry_by_date("2024-03-01").id, entry_id)
+        self.assertIsNone(self.db.for_user(self.db.ensure_user("bob")).get_job("job-1"))
+
+        self.assertTrue(self.alice.create_job(ReflectionJob(id="job-2", date="2024-03-02", journal="j",
+                                                            intention="i", dream="", priorities="p")))
+        self.assertTrue(self.alice.fail_job("job-2", "boom"))
+        self.assertEqual(self.alice.get_job("job-2").error, "boom")
+
+class TestSQLiteStorage(StorageConformance, unittest.TestCase):
+    def open_backend(self) -> StorageBackend:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        return DatabaseManager(os.path.join(self.tmp_dir.name, "entries.db"))
+
+    def test_location_picks_backend(self):
+        """Test that get_database_manager opens SQLite for a path."""
+        path = os.path.join(self.tmp_dir.name, "other.db")
+        self.assertIsInstance(get_database_manager(path), DatabaseManager)
+        get_database_manager(path).close()
+        get_database_manager.cache_clear()
+
+    def test_incomplete_backend_fails_on_construction(self):
+        """Test that a backend missing an operation fails when constructed, not when the operation is called."""
+        operations = {name: getattr(DatabaseManager, name) for name in StorageBackend.__abstractmethods__}
+        del operations['search']
+        NoSearchBackend = type('NoSearchBackend', (StorageBackend,), operations)
+        with self.assertRaises(TypeError):
+            NoSearchBackend()
+
+@unittest.skipUnless(postgres.asyncpg and (TEST_DATABASE_URL or pgserver),
+                     "needs asyncpg, and TEST_DATABASE_URL or pgserver")
+class TestPostgresStorage(StorageConformance, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Start an embedded PostgreSQL server in a temporary directory unless TEST_DATABASE_URL is set."""
+        cls.url = TEST_DATABASE_URL
+        if not cls.url:
+            cls.tmp_dir = tempfile.TemporaryDirectory()
+            cls.server = pgserver.get_server(cls.tmp_dir.name, cleanup_mode='stop')
+            cls.url = cls.server.get_uri()
+
+    @classmethod
+    def tearDownClass(cls):
+        if not TEST_DATABASE_URL:
+            cls.server.cleanup()
+            cls.tmp_dir.cleanup()
+
+    def _admin(self, statement: str):
+        async def run():
+            conn = await postgres.asyncpg.connect(self.url)
+            try:
+                await conn.execute(statement)
+            finally:
+                await conn.close()
+        asyncio.run(run())
+
+    def open_backend(self) -> StorageBackend:
+        schema = f"test_{uuid.uuid4().hex}"
+        self._admin(f"CREATE SCHEMA {schema}")
+        self.addCleanup(self._admin, f"DROP SCHEMA {schema} CASCADE")
+        # asyncpg passes unknown URL parameters on as server settings
+        separator = '&' if '?' in self.url else '?'
+        return PostgresDatabaseManager(f"{self.url}{separator}search_path={schema}")
+
+    def test_location_picks_backend(self):
+        """Test that get_database_manager opens PostgreSQL for a URL."""
+        self.assertIsInstance(get_database_manager(self.db.db_path), PostgresDatabaseManager)
+        get_database_manager.cache_clear()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agent.langchain_agent import ConsciousDayAgent
+from agent.cache import ResponseCache
+from agent.resilience import CircuitBreaker, RetryPolicy
+from agent.streaming import IncrementalSectionParser, iter_completion_deltas, iter_sse_data
+from agent.parsing import parse_sections
+from database.connection import close_pool
+
+SAMPLE_RESPONSE = """## Inner Reflection Summary
+You sound anxious but energized.
+
+## Dream Interpretation Summary
+Flying suggests a wish for freedom.
+
+## Energy/Mindset Insight
+High energy, scattered focus.
+
+## Suggested Day Strategy
+1. Presentation first
+2. Break at noon"""
+
+class FakeSSEHandler(BaseHTTPRequestHandler):
+    """Serves an OpenRouter-style streaming completion in small chunks."""
+    status = 200
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FakeSSEHandler.requests_seen.append(body)
+        if self.status != 200:
+            self.send_response(self.status)
+            self.end_headers()
+            self.wfile.write(b'{"error": "unavailable"}')
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        self.wfile.write(b': OPENROUTER PROCESSING\n\n')
+        for i in range(0, len(SAMPLE_RESPONSE), 7):
+            chunk = {"choices": [{"delta": {"content": SAMPLE_RESPONSE[i:i + 7]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+
+    def log_message(self, *args):
+        pass
+
+class TestStreamParsing(unittest.TestCase):
+    def test_sse_data_skips_comments_and_stops_at_done(self):
+        """Test SSE framing."""
+        lines = [': keep-alive', '', 'data: {"a": 1}', '', 'data: [DONE]', '', 'data: {"b": 2}', '']
+        self.assertEqual(list(iter_sse_data(lines)), ['{"a": 1}'])
+
+    def test_completion_deltas(self):
+        """Test extraction of content deltas from stream chunks."""
+        lines = [
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}', '',
+            'data: {"choices": [{"delta": {"content": "Hel"}}]}', '',
+            'data: {"choices": [{"delta": {"content": "lo"}}]}', '',
+            'data: [DONE]', '',
+        ]
+        self.assertEqual(''.join(iter_completion_deltas(lines)), 'Hello')
+
+    def test_incremental_parser_matches_full_parse(self):
+        """Test that any chunking yields the same sections as the full parser."""
+        expected = parse_sections(SAMPLE_RESPONSE)
+        for size in (1, 3, 16, len(SAMPLE_RESPONSE)):
+            parser = IncrementalSectionParser()
+            for i in range(0, len(SAMPLE_RESPONSE), size):
+                parser.feed(SAMPLE_RESPONSE[i:i + size])
+            self.assertEqual(parser.close(), expected)
+
+    def test_sections_appear_as_headers_arrive(self):
+        """Test that a section becomes visible before the response finishes."""
+        parser = IncrementalSectionParser()
+        changed = parser.feed("## Inner Reflection Summary\nYou sound")
+        self.assertEqual(changed, {'reflection'})
+        self.assertEqual(parser.sections, {'reflection': 'You sound'})
+        self.assertEqual(parser.feed("\n## Dream Interp"), set())
+        self.assertEqual(parser.feed("retation Summary\nFlying"), {'dream_interpretation'})
+
+class TestAgentStreaming(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Start the fake SSE server."""
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSSEHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the fake SSE server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Point an agent with a temporary cache at the fake server."""
+        FakeSSEHandler.status = 200
+        FakeSSEHandler.requests_seen = []
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.cache_dir.name, "cache.db")
+        self.agent = ConsciousDayAgent(
+            cache=ResponseCache(self.cache_path),
+            retry_policy=RetryPolicy(max_attempts=1),
+            circuit_breaker=CircuitBreaker("test")
+        )
+        self.agent.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        """Clean up the test cache."""
+        close_pool(self.cache_path)
+        self.cache_dir.cleanup()
+
+    def test_stream_reflection(self):
+        """Test that the stream arrives in several chunks and parses fully."""
+        chunks = list(self.agent.stream_reflection("journal", "intention", "dream", "priorities"))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(FakeSSEHandler.requests_seen[0]["stream"])
+        results = self.agent.build_results(''.join(chunks))
+        self.assertEqual(results['full_response'], SAMPLE_RESPONSE)
+        self.assertIn('Presentation first', results['strategy'])
+
+    def test_completed_stream_is_cached(self):
+        """Test that a finished stream is served from the cache next time."""
+        list(self.agent.stream_reflection("journal", "intention", "dream", "priorities"))
+        chunks = list(self.agent.stream_reflection("journal", "intention", "dream", "priorities"))
+
+        self.assertEqual(len(FakeSSEHandler.requests_seen), 1)
+        self.assertEqual(chunks, [SAMPLE_RESPONSE])
+
+    def test_stream_failure_yields_fallback(self):
+        """Test that an error before any token yields the fallback response."""
+        FakeSSEHandler.status = 503
+        chunks = list(self.agent.stream_reflection("journal", "intention", "dream", "priorities"))
+
+        self.assertEqual(chunks, [self.agent._get_fallback_response()])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from agent.langchain_agent import ConsciousDayAgent
+from agent.cache import ResponseCache
+from agent.resilience import CircuitBreaker, RetryPolicy
+from agent.structured import SECTION_KEYS, missing_sections, parse_structured, response_format, to_markdown
+from agent.parsing import parse_sections
+from database.connection import close_pool
+
+SECTIONS = {
+    "reflection": "You sound anxious but energized.",
+    "dream_interpretation": "Flying suggests a wish for freedom.",
+    "mindset_insight": "High energy, scattered focus.",
+    "strategy": "1. Presentation first\n2. Break at noon"
+}
+
+def completion(content: str) -> MagicMock:
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"choices": [{"message": {"content": content}}]}
+    return response
+
+class TestStructuredParsing(unittest.TestCase):
+    def test_parse_valid_json(self):
+        """Test that a well-formed reply is used as-is."""
+        self.assertEqual(parse_structured(json.dumps(SECTIONS)), SECTIONS)
+
+    def test_repairs_fences_prose_and_raw_newlines(self):
+        """Test the local repairs for the usual ways models break JSON."""
+        raw = '{"reflection": "Line one\nLine two", "strategy": "Focus"}'
+        for text in (f"```json\n{raw}\n```", f"Here is your reflection:\n{raw}\nHope it helps!"):
+            self.assertEqual(parse_structured(text), {"reflection": "Line one\nLine two", "strategy": "Focus"})
+
+    def test_falls_back_to_markdown_headers(self):
+        """Test that a reply which ignored the format is parsed by its headers."""
+        markdown = to_markdown(SECTIONS)
+        self.assertEqual(parse_structured(markdown), parse_sections(markdown))
+        self.assertEqual(parse_sections(markdown), SECTIONS)
+
+    def test_validator_drops_wrong_types_and_blanks(self):
+        """Test that only non-empty string sections survive validation."""
+        sections = parse_structured(json.dumps({"reflection": " ", "strategy": 3, "mindset_insight": "Ok", "extra": "x"}))
+        self.assertEqual(sections, {"mindset_insight": "Ok"})
+        self.assertEqual(missing_sections(sections), ["reflection", "dream_interpretation", "strategy"])
+
+    def test_response_format_schema(self):
+        """Test the json_schema response_format for a subset of keys."""
+        schema = response_format(["strategy"])["json_schema"]["schema"]
+        self.assertEqual(schema["required"], ["strategy"])
+        self.assertFalse(schema["additionalProperties"])
+        self.assertEqual(response_format()["json_schema"]["schema"]["required"], list(SECTION_KEYS))
+
+class TestStructuredAgent(unittest.TestCase):
+    def setUp(self):
+        """Set up a structured-output agent with a temporary cache."""
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.cache_dir.name, "cache.db")
+        self.agent = ConsciousDayAgent(
+            cache=ResponseCache(self.cache_path),
+            retry_policy=RetryPolicy(max_attempts=1),
+            circuit_breaker=CircuitBreaker("test"),
+            structured=True
+        )
+
+    def tearDown(self):
+        """Clean up the test cache."""
+        close_pool(self.cache_path)
+        self.cache_dir.cleanup()
+
+    @patch('requests.Session.post')
+    def test_structured_generation(self, mock_post):
+        """Test that the request carries the schema and the sections come back unchanged."""
+        mock_post.return_value = completion(json.dumps(SECTIONS))
+
+        result = self.agent.generate_reflection("journal", "intention", "dream", "priorities")
+
+        payload = mock_post.call_args.kwargs["json"]
+        self.assertEqual(payload["response_format"]["type"], "json_schema")
+        self.assertIn("JSON object", payload["messages"][0]["content"][0]["text"])
+        self.assertEqual({key: result[key] for key in SECTION_KEYS}, SECTIONS)
+        self.assertIn("## Suggested Day Strategy", result["full_response"])
+        self.assertEqual(mock_post.call_count, 1)
+
+    @patch('requests.Session.post')
+    def test_missing_sections_are_repaired(self, mock_post):
+        """Test that only the missing sections are requested again."""
+        partial = {key: SECTIONS[key] for key in ("reflection", "strategy")}
+        repair = {key: SECTIONS[key] for key in ("dream_interpretation", "mindset_insight")}
+        mock_post.side_effect = [completion(json.dumps(partial)), completion(json.dumps(repair))]
+
+        result = self.agent.generate_reflection("journal", "intention", "dream", "priorities")
+
+        repair_payload = mock_post.call_args_list[1].kwargs["json"]
+        self.assertEqual(
+            repair_payload["response_format"]["json_schema"]["schema"]["required"],
+            ["dream_interpretation", "mindset_insight"]
+        )
+        self.assertEqual(repair_payload["messages"][-2], {"role": "assistant", "content": json.dumps(partial)})
+        self.assertEqual({key: result[key] for key in SECTION_KEYS}, SECTIONS)
+
+    @patch('requests.Session.post')
+    def test_failed_repair_keeps_partial_sections(self, mock_post):
+        """Test that a failed repair still returns what the first reply contained."""
+        failed = MagicMock(status_code=500, text="error", headers={})
+        mock_post.side_effect = [completion(json.dumps({"strategy": "Focus"})), failed]
+
+        result = self.agent.generate_reflection("journal", "intention", "dream", "priorities")
+
+        self.assertEqual(result["strategy"], "Focus")
+        self.assertEqual(result["reflection"], "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+from agent.langchain_agent import ConsciousDayAgent
+from agent.resilience import CircuitBreaker, RetryPolicy
+from agent.tokens import TRIM_MARKER, count_message_tokens, count_tokens, fit_inputs, log_usage, trim_to_budget
+from config.settings import Config
+
+# Deterministic counts regardless of whether tiktoken and its encoding file are available
+@patch('agent.tokens._get_encoding', return_value=None)
+class TestTokenBudget(unittest.TestCase):
+    def test_count_tokens_estimate(self, _):
+        """Test the character-based estimate used without tiktoken."""
+        self.assertEqual(count_tokens(""), 0)
+        self.assertEqual(count_tokens("abcdefgh"), 2)
+        self.assertEqual(count_message_tokens([{"role": "user", "content": [{"type": "text", "text": "abcd"}]}]), 5)
+
+    def test_trim_keeps_beginning_and_end(self, _):
+        """Test that trimming keeps the head and tail within the budget."""
+        text = "start " + "middle " * 500 + "finish"
+        trimmed = trim_to_budget(text, 50)
+
+        self.assertTrue(trimmed.startswith("start"))
+        self.assertTrue(trimmed.endswith("finish"))
+        self.assertIn(TRIM_MARKER, trimmed)
+        self.assertLessEqual(count_tokens(trimmed), 52)
+        self.assertEqual(trim_to_budget("short", 50), "short")
+
+    def test_fit_inputs_trims_only_long_fields(self, _):
+        """Test that short inputs stay whole and long ones share the rest of the budget."""
+        inputs = {"journal": "j" * 4000, "dream": "d" * 2000, "intention": "Be present", "priorities": "1. Rest"}
+        fitted = fit_inputs(inputs, 300)
+
+        self.assertEqual(fitted["intention"], "Be present")
+        self.assertEqual(fitted["priorities"], "1. Rest")
+        self.assertLessEqual(sum(count_tokens(value) for value in fitted.values()), 310)
+        self.assertAlmostEqual(count_tokens(fitted["journal"]), count_tokens(fitted["dream"]), delta=2)
+        self.assertEqual(fit_inputs(inputs, 10000), inputs)
+
+    def test_prompt_prefix_is_static_and_marked(self, _):
+        """Test that only the user message varies between requests."""
+        with patch.object(Config, "RESPONSE_CACHE_ENABLED", False):
+            agent = ConsciousDayAgent(retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=CircuitBreaker("test"))
+        first = agent._build_messages("journal one", "intention", "dream", "priorities")
+        second = agent._build_messages("journal " * 5000, "other", "", "1. Work")
+
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(first[0]["content"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertIn("journal one", first[1]["content"])
+        self.assertLessEqual(count_tokens(second[1]["content"]), Config.PROMPT_INPUT_TOKEN_BUDGET + 50)
+
+    def test_log_usage(self, _):
+        """Test usage logging from the provider's numbers or local estimates."""
+        with self.assertLogs(level="INFO") as logs:
+            log_usage("m", [], "", {"prompt_tokens": 900, "completion_tokens": 300,
+                                    "prompt_tokens_details": {"cached_tokens": 800}})
+            log_usage("m", [{"role": "user", "content": "abcd"}], "abcdefgh")
+
+        self.assertIn("900 in (800 cached), 300 out", logs.output[0])
+        self.assertIn("(estimated): 5 in, 2 out", logs.output[1])
+
+if __name__ == '__main__':
+    unittest.main()
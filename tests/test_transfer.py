@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from database import transfer
+from database.db_manager import DatabaseManager
+from database.models import JournalEntry
+from database.transfer import export_entries, import_entries
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        """Set up a source database with a few entries and an empty target account."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp_dir.name, "entries.db"))
+        self.target = self.db.for_user(self.db.ensure_user("restored"))
+        self.db.save_entries([
+            JournalEntry(date=f"2024-01-{day:02d}", journal=f"Day {day}, with \"quotes\", commas\nand lines",
+                         intention="Breathe", dream="" if day % 2 else "Flying", priorities="1. Rest",
+                         reflection="## Inner Reflection Summary\nCalm.", strategy="Walk", reflection_summary="Calm.")
+            for day in range(1, 8)
+        ])
+
+    def tearDown(self):
+        """Clean up the temporary files."""
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_round_trip(self):
+        """Test that every format restores the same entries, timestamps included."""
+        expected = [self.db.get_entry_by_date(f"2024-01-{day:02d}") for day in range(1, 8)]
+        for fmt in ("jsonl", "csv") + (("parquet",) if transfer.pa else ()):
+            with self.subTest(fmt=fmt):
+                target = self.db.for_user(self.db.ensure_user(f"restored_{fmt}"))
+                path = self._path(f"backup.{fmt}")
+
+                self.assertEqual(export_entries(self.db, path, batch_size=3), 7)
+                self.assertEqual(import_entries(target, path, batch_size=3), (7, 7))
+
+                restored = [target.get_entry_by_date(entry.date) for entry in expected]
+                strip = lambda entry: {**entry.to_dict(), 'id': None}
+                self.assertEqual([strip(entry) for entry in restored], [strip(entry) for entry in expected])
+                self.assertEqual(target.get_stats().longest_streak, 7)
+                self.assertEqual(len(target.search("quotes")), 7)
+
+    def test_export_streams_in_batches(self):
+        """Test that the export fetches one batch at a time and only sees its user."""
+        self.target.save_entry(JournalEntry(date="2024-01-01", journal="Not exported", intention="I"))
+
+        batches = list(self.db.export_rows(batch_size=3))
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertNotIn("Not exported", [row[1] for batch in batches for row in batch])
+
+    def test_import_overwrites_and_stops_at_bad_rows(self):
+        """Test that imported dates overwrite existing entries and a bad row ends the import."""
+        path = self._path("backup.jsonl")
+        export_entries(self.db, path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"date": "2024-01-02", "journal": "Second version"}\n{"date": "2024-13-01"}\n')
+
+        self.assertEqual(import_entries(self.db, path, batch_size=4), (9, 8))
+
+        self.assertEqual(self.db.get_entry_by_date("2024-01-02").journal, "Second version")
+        self.assertEqual(len(self.db.get_revisions("2024-01-02")), 2)
+        self.assertEqual(self.db.get_stats().total_days, 7)
+
+    def test_failed_export_leaves_no_file(self):
+        """Test that an export that fails part way does not leave a partial backup."""
+        path = self._path("backup.csv")
+
+        def fail_part_way(batches, tmp_path, fmt):
+            with open(tmp_path, "w") as f:
+                f.write("date,journal\n")
+            raise OSError("disk full")
+
+        with patch.object(transfer, "write_rows", side_effect=fail_part_way):
+            with self.assertRaises(OSError):
+                export_entries(self.db, path)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(f"{path}.tmp"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,11 @@ def format_date(date_str: str, format_type: str = "display") -> str:
     except ValueError:
         return date_str
 
+def truncate_text(text: str, limit: int) -> str:
+    """Shorten text to at most limit characters for one-line labels."""
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
 def validate_api_configuration() -> bool:
     """Validate API configuration."""
     from config.settings import Config